@@ -1,7 +1,11 @@
 from flask import Flask, jsonify, request
 from blockchain import Blockchain
+from block_log import FSYNC_INTERVAL
+from sync import chain_headers
+from streaming import json_stream, chain_array
 from uuid import uuid4
 import json
+import os
 
 # Instantiate our Node
 app = Flask(__name__)
@@ -9,8 +13,13 @@ app = Flask(__name__)
 # Generate a globally unique address for this node
 node_identifier = str(uuid4()).replace('-', '')
 
-# Instantiate the Blockchain
-blockchain = Blockchain()
+# Instantiate the Blockchain, mining with MINING_WORKERS processes
+# and persisting the blocks under DATA_DIR when it is set
+blockchain = Blockchain(
+    mining_workers=int(os.environ.get('MINING_WORKERS', 1)),
+    data_dir=os.environ.get('DATA_DIR'),
+    fsync=os.environ.get('BLOCK_LOG_FSYNC', FSYNC_INTERVAL)
+)
 
 
 @app.route('/mine', methods=['GET'])
@@ -29,7 +38,7 @@ def mine():
     )
 
     # Forge the new Block by adding it to the chain
-    previous_hash = blockchain.hash(last_block)
+    previous_hash = blockchain.last_block_hash
     block = blockchain.new_block(proof, previous_hash)
 
     response = {
@@ -38,6 +47,7 @@ def mine():
         'transactions': block['transactions'],
         'proof': block['proof'],
         'previous_hash': block['previous_hash'],
+        'merkle_root': block['merkle_root'],
     }
     return jsonify(response), 200
 
@@ -60,8 +70,33 @@ def new_transaction():
 
 @app.route('/chain', methods=['GET'])
 def full_chain():
+    # Peers syncing with us only ask for the blocks they are missing: /chain?from=<index>&limit=<n>
+    start = request.args.get('from', 1, type=int)
+    limit = request.args.get('limit', type=int)
+
+    # The blocks are streamed from the encodings cached when they were sealed
+    return json_stream([
+        ('chain', chain_array(blockchain.chain, start, limit)),
+        ('length', len(blockchain.chain)),
+    ])
+
+
+@app.route('/chain/tip', methods=['GET'])
+def chain_tip():
     response = {
-        'chain': blockchain.chain,
+        'height': len(blockchain.chain),
+        'hash': blockchain.last_block_hash,
+    }
+    return jsonify(response), 200
+
+
+@app.route('/chain/headers', methods=['GET'])
+def chain_block_headers():
+    start = request.args.get('from', 1, type=int)
+    limit = request.args.get('limit', type=int)
+
+    response = {
+        'headers': chain_headers(blockchain.chain, start, limit),
         'length': len(blockchain.chain),
     }
     return jsonify(response), 200
@@ -90,17 +125,17 @@ def consensus():
     replaced = blockchain.resolve_conflicts()
 
     if replaced:
-        response = {
-            'message': 'Our chain was replaced',
-            'new_chain': blockchain.chain
-        }
+        return json_stream([
+            ('message', 'Our chain was replaced'),
+            ('new_chain', chain_array(blockchain.chain)),
+            ('peers', blockchain.peer_report),
+        ])
     else:
-        response = {
-            'message': 'Our chain is authoritative',
-            'chain': blockchain.chain
-        }
-
-    return jsonify(response), 200
+        return json_stream([
+            ('message', 'Our chain is authoritative'),
+            ('chain', chain_array(blockchain.chain)),
+            ('peers', blockchain.peer_report),
+        ])
 
 
 if __name__ == '__main__':
@@ -2,7 +2,9 @@ import hashlib
 import binascii
 import os
 import json
+import threading
 import uuid
+from collections import OrderedDict
 # Try to import from Crypto (alternative name for pycryptodome) first, then fall back to Cryptodome
 try:
     from Crypto.PublicKey import RSA
@@ -13,7 +15,149 @@ except ImportError:
     from Cryptodome.PublicKey import RSA
     from Cryptodome.Signature import pkcs1_15
     from Cryptodome.Hash import SHA256
-from typing import Dict, Tuple, Optional, Any
+# Ed25519 keys need the cryptography package, RSA keys keep working without it
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+except ImportError:
+    serialization = None
+from typing import Dict, Tuple, Optional, Any, Callable, Union
+
+
+# Key algorithms of the users
+KEY_ALGORITHM_RSA = 'rsa-2048'
+KEY_ALGORITHM_ED25519 = 'ed25519'
+KEY_ALGORITHMS = (KEY_ALGORITHM_RSA, KEY_ALGORITHM_ED25519)
+DEFAULT_KEY_ALGORITHM = KEY_ALGORITHM_RSA
+
+
+# Number of parsed keys kept by each KeyCache
+DEFAULT_KEY_CACHE_SIZE = 4096
+
+
+class KeyCache:
+    """
+    Bounded LRU cache of the signer or verifier objects built from PEM keys,
+    so that each key is parsed once instead of on every signature.
+    Entries are keyed by the PEM string itself, a different key can never hit a stale entry.
+    """
+    def __init__(self, build: Callable[[str], Any], maxsize: int = DEFAULT_KEY_CACHE_SIZE):
+        self.build = build
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # PEM string -> built object
+        self._lock = threading.Lock()
+
+    def get(self, key_string: str) -> Any:
+        """
+        :param key_string: Key in PEM format
+        :return: Object built from the key
+        :raises ValueError: if the key cannot be parsed
+        """
+        with self._lock:
+            entry = self._entries.get(key_string)
+            if entry is not None:
+                self._entries.move_to_end(key_string)
+                return entry
+
+        # Parse outside the lock, other threads keep hitting the cache meanwhile
+        entry = self.build(key_string)
+        with self._lock:
+            self._entries[key_string] = entry
+            self._entries.move_to_end(key_string)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RsaScheme:
+    """
+    RSA-2048 signatures with PKCS#1 v1.5 over the SHA-256 of the message
+    """
+    algorithm = KEY_ALGORITHM_RSA
+
+    def __init__(self, key):
+        self._scheme = pkcs1_15.new(key)
+
+    def sign(self, message: bytes) -> bytes:
+        return self._scheme.sign(SHA256.new(message))
+
+    def verify(self, message: bytes, signature: bytes) -> None:
+        # Raises ValueError if the signature does not match
+        self._scheme.verify(SHA256.new(message), signature)
+
+
+class Ed25519Scheme:
+    """
+    Ed25519 signatures, the message is hashed by the scheme itself
+    """
+    algorithm = KEY_ALGORITHM_ED25519
+
+    def __init__(self, key):
+        self._key = key
+
+    def sign(self, message: bytes) -> bytes:
+        return self._key.sign(message)
+
+    def verify(self, message: bytes, signature: bytes) -> None:
+        try:
+            self._key.verify(signature, message)
+        except InvalidSignature:
+            raise ValueError("Invalid signature")
+
+
+def _load_ed25519(key_string: str, private: bool):
+    # The Ed25519 key of a PEM string, or None if it holds another kind of key.
+    # PKCS#1 RSA keys are told apart by their header line, the others by the key cryptography loads
+    if serialization is None or key_string.lstrip().startswith('-----BEGIN RSA '):
+        return None
+    try:
+        if private:
+            key = serialization.load_pem_private_key(key_string.encode('utf-8'), password=None)
+        else:
+            key = serialization.load_pem_public_key(key_string.encode('utf-8'))
+    except (ValueError, TypeError):
+        return None
+    return key if isinstance(key, (Ed25519PrivateKey, Ed25519PublicKey)) else None
+
+
+def load_signature_scheme(key_string: str, private: bool = False):
+    """
+    Signature scheme of a key, chosen from the kind of key the PEM string holds
+
+    :param key_string: Public or private key in PEM format
+    :param private: True for a private key
+    :return: RsaScheme or Ed25519Scheme
+    :raises ValueError: if the key cannot be parsed
+    """
+    key = _load_ed25519(key_string, private)
+    if key is not None:
+        return Ed25519Scheme(key)
+    return RsaScheme(RSA.import_key(key_string))
+
+
+def canonical_message(data: Dict[str, Any]) -> bytes:
+    """
+    Canonical encoding of the data of a transaction: the bytes that are signed.
+    A caller that signs or verifies the same data more than once encodes it once
+    and passes these bytes instead of the data.
+
+    :param data: Data to sign
+    :return: Encoded data
+    """
+    return json.dumps(data, sort_keys=True).encode('utf-8')
+
+
+def key_algorithm(public_key: str) -> str:
+    """
+    :param public_key: Public key in PEM format
+    :return: Algorithm of the key, one of KEY_ALGORITHMS
+    :raises ValueError: if the key cannot be parsed
+    """
+    return load_signature_scheme(public_key).algorithm
 
 
 class AuthenticationSystem:
@@ -21,14 +165,33 @@ class AuthenticationSystem:
     Authentication system for supply chain actors using public/private key cryptography
     """
     def __init__(self):
-        self.registered_users = {}  # username -> {public_key, role, organization}
+        self.registered_users = {}  # username -> {public_key, key_algorithm, role, organization}
+
+        # Parsed keys of the users, and of the private keys used to sign on their behalf
+        self.verifiers = KeyCache(load_signature_scheme)
+        self.signers = KeyCache(lambda key_string: load_signature_scheme(key_string, private=True))
     
-    def generate_key_pair(self) -> Tuple[str, str]:
+    def generate_key_pair(self, algorithm: str = DEFAULT_KEY_ALGORITHM) -> Tuple[str, str]:
         """
-        Generate a new RSA key pair
+        Generate a new key pair
         
+        :param algorithm: Key algorithm, one of KEY_ALGORITHMS
         :return: Tuple of (private_key_string, public_key_string)
         """
+        if algorithm == KEY_ALGORITHM_ED25519:
+            if serialization is None:
+                raise ValueError("Ed25519 keys require the cryptography package")
+            key = Ed25519PrivateKey.generate()
+            private_key = key.private_bytes(
+                serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+            ).decode('utf-8')
+            public_key = key.public_key().public_bytes(
+                serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+            ).decode('utf-8')
+            return private_key, public_key
+
+        if algorithm != KEY_ALGORITHM_RSA:
+            raise ValueError(f"Unknown key algorithm: {algorithm}, expected one of {KEY_ALGORITHMS}")
         key = RSA.generate(2048)
         private_key = key.export_key().decode('utf-8')
         public_key = key.publickey().export_key().decode('utf-8')
@@ -46,61 +209,59 @@ class AuthenticationSystem:
         """
         if username in self.registered_users:
             raise ValueError(f"Username '{username}' already exists")
+
+        # The algorithm is read from the key itself, which also warms the verifier cache
+        algorithm = self.verifiers.get(public_key).algorithm
         
         user_id = str(uuid.uuid4())
         self.registered_users[username] = {
             'user_id': user_id,
             'public_key': public_key,
+            'key_algorithm': algorithm,
             'role': role,
             'organization': organization
         }
         return user_id
     
-    def sign_data(self, private_key_string: str, data: Dict[str, Any]) -> str:
+    def sign_data(self, private_key_string: str, data: Union[Dict[str, Any], bytes]) -> str:
         """
         Sign data with a private key
         
         :param private_key_string: Private key in PEM format
-        :param data: Data to sign
+        :param data: Data to sign, or its canonical_message if already encoded
         :return: Base64 encoded signature
         """
-        # Convert data to canonical JSON string
-        data_string = json.dumps(data, sort_keys=True)
-        
-        # Import the private key
-        private_key = RSA.import_key(private_key_string)
+        # Convert data to canonical JSON, unless the caller already did
+        message = data if isinstance(data, bytes) else canonical_message(data)
         
-        # Create a hash of the data
-        h = SHA256.new(data_string.encode('utf-8'))
+        # Signer of the private key, parsed on first use. RSA or Ed25519 depending on the key
+        signer = self.signers.get(private_key_string)
         
-        # Sign the hash with the private key
-        signature = pkcs1_15.new(private_key).sign(h)
+        # Sign the data with the private key
+        signature = signer.sign(message)
         
         # Return the signature as base64
         return binascii.hexlify(signature).decode('ascii')
     
-    def verify_signature(self, public_key_string: str, data: Dict[str, Any], signature: str) -> bool:
+    def verify_signature(self, public_key_string: str, data: Union[Dict[str, Any], bytes], signature: str) -> bool:
         """
         Verify a signature with a public key
         
         :param public_key_string: Public key in PEM format
-        :param data: Original data that was signed
+        :param data: Original data that was signed, or its canonical_message if already encoded
         :param signature: Base64 encoded signature
         :return: True if verification succeeds, False otherwise
         """
         try:
-            # Convert data to canonical JSON string (same as in sign_data)
-            data_string = json.dumps(data, sort_keys=True)
-            
-            # Import the public key
-            public_key = RSA.import_key(public_key_string)
+            # Convert data to canonical JSON (same as in sign_data), unless the caller already did
+            message = data if isinstance(data, bytes) else canonical_message(data)
             
-            # Create a hash of the data
-            h = SHA256.new(data_string.encode('utf-8'))
+            # Verifier of the public key, parsed on first use. RSA or Ed25519 depending on the key
+            verifier = self.verifiers.get(public_key_string)
             
             # Verify the signature with the public key
             signature_bytes = binascii.unhexlify(signature)
-            pkcs1_15.new(public_key).verify(h, signature_bytes)
+            verifier.verify(message, signature_bytes)
             
             # If no exception is raised, verification succeeded
             return True
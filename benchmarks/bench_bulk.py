@@ -0,0 +1,75 @@
+"""
+Sustained throughput of bulk transaction ingestion: one transaction at a time as /transactions/new
+admits them, then in batches with the signatures checked across a pool of processes.
+
+Usage: python benchmarks/bench_bulk.py [transactions] [workers]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from block_producer import BlockProducer
+from bulk import SignatureVerifier
+from mempool import Mempool
+from supply_chain_blockchain import SupplyChainBlockchain
+
+LOCATION = {'latitude': 48.85, 'longitude': 2.35, 'address': '1 rue de Rivoli', 'country': 'FR', 'region': 'IDF'}
+
+
+def make_batch(blockchain: SupplyChainBlockchain, count: int, private_key: str, offset: int):
+    # Registrations of new products, then a transfer of each of them, signed by their producer
+    items = []
+    for n in range(offset, offset + count // 2):
+        data = {'product_id': f'PRD-{n:08d}', 'name': 'Coffee beans', 'description': 'Green coffee',
+                'category': 'food', 'producer_id': 'farmer', 'production_date': '2025-01-01',
+                'origin_location': LOCATION, 'certifications': [], 'batch_number': f'B-{n}', 'additional_info': {}}
+        items.append({'sender': 'farmer', 'transaction_type': 'product_registration', 'data': data,
+                      'signature': blockchain.auth_system.sign_data(private_key, data)})
+    for n in range(offset, offset + count // 2):
+        data = {'transfer_id': f'TRF-{n:08d}', 'product_id': f'PRD-{n:08d}', 'sender_id': 'farmer',
+                'sender_type': 'producer', 'recipient_id': 'retailer', 'recipient_type': 'retailer',
+                'timestamp': '2025-01-02T08:00:00', 'departure_location': LOCATION, 'arrival_location': None,
+                'estimated_arrival_time': None, 'transport_conditions': {}, 'status': 'in_transit',
+                'additional_info': {}}
+        items.append({'sender': 'farmer', 'transaction_type': 'transfer', 'data': data,
+                      'signature': blockchain.auth_system.sign_data(private_key, data)})
+    return items
+
+
+def run(blockchain: SupplyChainBlockchain, producer: BlockProducer, items, batched: bool):
+    start = time.perf_counter()
+    if batched:
+        results = producer.submit_batch(items)
+    else:
+        results = []
+        for item in items:
+            try:
+                with blockchain.lock:
+                    blockchain.new_transaction(item['sender'], item['transaction_type'], item['data'],
+                                               item['signature'])
+                results.append({'status': 'pending'})
+            except ValueError as e:
+                results.append({'status': 'rejected', 'error': str(e)})
+    elapsed = time.perf_counter() - start
+    assert all(result['status'] == 'pending' for result in results), results[:3]
+    return len(items) / elapsed
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+
+    blockchain = SupplyChainBlockchain(mempool=Mempool(capacity=4 * count))
+    private_key, public_key = blockchain.auth_system.generate_key_pair()
+    blockchain.auth_system.register_user('farmer', public_key, 'producer', 'Organic Farm Co.')
+    producer = BlockProducer(blockchain, verifier=SignatureVerifier(workers, blockchain.auth_system))
+
+    sequential = run(blockchain, producer, make_batch(blockchain, count, private_key, 0), batched=False)
+    batched = run(blockchain, producer, make_batch(blockchain, count, private_key, count), batched=True)
+    producer.verifier.close()
+
+    print(f"{count} transactions, {workers} verification workers")
+    print(f"one at a time: {sequential:10,.0f} tx/s")
+    print(f"bulk batch:    {batched:10,.0f} tx/s")
@@ -0,0 +1,105 @@
+"""
+Latency of the spatial queries: a scan computing the distance of every location, then the grid index.
+
+Usage: python benchmarks/bench_geo.py [products] [retail sales]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geo_index import GeoIndex, haversine_km
+
+# Production areas, as (latitude, longitude, spread in degrees)
+AREAS = [(48.8, 2.3, 3.0), (4.6, -74.1, 4.0), (-1.3, 36.8, 3.0), (35.0, 138.4, 2.0), (40.0, -100.0, 15.0)]
+
+
+def make_blocks(products: int, sales: int, seed: int = 1):
+    rng = random.Random(seed)
+
+    def location():
+        latitude, longitude, spread = rng.choice(AREAS)
+        return {'latitude': max(-90.0, min(90.0, rng.gauss(latitude, spread))),
+                'longitude': (rng.gauss(longitude, spread) + 180) % 360 - 180}
+
+    transactions = []
+    for n in range(products):
+        transactions.append({'transaction_type': 'product_registration', 'transaction_id': f'r{n}',
+                             'data': {'product_id': f'PRD-{n:08d}', 'producer_id': f'producer-{n % 5000}',
+                                      'origin_location': location()}})
+        transactions.append({'transaction_type': 'transfer', 'transaction_id': f't{n}',
+                             'data': {'product_id': f'PRD-{n:08d}', 'sender_id': f'producer-{n % 5000}',
+                                      'recipient_id': 'distributor', 'departure_location': location(),
+                                      'arrival_location': None}})
+    for n in range(sales):
+        transactions.append({'transaction_type': 'retail', 'transaction_id': f's{n}',
+                             'data': {'product_id': f'PRD-{n:08d}', 'retailer_id': f'retailer-{n % 2000}',
+                                      'location': location()}})
+    for start in range(0, len(transactions), 1000):
+        yield {'index': start // 1000 + 2, 'transactions': transactions[start:start + 1000]}
+
+
+def scan_radius(points, latitude, longitude, radius_km):
+    return [point for point in points if haversine_km(latitude, longitude, point[0], point[1]) <= radius_km]
+
+
+def scan_bbox(points, south, west, north, east):
+    return [point for point in points if south <= point[0] <= north and west <= point[1] <= east]
+
+
+def scan_nearest(points, latitude, longitude, count):
+    nearest = {}
+    for point in points:
+        distance = haversine_km(latitude, longitude, point[0], point[1])
+        if distance < nearest.get(point[4], float('inf')):
+            nearest[point[4]] = distance
+    return sorted(nearest.values())[:count]
+
+
+def timed(function, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = function()
+    return result, (time.perf_counter() - start) / rounds * 1e3
+
+
+if __name__ == '__main__':
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    sales = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+
+    index = GeoIndex()
+    start = time.perf_counter()
+    for block in make_blocks(products, sales):
+        index.add_block(block)
+    print(f"{products} products, {sales} sales indexed in {time.perf_counter() - start:.1f} s")
+
+    points = {kind: [point for cell in grid.values() for point in cell] for kind, grid in index.grids.items()}
+    queries = [
+        ('origins within 25 km of Paris',
+         lambda: scan_radius(points['origin'], 48.85, 2.35, 25),
+         lambda: index.within_radius('origin', 48.85, 2.35, 25)),
+        ('origins within 200 km of Nairobi',
+         lambda: scan_radius(points['origin'], -1.29, 36.82, 200),
+         lambda: index.within_radius('origin', -1.29, 36.82, 200)),
+        ('departures from a 1 x 1 degree box',
+         lambda: scan_bbox(points['departure'], 48.0, 2.0, 49.0, 3.0),
+         lambda: index.in_bbox('departure', 48.0, 2.0, 49.0, 3.0)),
+        ('5 nearest retailers to Lyon',
+         lambda: scan_nearest(points['retail'], 45.76, 4.84, 5),
+         lambda: index.nearest('retail', 45.76, 4.84, 5)),
+        ('5 nearest retailers to Reykjavik',
+         lambda: scan_nearest(points['retail'], 64.15, -21.94, 5),
+         lambda: index.nearest('retail', 64.15, -21.94, 5)),
+    ]
+
+    print(f"{'query':<38}{'results':>8}{'scan':>12}{'index':>12}")
+    for name, scan, query in queries:
+        expected, scanned = timed(scan, 1)
+        result, indexed = timed(query, 20)
+        if name.startswith('5 nearest'):
+            assert [round(distance, 6) for distance, _ in result] == [round(distance, 6) for distance in expected]
+        else:
+            assert len(result) == len(expected)
+        print(f"{name:<38}{len(result):>8}{scanned:>9.1f} ms{indexed:>9.2f} ms")
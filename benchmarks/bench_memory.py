@@ -0,0 +1,83 @@
+"""
+Memory held by sealed transactions: a list of plain dict blocks, as the chain used to be kept,
+then a ChainStore the same blocks are appended to (compact records, hashes and recent encodings).
+
+Usage: python benchmarks/bench_memory.py [transactions]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_store import ChainStore, encode_block
+from merkle import merkle_root
+from records import compact
+
+TRANSACTIONS_PER_BLOCK = 500
+
+
+def make_blocks(count: int):
+    # Transfers as new_transaction records them: fresh strings for every request, hex ids and RSA-2048 signature
+    start = datetime(2025, 1, 1)
+    blocks = []
+    for first in range(0, count, TRANSACTIONS_PER_BLOCK):
+        transactions = []
+        for n in range(first, min(first + TRANSACTIONS_PER_BLOCK, count)):
+            transactions.append({
+                'sender': ''.join(['distributor', '-', str(n % 50)]),
+                'transaction_type': ''.join(['trans', 'fer']),
+                'data': {
+                    ''.join(['product', '_id']): f'PRD-{n:08d}',
+                    ''.join(['sender', '_id']): ''.join(['distributor', '-', str(n % 50)]),
+                    ''.join(['recipient', '_id']): ''.join(['retailer', '-', str(n % 80)]),
+                    ''.join(['transfer', '_date']): (start + timedelta(seconds=n)).isoformat(),
+                },
+                'timestamp': (start + timedelta(seconds=n, microseconds=n % 997)).isoformat(),
+                'signature': os.urandom(256).hex(),
+                'transaction_id': uuid.uuid4().hex,
+            })
+        blocks.append({
+            'index': len(blocks) + 1,
+            'timestamp': (start + timedelta(seconds=first)).isoformat(),
+            'transactions': transactions,
+            'proof': 35293,
+            'previous_hash': os.urandom(32).hex(),
+            'merkle_root': merkle_root(transactions),
+        })
+    return blocks
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    scale = 1000000 / count
+
+    blocks, dict_size = measure(lambda: make_blocks(count))
+    assert all(encode_block(compact(block)) == encode_block(block) for block in blocks), "encoding changed"
+    del blocks
+
+    def build_store():
+        # The dicts a block is built from are released once it is appended
+        store = ChainStore()
+        for block in make_blocks(count):
+            store.append(block)
+        return store
+    _, store_size = measure(build_store)
+
+    print(f"{count} transactions, reported per million")
+    print(f"dict blocks:    {dict_size * scale / 2 ** 20:10,.0f} MiB")
+    print(f"ChainStore:     {store_size * scale / 2 ** 20:10,.0f} MiB")
+    print(f"reduction:      {dict_size / store_size:10.2f}x")
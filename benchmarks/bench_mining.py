@@ -0,0 +1,45 @@
+"""
+Hashes per second of the Proof of Work search, before and after the optimized kernel.
+
+Usage: python benchmarks/bench_mining.py [blocks]
+"""
+import hashlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mining import find_proof
+
+
+def legacy_proof_of_work(last_proof: int) -> int:
+    # The original loop: f-string, encode, new sha256 and full hexdigest per nonce
+    proof = 0
+    while hashlib.sha256(f'{last_proof}{proof}'.encode()).hexdigest()[:4] != "0000":
+        proof += 1
+    return proof
+
+
+def run(search, blocks: int):
+    last_proof = 100
+    hashes = 0
+    start = time.perf_counter()
+    for _ in range(blocks):
+        proof = search(last_proof)
+        hashes += proof + 1  # both searches try every nonce from 0 up to the proof
+        last_proof = proof
+    return hashes, time.perf_counter() - start, last_proof
+
+
+if __name__ == '__main__':
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    legacy_hashes, legacy_time, legacy_last = run(legacy_proof_of_work, blocks)
+    kernel_hashes, kernel_time, kernel_last = run(find_proof, blocks)
+    assert legacy_last == kernel_last, "kernel found a different proof"
+
+    print(f"{blocks} blocks, {legacy_hashes} hashes")
+    print(f"legacy valid_proof loop: {legacy_hashes / legacy_time:12,.0f} H/s")
+    print(f"prefix-state kernel:     {kernel_hashes / kernel_time:12,.0f} H/s")
+    print(f"speedup:                 {legacy_time / kernel_time:12.2f}x")
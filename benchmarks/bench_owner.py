@@ -0,0 +1,52 @@
+"""
+Cost of listing the products an actor owns: the original scan of every product, then the owner index.
+
+Usage: python benchmarks/bench_owner.py [products] [actors]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supply_chain_blockchain import SupplyChainBlockchain
+
+
+def populate(blockchain: SupplyChainBlockchain, products: int, actors: int) -> None:
+    # Registered by a single producer then handed out to the actors, applied straight to the products state
+    for n in range(products):
+        product_id = f'PRD-{n:08d}'
+        blockchain._apply_to_products({'transaction_type': 'product_registration', 'sender': 'farmer',
+                                       'data': {'product_id': product_id}, 'timestamp': '2025-01-01T00:00:00',
+                                       'transaction_id': f'r{n}'})
+        blockchain._apply_to_products({'transaction_type': 'transfer', 'sender': 'farmer',
+                                       'data': {'product_id': product_id, 'recipient_id': f'actor-{n % actors}'},
+                                       'timestamp': '2025-01-02T00:00:00', 'transaction_id': f't{n}'})
+
+
+def legacy_owned_products(blockchain: SupplyChainBlockchain, owner: str):
+    # The original loop of ui_transfer_product
+    return [product_id for product_id, details in blockchain.products.items() if details['current_owner'] == owner]
+
+
+def run(lookup, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        lookup()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+if __name__ == '__main__':
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    actors = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    blockchain = SupplyChainBlockchain()
+    populate(blockchain, products, actors)
+    owned = [product['product_id'] for product in blockchain.get_owned_products('actor-7')['products']]
+    assert owned == legacy_owned_products(blockchain, 'actor-7')
+
+    scan = run(lambda: legacy_owned_products(blockchain, 'actor-7'), 20)
+    indexed = run(lambda: blockchain.get_owned_products('actor-7'), 2000)
+    print(f"{products} products, {len(owned)} owned by the actor")
+    print(f"scan of all products: {scan:12,.1f} us")
+    print(f"owner index:          {indexed:12,.1f} us")
@@ -0,0 +1,84 @@
+"""
+Cost of validating and normalizing the data of a transaction, per transaction type:
+the original two passes through the dataclasses, then the compiled single-pass normalizers.
+
+Usage: python benchmarks/bench_schema.py [rounds]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supply_chain_model import (normalize_transaction, Location, Certification, ProductRegistration,
+                                ProcessingStep, TransferEvent, Quality, RetailEvent)
+
+LOCATION = {'latitude': 48.85, 'longitude': 2.35, 'address': '1 rue de Rivoli', 'country': 'FR', 'region': 'IDF'}
+CERTIFICATION = {'certification_type': 'organic', 'issuer': 'Ecocert', 'issue_date': '2024-01-01',
+                 'expiry_date': '2026-01-01', 'certification_id': 'C-1', 'additional_info': {}}
+
+PAYLOADS = {
+    'product_registration': {
+        'product_id': 'PRD-1', 'name': 'Coffee beans', 'description': 'Green coffee', 'category': 'food',
+        'producer_id': 'farmer', 'production_date': '2025-01-01', 'origin_location': LOCATION,
+        'certifications': [CERTIFICATION, CERTIFICATION], 'batch_number': 'B-1', 'additional_info': {}},
+    'processing': {
+        'process_id': 'PRC-1', 'product_id': 'PRD-1', 'actor_id': 'roaster', 'actor_type': 'processor',
+        'process_type': 'roasting', 'description': 'Medium roast', 'timestamp': '2025-01-02T08:00:00',
+        'location': LOCATION, 'inputs': ['PRD-1'], 'outputs': ['PRD-1'], 'certification_references': ['C-1'],
+        'additional_info': {}},
+    'transfer': {
+        'transfer_id': 'TRF-1', 'product_id': 'PRD-1', 'sender_id': 'farmer', 'sender_type': 'producer',
+        'recipient_id': 'retailer', 'recipient_type': 'retailer', 'timestamp': '2025-01-02T08:00:00',
+        'departure_location': LOCATION, 'arrival_location': LOCATION, 'estimated_arrival_time': None,
+        'transport_conditions': {'temperature': 18}, 'status': 'in_transit', 'additional_info': {}},
+    'quality_check': {
+        'quality_id': 'QC-1', 'product_id': 'PRD-1', 'inspector_id': 'inspector', 'timestamp': '2025-01-03T08:00:00',
+        'metrics': {'moisture': 11.5}, 'passed': True, 'notes': 'OK', 'additional_info': {}},
+    'retail': {
+        'retail_id': 'RTL-1', 'product_id': 'PRD-1', 'retailer_id': 'retailer', 'timestamp': '2025-01-04T08:00:00',
+        'location': LOCATION, 'price': 12.5, 'currency': 'EUR', 'additional_info': {}},
+}
+
+LEGACY_MODELS = {'product_registration': ProductRegistration, 'processing': ProcessingStep,
+                 'transfer': TransferEvent, 'quality_check': Quality, 'retail': RetailEvent}
+LEGACY_LOCATIONS = ('origin_location', 'location', 'departure_location', 'arrival_location')
+
+
+def legacy_factory(transaction_type: str, data):
+    # The original factory: nested dicts turned into dataclasses in place, then the whole model back to a dict
+    for field in LEGACY_LOCATIONS:
+        if isinstance(data.get(field), dict):
+            data[field] = Location(**data[field])
+    if isinstance(data.get('certifications'), list):
+        data['certifications'] = [cert if isinstance(cert, Certification) else Certification(**cert)
+                                  for cert in data['certifications']]
+    return LEGACY_MODELS[transaction_type](**data).to_dict()
+
+
+def legacy_ingest(transaction_type: str, data):
+    # new_transaction used to validate by running the factory once, then run it again for the stored data.
+    # The copy stands for the fresh payload of each request, the factory mutates it
+    data = dict(data)
+    legacy_factory(transaction_type, data)
+    return legacy_factory(transaction_type, data)
+
+
+def run(ingest, transaction_type: str, rounds: int) -> float:
+    data = PAYLOADS[transaction_type]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        ingest(transaction_type, data)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+if __name__ == '__main__':
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print(f"{'type':<22}{'two passes':>14}{'compiled':>14}")
+    for transaction_type in PAYLOADS:
+        assert legacy_ingest(transaction_type, PAYLOADS[transaction_type]) == \
+            normalize_transaction(transaction_type, PAYLOADS[transaction_type])
+        legacy = run(legacy_ingest, transaction_type, rounds)
+        compiled = run(normalize_transaction, transaction_type, rounds)
+        print(f"{transaction_type:<22}{legacy:11.2f} us{compiled:11.2f} us")
@@ -0,0 +1,97 @@
+"""
+Latency of product searches by attribute: a scan of every registration, then the search index.
+
+Usage: python benchmarks/bench_search.py [products]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import ProductSearchIndex
+
+WORDS = ['organic', 'coffee', 'beans', 'green', 'tea', 'cocoa', 'roasted', 'arabica', 'robusta', 'premium',
+         'fair', 'trade', 'dark', 'chocolate', 'vanilla', 'honey', 'olive', 'oil', 'rice', 'quinoa']
+CATEGORIES = ['food', 'clothing', 'cosmetics', 'furniture', 'electronics', 'other']
+CERTIFICATIONS = ['organic', 'fair_trade', 'rainforest_alliance', 'fsc', 'cradle_to_cradle']
+COUNTRIES = [('France', ['IDF', 'Bretagne', 'Occitanie']), ('Colombia', ['Huila', 'Cauca']),
+             ('Japan', ['Shizuoka', 'Kyoto']), ('Kenya', ['Nyeri', 'Kiambu'])]
+
+QUERIES = [
+    {'batch_number': 'B-2025-0424242'},
+    {'batch_number': 'B-2025-042424*'},
+    {'batch_number': 'B-2025-04*', 'country': 'France'},
+    {'name': '42424'},
+    {'name': 'vanilla honey', 'country': 'Kenya'},
+    {'producer': 'producer-77', 'certification_type': 'fsc'},
+    {'region': 'Kyoto', 'category': 'electronics', 'name': 'oil'},
+]
+
+
+def make_registrations(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    for n in range(count):
+        country, regions = rng.choice(COUNTRIES)
+        yield {'transaction_type': 'product_registration', 'sender': f'producer-{n % 5000}', 'data': {
+            'product_id': f'PRD-{n:08d}', 'name': f"{' '.join(rng.sample(WORDS, 3))} {n}",
+            'batch_number': f'B-2025-{n:07d}', 'category': rng.choice(CATEGORIES),
+            'certifications': [{'certification_type': rng.choice(CERTIFICATIONS)}],
+            'producer_id': f'producer-{n % 5000}',
+            'origin_location': {'country': country, 'region': rng.choice(regions)}}}
+
+
+def scan(documents, criteria):
+    # Without the index: test every registration against every criterion
+    def matches(document):
+        _, name, batch_number, category, certification_types, producer, country, region, _ = document
+        values = {'batch_number': batch_number, 'category': category, 'producer': producer,
+                  'country': country, 'region': region}
+        for field, query in criteria.items():
+            query = query.lower()
+            if field == 'name':
+                if query not in name.lower():
+                    return False
+            elif field == 'certification_type':
+                if query not in [value.lower() for value in certification_types]:
+                    return False
+            elif query.endswith('*'):
+                if not values[field].lower().startswith(query[:-1]):
+                    return False
+            elif values[field].lower() != query:
+                return False
+        return True
+    return [document for document in documents if matches(document)]
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    index = ProductSearchIndex()
+    start = time.perf_counter()
+    block = {'index': 2, 'transactions': []}
+    for tx in make_registrations(count):
+        block['transactions'].append(tx)
+        if len(block['transactions']) == 1000:
+            index.add_block(block)
+            block = {'index': block['index'] + 1, 'transactions': []}
+    index.add_block(block)
+    build = time.perf_counter() - start
+    documents = list(index.documents)
+    print(f"{count} products indexed in {build:.1f} s ({build / count * 1e6:.1f} us per registration)")
+
+    print(f"{'query':<70}{'results':>8}{'scan':>12}{'index':>12}")
+    for criteria in QUERIES:
+        start = time.perf_counter()
+        expected = scan(documents, criteria)
+        scanned = time.perf_counter() - start
+
+        rounds = 20
+        start = time.perf_counter()
+        for _ in range(rounds):
+            total, page = index.search(criteria, 0, 50)
+        searched = (time.perf_counter() - start) / rounds
+        assert total == len(expected)
+
+        print(f"{str(criteria):<70}{total:>8}{scanned * 1e3:>9.1f} ms{searched * 1e3:>9.2f} ms")
@@ -0,0 +1,40 @@
+"""
+Key generation, signing and verification throughput of the supported key algorithms.
+
+Usage: python benchmarks/bench_signatures.py [seconds per measure]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth import AuthenticationSystem, KEY_ALGORITHMS
+
+DATA = {'product_id': 'PRD-00000001', 'sender_id': 'farmer', 'recipient_id': 'retailer',
+        'transfer_id': 'TRF-00000001', 'status': 'in_transit'}
+
+
+def rate(operation, seconds: float) -> float:
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        operation()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    auth_system = AuthenticationSystem()
+
+    print(f"{'algorithm':<10} {'keygen/s':>10} {'sign/s':>10} {'verify/s':>10}")
+    for algorithm in KEY_ALGORITHMS:
+        private_key, public_key = auth_system.generate_key_pair(algorithm)
+        signature = auth_system.sign_data(private_key, DATA)
+        assert auth_system.verify_signature(public_key, DATA, signature)
+
+        keygen = rate(lambda: auth_system.generate_key_pair(algorithm), seconds)
+        sign = rate(lambda: auth_system.sign_data(private_key, DATA), seconds)
+        verify = rate(lambda: auth_system.verify_signature(public_key, DATA, signature), seconds)
+        print(f"{algorithm:<10} {keygen:10,.0f} {sign:10,.0f} {verify:10,.0f}")
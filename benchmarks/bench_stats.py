@@ -0,0 +1,61 @@
+"""
+Cost of the counters of a dashboard: counting the transactions of the whole chain on every load,
+then reading the counters kept up to date as blocks are sealed.
+
+Usage: python benchmarks/bench_stats.py [blocks] [transactions per block]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stats import SupplyChainStats
+
+
+def make_blocks(blocks: int, per_block: int):
+    # Registrations by 100 producers, each followed by a transfer to one of 20 distributors
+    chain = []
+    for index in range(blocks):
+        transactions = []
+        for n in range(per_block // 2):
+            producer, distributor = f'producer-{n % 100}', f'distributor-{n % 20}'
+            transactions.append({'transaction_type': 'product_registration', 'sender': producer,
+                                 'data': {'product_id': f'{index}-{n}'}})
+            transactions.append({'transaction_type': 'transfer', 'sender': producer,
+                                 'data': {'product_id': f'{index}-{n}', 'sender_type': 'producer',
+                                          'recipient_id': distributor, 'recipient_type': 'distributor'}})
+        chain.append({'index': index + 1, 'transactions': transactions})
+    return chain
+
+
+def scan_counters(chain, username: str):
+    # What the dashboard would do without the stats: count the transactions of every block
+    stats = SupplyChainStats()
+    for block in chain:
+        stats.add_block(block)
+    return stats.user(username)
+
+
+def run(lookup, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        lookup()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+if __name__ == '__main__':
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    per_block = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    chain = make_blocks(blocks, per_block)
+    stats = SupplyChainStats()
+    for block in chain:
+        stats.add_block(block)
+    assert stats.user('distributor-3') == scan_counters(chain, 'distributor-3')
+
+    scan = run(lambda: scan_counters(chain, 'distributor-3'), 3)
+    maintained = run(lambda: stats.user('distributor-3'), 10000)
+    print(f"{blocks} blocks of {per_block} transactions")
+    print(f"scan of the chain:   {scan:14,.1f} us")
+    print(f"maintained counters: {maintained:14,.1f} us")
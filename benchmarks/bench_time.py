@@ -0,0 +1,106 @@
+"""
+Latency of the time-range queries: a scan of every sealed transaction comparing their ISO timestamps,
+then the time index. Also times the sort of a product history, by ISO string and by integer timestamp.
+
+Usage: python benchmarks/bench_time.py [transactions]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import compact
+from time_index import TimeIndex, parse_time, transaction_time
+
+TYPES = ['product_registration', 'transfer', 'processing', 'quality_check', 'retail']
+START = parse_time('2025-01-01T00:00:00')
+
+
+def local_timestamp(micros: int) -> str:
+    # ISO timestamp in the local time of the node, as the transactions have them
+    return (datetime.fromtimestamp(micros // 1000000) + timedelta(microseconds=micros % 1000000)).isoformat()
+
+
+def make_blocks(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    micros = START
+    block = {'index': 2, 'transactions': []}
+    for n in range(count):
+        micros += rng.randrange(1, 60000000)
+        block['transactions'].append(compact({
+            'sender': f'actor-{n % 5000}', 'transaction_type': rng.choice(TYPES),
+            'data': {'product_id': f'PRD-{n // 5:08d}', 'recipient_id': f'actor-{(n * 7) % 5000}'},
+            'timestamp': local_timestamp(micros), 'signature': 'sig', 'transaction_id': f'tx{n}'}))
+        if len(block['transactions']) == 1000:
+            yield block
+            block = {'index': block['index'] + 1, 'transactions': []}
+    yield block
+
+
+def scan(blocks, since, until, transaction_type, actor, limit):
+    # Without the index: every transaction of the chain, then sorted by timestamp
+    since, until = local_timestamp(since), local_timestamp(until)
+    matches = []
+    for block in blocks:
+        for position, tx in enumerate(block['transactions']):
+            if not since <= tx['timestamp'] < until:
+                continue
+            if transaction_type is not None and tx['transaction_type'] != transaction_type:
+                continue
+            if actor is not None and actor not in (tx['sender'], tx['data'].get('recipient_id')):
+                continue
+            matches.append((tx['timestamp'], block['index'], position))
+    matches.sort()
+    return matches[:limit]
+
+
+def timed(function, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = function()
+    return result, (time.perf_counter() - start) / rounds * 1e3
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    blocks = list(make_blocks(count))
+    index = TimeIndex()
+    start = time.perf_counter()
+    for block in blocks:
+        index.add_block(block)
+    build = time.perf_counter() - start
+    print(f"{count} transactions indexed in {build:.1f} s ({build / count * 1e6:.1f} us per transaction)")
+
+    day = 86400 * 1000000
+    middle = START + count * 15 * 1000000
+    queries = [
+        ('one hour, first page', middle, middle + day // 24, None, None),
+        ('one day of transfers', middle, middle + day, 'transfer', None),
+        ('one week of an actor', middle, middle + 7 * day, None, 'actor-42'),
+        ('whole chain of an actor, retail', START, START + 400 * day, 'retail', 'actor-42'),
+    ]
+
+    print(f"{'query':<36}{'results':>8}{'scan':>12}{'index':>12}")
+    for name, since, until, transaction_type, actor in queries:
+        expected, scanned = timed(lambda: scan(blocks, since, until, transaction_type, actor, 50), 1)
+        (keys, _), indexed = timed(lambda: index.range(since, until, transaction_type, actor, None, 50), 200)
+        assert [key[1:] for key in keys] == [match[1:] for match in expected]
+        print(f"{name:<36}{len(keys):>8}{scanned:>9.1f} ms{indexed:>9.3f} ms")
+
+    # History of a product with many events, as get_product_history builds it
+    history = [{'timestamp': tx['timestamp'], 'transaction_id': tx['transaction_id']}
+               for block in blocks[:50] for tx in block['transactions']]
+    times = [transaction_time(tx) for block in blocks[:50] for tx in block['transactions']]
+    _, by_string = timed(lambda: sorted(history, key=lambda x: x['timestamp']), 20)
+
+    def by_integer():
+        if all(earlier <= later for earlier, later in zip(times, times[1:])):
+            return history
+        return [history[position] for position in sorted(range(len(history)), key=times.__getitem__)]
+    _, by_micros = timed(by_integer, 20)
+    print(f"history of {len(history)} events sorted by ISO string in {by_string:.2f} ms, "
+          f"by integer timestamp in {by_micros:.2f} ms")
@@ -0,0 +1,329 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Iterator
+
+from chain_store import ChainStore, encode_block, block_digest
+from records import compact
+
+
+# When the log is flushed to stable storage:
+#  - always: after every block, a sealed block survives a power loss
+#  - interval: fsync_interval seconds after the first block not yet synced, even if no other block follows,
+#    a crash loses at most that much
+#  - never: left to the operating system
+FSYNC_ALWAYS = 'always'
+FSYNC_INTERVAL = 'interval'
+FSYNC_NEVER = 'never'
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER)
+
+DEFAULT_FSYNC_INTERVAL = 1.0
+
+# Number of decoded blocks kept in memory by a PersistentChainStore
+DEFAULT_HOT_BLOCKS = 1024
+
+# Index entry of a block: offset and length of its encoding in the data file, and its SHA-256 digest
+_INDEX_ENTRY = struct.Struct('>QI32s')
+
+
+class BlockLog:
+    """
+    Append-only on-disk log of sealed blocks.
+
+    blocks.dat holds the canonical encodings of the blocks one after the other,
+    blocks.idx one fixed-size entry per block pointing into it. Both files are
+    memory-mapped for reading, so opening a log does not read the blocks.
+
+    Truncating the log only drops index entries: blocks.dat is never rewritten while the log is open,
+    so an encoding read from an entry captured earlier stays the one that entry pointed to.
+    The data of the dropped blocks stays behind (forks are short), unless it is at the end of
+    blocks.dat when the log is opened again.
+    """
+    def __init__(self, directory: str, fsync: str = FSYNC_INTERVAL,
+                 fsync_interval: float = DEFAULT_FSYNC_INTERVAL):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}, expected one of {FSYNC_POLICIES}")
+
+        os.makedirs(directory, exist_ok=True)
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._data = open(os.path.join(directory, 'blocks.dat'), 'a+b')
+        self._index = open(os.path.join(directory, 'blocks.idx'), 'a+b')
+        self._lock = threading.Lock()
+        self._data_map = None
+        self._index_map = None
+        self._last_sync = time.monotonic()
+        self._pending = False  # blocks were appended since the last sync
+        self._timer = None  # flush scheduled by the interval policy
+
+        self._count, self._end = self._recover()
+
+    def _recover(self) -> Tuple[int, int]:
+        # Drop whatever a crash left behind: a partial index entry, entries pointing past the data file
+        # or to data that was not completely written, and data no entry points to
+        count = os.fstat(self._index.fileno()).st_size // _INDEX_ENTRY.size
+        data_size = os.fstat(self._data.fileno()).st_size
+
+        end = 0
+        while count:
+            self._index.seek((count - 1) * _INDEX_ENTRY.size)
+            offset, length, digest = _INDEX_ENTRY.unpack(self._index.read(_INDEX_ENTRY.size))
+            if offset + length <= data_size:
+                self._data.seek(offset)
+                if self._intact(self._data.read(length), digest):
+                    end = offset + length
+                    break
+            count -= 1
+
+        self._index.truncate(count * _INDEX_ENTRY.size)
+        self._data.truncate(end)
+        return count, end
+
+    @staticmethod
+    def _intact(encoded: bytes, digest: bytes) -> bool:
+        # Whether the encoding of a block decodes and matches the digest of its index entry
+        try:
+            block = json.loads(encoded)
+        except ValueError:
+            return False
+        return isinstance(block, dict) and block_digest(block, encoded) == digest
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, encoded: bytes, digest: bytes) -> None:
+        """
+        Append a sealed block
+
+        :param encoded: Canonical encoding of the block
+        :param digest: SHA-256 digest of the block
+        :return: None
+        """
+        with self._lock:
+            self._data.write(encoded)
+            self._data.flush()
+            # The index entry is written last: a block is only part of the log once it is indexed
+            self._index.write(_INDEX_ENTRY.pack(self._end, len(encoded), digest))
+            self._index.flush()
+            self._end += len(encoded)
+            self._count += 1
+            self._maybe_sync()
+
+    def _maybe_sync(self) -> None:
+        # Called with the lock held
+        self._pending = True
+        if self.fsync == FSYNC_ALWAYS:
+            self._sync()
+        elif self.fsync == FSYNC_INTERVAL:
+            wait = self._last_sync + self.fsync_interval - time.monotonic()
+            if wait <= 0:
+                self._sync()
+            elif self._timer is None:
+                # The block must reach the disk once the interval has passed, even if the node stays idle
+                self._timer = threading.Timer(wait, self._flush_pending)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_pending(self) -> None:
+        with self._lock:
+            self._timer = None
+            if self._pending and not self._index.closed:
+                self._sync()
+
+    def _sync(self) -> None:
+        # Called with the lock held
+        os.fsync(self._data.fileno())
+        os.fsync(self._index.fileno())
+        self._last_sync = time.monotonic()
+        self._pending = False
+
+    def _entry(self, position: int) -> Tuple[int, int, bytes]:
+        # Called with the lock held. Maps are refreshed when the files grew past them
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError('block position out of range')
+
+        if self._index_map is None or len(self._index_map) < (position + 1) * _INDEX_ENTRY.size:
+            self._index_map = mmap.mmap(self._index.fileno(), 0, access=mmap.ACCESS_READ)
+        return _INDEX_ENTRY.unpack_from(self._index_map, position * _INDEX_ENTRY.size)
+
+    def read(self, position: int) -> bytes:
+        """
+        :param position: Position of the block (negative positions count from the tip)
+        :return: Canonical encoding of the block
+        """
+        with self._lock:
+            offset, length, _ = self._entry(position)
+            return self._read_data(offset, length)
+
+    def _read_data(self, offset: int, length: int) -> bytes:
+        # Called with the lock held
+        if self._data_map is None or len(self._data_map) < offset + length:
+            self._data_map = mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._data_map[offset:offset + length]
+
+    def read_range(self, begin: int, end: int) -> Iterator[bytes]:
+        """
+        Encodings of a range of blocks. The blocks of the range are the ones of the log when the call is made,
+        their encodings are then read one at a time, and are not affected if the log is truncated meanwhile.
+
+        :param begin: Position of the first block
+        :param end: Position after the last block
+        :return: Iterator over the encodings
+        """
+        with self._lock:
+            end = min(end, self._count)
+            if begin >= end:
+                return iter(())
+            self._entry(end - 1)  # refreshes the index map
+            entries = self._index_map[begin * _INDEX_ENTRY.size:end * _INDEX_ENTRY.size]
+        return self._read_entries(entries)
+
+    def _read_entries(self, entries: bytes) -> Iterator[bytes]:
+        for offset, length, _ in _INDEX_ENTRY.iter_unpack(entries):
+            with self._lock:
+                encoded = self._read_data(offset, length)
+            yield encoded
+
+    def digest(self, position: int) -> bytes:
+        """
+        :param position: Position of the block (negative positions count from the tip)
+        :return: SHA-256 digest of the block
+        """
+        with self._lock:
+            return self._entry(position)[2]
+
+    def truncate(self, count: int) -> None:
+        """
+        Drop every block after the first count ones
+
+        :param count: Number of blocks to keep
+        :return: None
+        """
+        with self._lock:
+            if count >= self._count:
+                return
+
+            # The index map must not outlive the part of the file it covers. The data is left in place
+            # for the readers of entries captured before, new blocks are appended after it
+            if self._index_map is not None:
+                self._index_map.close()
+                self._index_map = None
+            self._index.truncate(count * _INDEX_ENTRY.size)
+            self._count = count
+            self._sync()
+
+    def _close_maps(self) -> None:
+        for mapped in (self._data_map, self._index_map):
+            if mapped is not None:
+                mapped.close()
+        self._data_map = None
+        self._index_map = None
+
+    def close(self) -> None:
+        """
+        Flush and close the log
+
+        :return: None
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._close_maps()
+            self._sync()
+            self._data.close()
+            self._index.close()
+
+
+class PersistentChainStore(ChainStore):
+    """
+    ChainStore backed by a BlockLog. Sealed blocks are appended to the log,
+    and read back lazily: only the most recently used blocks are kept decoded in memory.
+    """
+    def __init__(self, log: BlockLog, hot_blocks: int = DEFAULT_HOT_BLOCKS):
+        super().__init__()
+        self.log = log
+        self.hot_blocks = hot_blocks
+        self._hot = OrderedDict()  # position -> decoded block
+        self._hot_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.log)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[p] for p in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+
+        with self._hot_lock:
+            block = self._hot.get(position)
+            if block is not None:
+                self._hot.move_to_end(position)
+                return block
+
+        block = compact(json.loads(self.log.read(position)))
+        self._remember(position, block)
+        return block
+
+    def __iter__(self):
+        return (self[position] for position in range(len(self)))
+
+    def _remember(self, position: int, block: Dict[str, Any]) -> None:
+        with self._hot_lock:
+            self._hot[position] = block
+            self._hot.move_to_end(position)
+            while len(self._hot) > self.hot_blocks:
+                self._hot.popitem(last=False)
+
+    def append(self, block: Dict[str, Any]) -> str:
+        encoded = encode_block(block)
+        digest = block_digest(block, encoded)
+        self._append_encoded(block, encoded, digest)
+        return digest.hex()
+
+    def _append_encoded(self, block: Dict[str, Any], encoded: bytes, digest: bytes) -> None:
+        position = len(self.log)
+        self.log.append(encoded, digest)
+        self._remember(position, compact(block))
+
+    def hash_at(self, position: int) -> str:
+        return self.log.digest(position).hex()
+
+    def encoded_at(self, position: int) -> bytes:
+        return self.log.read(position)
+
+    def encoded_range(self, begin: int, end: int):
+        # The range is captured now and read lazily from the memory-mapped log,
+        # so that long ranges are never held in memory
+        return self.log.read_range(begin, end)
+
+    def extend(self, other: ChainStore) -> None:
+        for position in range(len(other)):
+            self._append_encoded(other[position], other.encoded_at(position),
+                                 bytes.fromhex(other.hash_at(position)))
+
+    def truncate(self, length: int) -> None:
+        self.log.truncate(length)
+        with self._hot_lock:
+            for position in [p for p in self._hot if p >= length]:
+                del self._hot[position]
+
+
+def open_chain_store(data_dir: Optional[str], fsync: str = FSYNC_INTERVAL) -> ChainStore:
+    """
+    Chain storage of a node: in memory only, or persisted in a block log
+
+    :param data_dir: Directory of the block log, None to keep the chain in memory only
+    :param fsync: fsync policy of the block log
+    :return: ChainStore
+    """
+    if data_dir is None:
+        return ChainStore()
+    return PersistentChainStore(BlockLog(data_dir, fsync))
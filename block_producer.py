@@ -0,0 +1,224 @@
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Union
+
+from auth import canonical_message
+from bulk import SignatureVerifier
+
+
+# Number of transaction statuses kept for polling
+MAX_TRACKED_TRANSACTIONS = 100000
+
+# Number of transactions of a batch admitted per acquisition of the chain lock,
+# so that sealing and the other writers are not held up by a large batch
+ADMIT_CHUNK_SIZE = 500
+
+
+class BlockProducer:
+    """
+    Background service that admits queued transactions into the blockchain
+    and seals the pending ones into blocks.
+
+    Request handlers only enqueue work and return a transaction ID that can be polled;
+    a single producer thread validates the transactions in submission order and mines the blocks.
+    """
+    def __init__(self, blockchain, poll_interval: float = 0.5, verifier: Optional[SignatureVerifier] = None):
+        self.blockchain = blockchain
+        self.poll_interval = poll_interval
+        # Checks the signatures of batches, see submit_batch
+        self.verifier = verifier or SignatureVerifier(workers=1, auth_system=blockchain.auth_system)
+        self.jobs = queue.Queue()
+        self.statuses = OrderedDict()  # transaction_id -> status
+        self._statuses_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Start the producer thread
+
+        :return: None
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='block-producer', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the producer thread once the current job is done
+
+        :return: None
+        """
+        self._stopped.set()
+        self.jobs.put(None)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, sender: str, transaction_type: str, data: Dict[str, Any], signature: str,
+               message: Optional[bytes] = None) -> str:
+        """
+        Queue a transaction to be validated and included in a future block
+
+        :param sender: Identity of the sender (username or public key)
+        :param transaction_type: Type of transaction
+        :param data: Transaction-specific data
+        :param signature: Cryptographic signature of the data
+        :param message: Canonical encoding of data, if the caller already built it to sign the data
+        :return: ID of the transaction, to poll with get_status
+        """
+        transaction_id = str(uuid.uuid4()).replace('-', '')
+        self._set_status(transaction_id, {'status': 'queued'})
+        self.jobs.put((transaction_id, sender, transaction_type, data, signature, message))
+        return transaction_id
+
+    def submit_batch(self, items: List[Union[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+        """
+        Validate a batch of transactions and add the valid ones to the mempool, on the calling thread.
+        Signatures are checked in parallel by the verifier, then the checks that depend on the
+        products state (ownership, duplicate registrations) are applied in the order of the batch.
+
+        :param items: Transactions with sender, transaction_type, data and signature,
+                      or the reason an item could not be read (see bulk.parse_bulk_body)
+        :return: Status of each item, as returned by get_status
+        """
+        results = [None] * len(items)
+        candidates = []  # (position, transaction_id, item, public_key)
+
+        for position, item in enumerate(items):
+            transaction_id = str(uuid.uuid4()).replace('-', '')
+            if isinstance(item, str):
+                results[position] = self._reject(transaction_id, item)
+                continue
+            if not isinstance(item['sender'], str):
+                results[position] = self._reject(transaction_id, 'Invalid sender')
+                continue
+            sender_info = self.blockchain.auth_system.get_user_info(item['sender'])
+            if not sender_info:
+                results[position] = self._reject(transaction_id, f"Unknown sender: {item['sender']}")
+                continue
+            candidates.append((position, transaction_id, item, sender_info['public_key']))
+
+        # The RSA operations are the expensive part, and do not depend on the order.
+        # The workers receive the signed bytes, smaller to send than the data and with nothing left to encode
+        valid = self.verifier.verify([(public_key, canonical_message(item['data']), item['signature'])
+                                      for _, _, item, public_key in candidates])
+
+        for start in range(0, len(candidates), ADMIT_CHUNK_SIZE):
+            with self.blockchain.lock:
+                for (position, transaction_id, item, _), signature_ok in zip(
+                        candidates[start:start + ADMIT_CHUNK_SIZE], valid[start:start + ADMIT_CHUNK_SIZE]):
+                    if not signature_ok:
+                        results[position] = self._reject(transaction_id, 'Invalid signature')
+                        continue
+                    try:
+                        index = self.blockchain.new_transaction(
+                            item['sender'], item['transaction_type'], item['data'], item['signature'],
+                            transaction_id=transaction_id, signature_verified=True
+                        )
+                    except Exception as e:
+                        results[position] = self._reject(transaction_id, str(e))
+                        continue
+                    status = {'status': 'pending', 'block_index': index}
+                    self._set_status(transaction_id, status)
+                    results[position] = dict(status, transaction_id=transaction_id)
+
+        return results
+
+    def _reject(self, transaction_id: str, error: str) -> Dict[str, Any]:
+        status = {'status': 'rejected', 'error': error}
+        self._set_status(transaction_id, status)
+        return dict(status, transaction_id=transaction_id)
+
+    def get_status(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the status of a submitted transaction:
+        'queued', 'pending' (in the mempool), 'confirmed' (sealed in a block) or 'rejected'
+
+        :param transaction_id: ID returned by submit
+        :return: Status or None if the transaction is unknown
+        """
+        with self._statuses_lock:
+            status = self.statuses.get(transaction_id)
+            return dict(status, transaction_id=transaction_id) if status else None
+
+    def _set_status(self, transaction_id: str, status: Dict[str, Any]) -> None:
+        with self._statuses_lock:
+            self.statuses[transaction_id] = status
+            self.statuses.move_to_end(transaction_id)
+            while len(self.statuses) > MAX_TRACKED_TRANSACTIONS:
+                self.statuses.popitem(last=False)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._admit_queued()
+
+            # Seal once the mempool reached its block size or its oldest transaction its max latency
+            with self.blockchain.lock:
+                ready = self.blockchain.mempool.ready()
+            if ready:
+                self._seal()
+
+    def _admit_queued(self) -> None:
+        # Wait for a first job, but no longer than the mempool can wait before sealing,
+        # then admit everything already queued so it shares the next block
+        with self.blockchain.lock:
+            until_ready = self.blockchain.mempool.seconds_until_ready()
+        timeout = self.poll_interval if until_ready is None else min(until_ready, self.poll_interval)
+
+        try:
+            job = self.jobs.get(timeout=timeout)
+        except queue.Empty:
+            return
+
+        while job is not None:
+            self._admit(*job)
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                job = None
+
+    def _admit(self, transaction_id: str, sender: str, transaction_type: str,
+               data: Dict[str, Any], signature: str, message: Optional[bytes]) -> None:
+        try:
+            with self.blockchain.lock:
+                index = self.blockchain.new_transaction(
+                    sender, transaction_type, data, signature, transaction_id=transaction_id, message=message
+                )
+            self._set_status(transaction_id, {'status': 'pending', 'block_index': index})
+        except Exception as e:
+            # A bad transaction must never take the producer thread down
+            self._set_status(transaction_id, {'status': 'rejected', 'error': str(e)})
+
+    def _seal(self) -> None:
+        with self.blockchain.lock:
+            last_proof = self.blockchain.last_block['proof']
+            last_hash = self.blockchain.last_block_hash
+
+        # Mine without holding the lock so that handlers can keep reading the chain
+        proof = self.blockchain.proof_of_work(last_proof)
+        if proof is None:
+            return
+
+        with self.blockchain.lock:
+            # Another block was forged or the chain was replaced while we were mining.
+            # The tip is compared by hash: a persisted chain may decode it again as a new object
+            if self.blockchain.last_block_hash != last_hash:
+                return
+            block = self.blockchain.new_block(proof)
+
+        self.confirm_block(block)
+
+    def confirm_block(self, block: Dict[str, Any]) -> None:
+        """
+        Mark the transactions of a sealed block as confirmed.
+        Called for the blocks sealed by the producer and by the other mining paths.
+
+        :param block: Sealed block
+        :return: None
+        """
+        for tx in block['transactions']:
+            self._set_status(tx['transaction_id'], {'status': 'confirmed', 'block_index': block['index']})
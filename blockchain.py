@@ -1,22 +1,35 @@
-import hashlib
-import json
 import time
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import uuid
-import requests
 from urllib.parse import urlparse
+from mining import ParallelMiner, find_proof, valid_proof
+from peers import PeerClient
+from sync import sync_longest_chain
+from chain_store import ChainStore, block_digest, verify_chain, verify_links
+from merkle import merkle_root
+from block_log import open_chain_store, FSYNC_INTERVAL
 
 
 class Blockchain:
-    def __init__(self):
+    def __init__(self, mining_workers: int = 1, data_dir: Optional[str] = None, fsync: str = FSYNC_INTERVAL):
         # Initialize blockchain attributes
-        self.chain = []
+        # Sealed blocks are kept in memory, or in a block log under data_dir that survives restarts
+        self.chain = open_chain_store(data_dir, fsync)
         self.current_transactions = []
         self.nodes = set()
 
-        # Create the genesis block
-        self.new_block(previous_hash=1, proof=100)
+        # Client used to fetch the chains of the other nodes, and the outcome of the last round
+        self.peer_client = PeerClient()
+        self.peer_report = {}
+
+        # Number of processes used by proof_of_work (1 mines on the calling thread)
+        self.mining_workers = mining_workers
+        self._miner = None
+
+        # Create the genesis block, unless the chain was restored from the block log
+        if len(self.chain) == 0:
+            self.new_block(previous_hash=1, proof=100)
 
     def register_node(self, address: str) -> None:
         """
@@ -28,60 +41,37 @@ class Blockchain:
         parsed_url = urlparse(address)
         self.nodes.add(parsed_url.netloc)
 
-    def valid_chain(self, chain: List[Dict[str, Any]]) -> bool:
+    def valid_chain(self, chain: List[Dict[str, Any]], verify: bool = True) -> bool:
         """
         Determine if a given blockchain is valid
         
         :param chain: A blockchain
+        :param verify: Recompute the hash of every block. Only a ChainStore of blocks
+                       sealed by this node can be checked with its cached hashes instead
         :return: True if valid, False if not
         """
-        last_block = chain[0]
-        current_index = 1
-
-        while current_index < len(chain):
-            block = chain[current_index]
-            # Check that the hash of the block is correct
-            if block['previous_hash'] != self.hash(last_block):
-                return False
-
-            # Check that the Proof of Work is correct
-            if not self.valid_proof(last_block['proof'], block['proof']):
-                return False
+        if not verify and isinstance(chain, ChainStore):
+            return verify_links(chain, self.valid_proof)
 
-            last_block = block
-            current_index += 1
-
-        return True
+        return verify_chain(chain, self.valid_proof) is not None
 
     def resolve_conflicts(self) -> bool:
         """
         This is our Consensus Algorithm, it resolves conflicts
         by replacing our chain with the longest one in the network.
+        Only the tips of the peers and the blocks we are missing are downloaded,
+        and the outcome for each peer is kept in peer_report.
         
         :return: True if our chain was replaced, False if not
         """
-        neighbours = self.nodes
-        new_chain = None
-
-        # We're only looking for chains longer than ours
-        max_length = len(self.chain)
-
-        # Grab and verify the chains from all the nodes in our network
-        for node in neighbours:
-            response = requests.get(f'http://{node}/chain')
-
-            if response.status_code == 200:
-                length = response.json()['length']
-                chain = response.json()['chain']
+        best, self.peer_report = sync_longest_chain(self.peer_client, self.nodes, self.chain, self.valid_proof)
 
-                # Check if the length is longer and the chain is valid
-                if length > max_length and self.valid_chain(chain):
-                    max_length = length
-                    new_chain = chain
-
-        # Replace our chain if we discovered a new, valid chain longer than ours
-        if new_chain:
-            self.chain = new_chain
+        # Replace the divergent part of our chain with the longer valid chain we discovered
+        if best:
+            node, fork, suffix = best
+            self.chain.truncate(fork)
+            self.chain.extend(suffix)
+            self.peer_report[node]['chain'] = 'adopted'
             return True
 
         return False
@@ -99,7 +89,9 @@ class Blockchain:
             'timestamp': datetime.now().isoformat(),
             'transactions': self.current_transactions,
             'proof': proof,
-            'previous_hash': previous_hash or self.hash(self.chain[-1]),
+            'previous_hash': previous_hash or self.chain.hash_at(-1),
+            # The hash of the block covers the transactions through their Merkle root
+            'merkle_root': merkle_root(self.current_transactions),
         }
 
         # Reset the current list of transactions
@@ -136,17 +128,25 @@ class Blockchain:
         """
         return self.chain[-1]
 
+    @property
+    def last_block_hash(self) -> str:
+        """
+        Returns the hash of the last Block, cached when it was sealed
+        
+        :return: Hash string
+        """
+        return self.chain.hash_at(-1)
+
     @staticmethod
     def hash(block: Dict[str, Any]) -> str:
         """
-        Creates a SHA-256 hash of a Block
+        Creates a SHA-256 hash of a Block.
+        Sealed blocks of the chain have their hash cached, see last_block_hash and ChainStore.hash_at
         
         :param block: Block
         :return: Hash string
         """
-        # We must make sure that the Dictionary is Ordered, or we'll have inconsistent hashes
-        block_string = json.dumps(block, sort_keys=True).encode()
-        return hashlib.sha256(block_string).hexdigest()
+        return block_digest(block).hex()
 
     def proof_of_work(self, last_proof: int) -> int:
         """
@@ -157,21 +157,20 @@ class Blockchain:
         :param last_proof: <int>
         :return: <int>
         """
-        proof = 0
-        while self.valid_proof(last_proof, proof) is False:
-            proof += 1
+        if self.mining_workers > 1:
+            if self._miner is None:
+                self._miner = ParallelMiner(self.mining_workers)
+            return self._miner.proof_of_work(last_proof)
 
-        return proof
+        return find_proof(last_proof)
 
     @staticmethod
     def valid_proof(last_proof: int, proof: int) -> bool:
         """
-        Validates the Proof: Does hash(last_proof, proof) contain 4 leading zeroes?
+        Validates the Proof: Does hash(last_proof, proof) contain 4 leading zeroes? See mining.valid_proof
         
         :param last_proof: <int> Previous Proof
         :param proof: <int> Current Proof
         :return: <bool> True if correct, False if not.
         """
-        guess = f'{last_proof}{proof}'.encode()
-        guess_hash = hashlib.sha256(guess).hexdigest()
-        return guess_hash[:4] == "0000"
+        return valid_proof(last_proof, proof)
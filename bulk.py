@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+from auth import AuthenticationSystem
+
+
+# Fields every transaction of a batch must have
+REQUIRED_FIELDS = ('sender', 'transaction_type', 'data', 'signature')
+
+# Maximum number of transactions accepted in one bulk request
+MAX_BULK_ITEMS = 50000
+
+# Number of signatures handed to a worker process in one task
+VERIFY_CHUNK_SIZE = 64
+
+# Set in each worker process on first use, to keep its parsed keys between tasks
+_auth_system = None
+
+# Stands for an NDJSON line that could not be parsed, until the items are checked
+_MALFORMED = object()
+
+
+def parse_bulk_body(body: bytes, ndjson: bool) -> List[Union[Dict[str, Any], str]]:
+    """
+    Parse the body of a bulk request: a JSON array of transactions, or one transaction per line (NDJSON)
+
+    :param body: Raw request body
+    :param ndjson: True if the body is NDJSON
+    :return: For each item, the transaction or the reason it was rejected
+    :raises ValueError: if the body as a whole cannot be read
+    """
+    if ndjson:
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                # One bad line only rejects its own transaction
+                items.append(_MALFORMED)
+    else:
+        items = json.loads(body)
+        if not isinstance(items, list):
+            raise ValueError('Expected a JSON array of transactions')
+
+    if len(items) > MAX_BULK_ITEMS:
+        raise ValueError(f'Too many transactions, at most {MAX_BULK_ITEMS} per request')
+
+    return [_check_item(item) for item in items]
+
+
+def _check_item(item: Any) -> Union[Dict[str, Any], str]:
+    # The transaction, or the reason it is rejected. Reasons are fixed strings, never parts of the request
+    if item is _MALFORMED:
+        return 'Malformed JSON'
+    if not isinstance(item, dict):
+        return 'Expected a JSON object'
+    if not all(k in item for k in REQUIRED_FIELDS):
+        return 'Missing values'
+    return item
+
+
+def _verify_chunk(chunk: List[Tuple[str, Union[Dict[str, Any], bytes], str]]) -> List[bool]:
+    """
+    Task of the worker processes: check a chunk of (public_key, data or its canonical_message, signature)
+    """
+    global _auth_system
+    if _auth_system is None:
+        _auth_system = AuthenticationSystem()
+    return [_auth_system.verify_signature(public_key, data, signature) for public_key, data, signature in chunk]
+
+
+class SignatureVerifier:
+    """
+    Checks the signatures of a batch of transactions across a pool of worker processes.
+    With a single worker, signatures are checked on the calling thread.
+    """
+    def __init__(self, workers: Optional[int] = None, auth_system: Optional[AuthenticationSystem] = None,
+                 chunk_size: int = VERIFY_CHUNK_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.auth_system = auth_system or AuthenticationSystem()
+        self.chunk_size = chunk_size
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def verify(self, items: List[Tuple[str, Union[Dict[str, Any], bytes], str]]) -> List[bool]:
+        """
+        :param items: (public_key, data or its canonical_message, signature) of each transaction
+        :return: For each item, True if the signature is valid
+        """
+        # Small batches are not worth the round trip to the workers
+        if self.workers <= 1 or len(items) <= self.chunk_size:
+            return [self.auth_system.verify_signature(*item) for item in items]
+
+        # The pool is created lazily and shared by concurrent requests
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        chunks = [items[start:start + self.chunk_size] for start in range(0, len(items), self.chunk_size)]
+        results = []
+        for chunk_results in self._executor.map(_verify_chunk, chunks):
+            results.extend(chunk_results)
+        return results
+
+    def close(self) -> None:
+        """
+        Shut down the worker processes
+
+        :return: None
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
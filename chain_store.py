@@ -0,0 +1,239 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional, Iterable, Iterator, Sequence, Tuple
+
+from records import compact, as_dict
+from merkle import merkle_root
+
+
+# Fields of a block header, the part of the block its hash is computed from.
+# The transactions are committed to by the Merkle root
+HEADER_FIELDS = ('index', 'timestamp', 'proof', 'previous_hash', 'merkle_root')
+
+# Size of the canonical encodings of recently sealed blocks kept in memory by a ChainStore
+RECENT_ENCODED_BYTES = 8 * 2 ** 20
+
+
+def encode_block(block: Dict[str, Any]) -> bytes:
+    """
+    Canonical encoding of a Block, as it is stored and sent to the peers
+
+    :param block: Block
+    :return: Encoded block
+    """
+    # We must make sure that the Dictionary is Ordered, or we'll have inconsistent hashes.
+    # Compact blocks and transactions are encoded through their dict form, so their hash does not change
+    return json.dumps(block, sort_keys=True, default=as_dict).encode()
+
+
+def block_header(block: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    :param block: Block, or a header with extra fields such as the ones of /chain/headers
+    :return: Header of the block
+    """
+    return {field: block[field] for field in HEADER_FIELDS}
+
+
+def block_digest(block: Dict[str, Any], encoded: Optional[bytes] = None) -> bytes:
+    """
+    SHA-256 digest identifying a block: the hash of its header only.
+    Blocks sealed before Merkle roots were introduced have no merkle_root,
+    and are identified by the hash of their whole encoding as they were then.
+
+    :param block: Block or header
+    :param encoded: Encoding of the block, if already known
+    :return: Digest of the block
+    """
+    if 'merkle_root' in block:
+        return hashlib.sha256(encode_block(block_header(block))).digest()
+    return hashlib.sha256(encoded if encoded is not None else encode_block(block)).digest()
+
+
+class ChainStore:
+    """
+    Sealed blocks of a chain. The hash of each block is computed once when it is appended,
+    sealed blocks never change afterwards. Blocks are kept in their compact form (see records.Block).
+    The canonical encodings of the most recent blocks are kept too, the ones the peers syncing
+    the tip ask for; older blocks are encoded again when requested.
+    """
+    def __init__(self, blocks: Iterable[Dict[str, Any]] = (), recent_bytes: int = RECENT_ENCODED_BYTES):
+        self._blocks = []
+        self._hashes = []
+        self.recent_bytes = recent_bytes
+        self._recent = OrderedDict()  # position -> canonical encoding, oldest first
+        self._recent_size = 0
+        for block in blocks:
+            self.append(block)
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def __getitem__(self, position):
+        return self._blocks[position]
+
+    def __iter__(self):
+        return iter(self._blocks)
+
+    def _remember(self, position: int, encoded: bytes) -> None:
+        # Positions are remembered in increasing order, so the first ones are the oldest
+        self._recent[position] = encoded
+        self._recent_size += len(encoded)
+        while self._recent_size > self.recent_bytes:
+            self._recent_size -= len(self._recent.popitem(last=False)[1])
+
+    def append(self, block: Dict[str, Any]) -> str:
+        """
+        Seal a block at the end of the chain
+
+        :param block: Block
+        :return: Hash of the block
+        """
+        encoded = encode_block(block)
+        block_hash = block_digest(block, encoded).hex()
+        self._blocks.append(compact(block))
+        self._hashes.append(block_hash)
+        self._remember(len(self._blocks) - 1, encoded)
+        return block_hash
+
+    def hash_at(self, position: int) -> str:
+        """
+        :param position: Position of the block in the chain (0 is the genesis block, -1 the tip)
+        :return: Cached hash of the block
+        """
+        return self._hashes[position]
+
+    def encoded_at(self, position: int) -> bytes:
+        """
+        :param position: Position of the block in the chain
+        :return: Canonical encoding of the block
+        """
+        if position < 0:
+            position += len(self._blocks)
+        block = self._blocks[position]
+        encoded = self._recent.get(position)
+        return encoded if encoded is not None else encode_block(block)
+
+    def encoded_range(self, begin: int, end: int) -> Iterator[bytes]:
+        """
+        Canonical encodings of a range of blocks, encoded one at a time as they are consumed.
+        The blocks of the range are captured now, it stays valid if the chain changes afterwards.
+
+        :param begin: Position of the first block
+        :param end: Position after the last block
+        :return: Iterator over the encoded blocks
+        """
+        blocks = self._blocks[begin:end]
+        recent = {position - begin: encoded for position, encoded in self._recent.items()
+                  if begin <= position < end}
+        return (recent[offset] if offset in recent else encode_block(block)
+                for offset, block in enumerate(blocks))
+
+    def extend(self, other: 'ChainStore') -> None:
+        """
+        Append the blocks of another store, reusing their cached hashes
+        and the encodings of the blocks that end up among the most recent ones
+
+        :param other: Blocks that follow the current tip
+        :return: None
+        """
+        start = len(self._blocks)
+        for position in range(len(other)):
+            self._blocks.append(other[position])
+            self._hashes.append(other.hash_at(position))
+        # Walk back from the tip until the encodings fill the cache, the older ones would be evicted anyway
+        encodings = []
+        size = 0
+        for position in range(len(other) - 1, -1, -1):
+            encoded = other.encoded_at(position)
+            size += len(encoded)
+            if size > self.recent_bytes:
+                break
+            encodings.append((start + position, encoded))
+        for position, encoded in reversed(encodings):
+            self._remember(position, encoded)
+
+    def truncate(self, length: int) -> None:
+        """
+        Drop every block after the first length ones
+
+        :param length: Number of blocks to keep
+        :return: None
+        """
+        del self._blocks[length:]
+        del self._hashes[length:]
+        for position in [p for p in self._recent if p >= length]:
+            self._recent_size -= len(self._recent.pop(position))
+
+
+def verify_chain(chain: Iterable[Dict[str, Any]], valid_proof: Callable[[int, int], bool],
+                 parent: Optional[Tuple[str, int]] = None) -> Optional[ChainStore]:
+    """
+    Validate an untrusted chain, typically received from a peer.
+    Each block is encoded and hashed exactly once and the results are kept,
+    so that an accepted chain does not have to be hashed again.
+    The Merkle root of a block is checked against its transactions when the body is present,
+    a chain of headers only is checked for its links and Proofs of Work.
+
+    :param chain: A blockchain or a chain of headers, or the part of it that follows the parent block
+    :param valid_proof: Proof of Work check of the chain
+    :param parent: (hash, proof) of the block the first block must link to, None if it is a genesis block
+    :return: The validated blocks as a ChainStore, or None if they are invalid
+    """
+    store = ChainStore()
+    last_hash, last_proof = parent if parent is not None else (None, None)
+    for block in chain:
+        if last_hash is not None:
+            # Check that the hash of the block is correct
+            if block['previous_hash'] != last_hash:
+                return None
+
+            # Check that the Proof of Work is correct
+            if not valid_proof(last_proof, block['proof']):
+                return None
+
+        # Check that the header commits to the transactions of the block
+        if 'transactions' in block and 'merkle_root' in block \
+                and merkle_root(block['transactions']) != block['merkle_root']:
+            return None
+
+        last_hash = store.append(block)
+        last_proof = block['proof']
+
+    return store
+
+
+def find_fork_point(store: ChainStore, chain: Sequence[Dict[str, Any]], offset: int = 0) -> int:
+    """
+    Find the first position at which a peer chain diverges from ours.
+    Block k of the peer chain extends our first k blocks when its previous_hash
+    is the cached hash of our block k-1, so the search walks back from the tip
+    and costs the length of the fork, not of the chain.
+
+    :param store: Our chain
+    :param chain: The peer chain, or a window of its blocks or headers
+    :param offset: Position in the peer chain of the first element of chain
+    :return: Number of leading blocks the peer chain shares with ours,
+             0 if no block of the window links to our chain
+    """
+    for position in range(min(len(store), offset + len(chain) - 1), max(offset, 1) - 1, -1):
+        if chain[position - offset]['previous_hash'] == store.hash_at(position - 1):
+            return position
+    return 0
+
+
+def verify_links(store: ChainStore, valid_proof: Callable[[int, int], bool]) -> bool:
+    """
+    Validate a chain made of blocks sealed by this node, using their cached hashes
+
+    :param store: A ChainStore
+    :param valid_proof: Proof of Work check of the chain
+    :return: True if valid, False if not
+    """
+    for position in range(1, len(store)):
+        block = store[position]
+        if block['previous_hash'] != store.hash_at(position - 1):
+            return False
+        if not valid_proof(store[position - 1]['proof'], block['proof']):
+            return False
+    return True
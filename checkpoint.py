@@ -0,0 +1,100 @@
+import json
+import os
+import re
+from typing import List, Dict, Any, Optional
+
+from chain_store import ChainStore
+
+
+# Number of blocks between two snapshots
+DEFAULT_CHECKPOINT_INTERVAL = 100
+
+# Number of snapshots kept on disk
+DEFAULT_KEEP = 3
+
+_FILE_PATTERN = re.compile(r'^checkpoint-(\d+)\.json$')
+
+
+class CheckpointStore:
+    """
+    Snapshots of the state derived from the chain, keyed by block height and tip hash.
+    A snapshot is only used if the chain still holds the block it was taken at,
+    so that the state can be recovered by replaying the blocks that follow it.
+    """
+    def __init__(self, directory: str, interval: int = DEFAULT_CHECKPOINT_INTERVAL, keep: int = DEFAULT_KEEP):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+
+    def _path(self, height: int) -> str:
+        return os.path.join(self.directory, f'checkpoint-{height:012d}.json')
+
+    def heights(self) -> List[int]:
+        """
+        :return: Heights of the snapshots on disk, newest first
+        """
+        heights = []
+        for name in os.listdir(self.directory):
+            match = _FILE_PATTERN.match(name)
+            if match:
+                heights.append(int(match.group(1)))
+        return sorted(heights, reverse=True)
+
+    def due(self, height: int) -> bool:
+        """
+        :param height: Number of blocks of the chain
+        :return: True if a snapshot should be taken at this height
+        """
+        return height % self.interval == 0
+
+    def save(self, height: int, tip_hash: str, state: Dict[str, Any]) -> None:
+        """
+        Write a snapshot, then remove the oldest ones
+
+        :param height: Number of blocks the state was derived from
+        :param tip_hash: Hash of the last of those blocks
+        :param state: JSON-serializable state
+        :return: None
+        """
+        path = self._path(height)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'height': height, 'tip_hash': tip_hash, 'state': state}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        # Readers only ever see complete snapshots
+        os.replace(path + '.tmp', path)
+
+        for old_height in self.heights()[self.keep:]:
+            os.remove(self._path(old_height))
+
+    def discard_above(self, height: int) -> None:
+        """
+        Remove the snapshots of blocks that are no longer part of the chain
+
+        :param height: Number of blocks the chain shares with the snapshots to keep
+        :return: None
+        """
+        for snapshot_height in self.heights():
+            if snapshot_height > height:
+                os.remove(self._path(snapshot_height))
+
+    def load_latest(self, store: ChainStore, max_height: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Load the newest snapshot that matches the chain
+
+        :param store: The chain
+        :param max_height: Ignore the snapshots taken above this height
+        :return: Snapshot with 'height', 'tip_hash' and 'state', or None if none matches
+        """
+        for height in self.heights():
+            if height > len(store) or (max_height is not None and height > max_height):
+                continue
+            try:
+                with open(self._path(height)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snapshot.get('tip_hash') == store.hash_at(height - 1):
+                return snapshot
+        return None
@@ -1,26 +1,27 @@
-from flask import Blueprint, render_template, session, redirect, url_for
-from .auth import AuthenticationSystem
+from flask import Blueprint, render_template, session, redirect, url_for, current_app
 
+# The application registering the blueprint sets app.config['BLOCKCHAIN'] to its SupplyChainBlockchain
+# and app.config['DEMO_USERS'] to the keys of its demo users
 dashboard_bp = Blueprint('dashboard', __name__)
 
+
+def _blockchain():
+    return current_app.config['BLOCKCHAIN']
+
 @dashboard_bp.route('/dashboard')
 def dashboard():
     # Get user info from session
     username = session.get('username')
     if not username:
-        return redirect(url_for('auth.login'))
+        return redirect(url_for('ui_login'))
 
     # Get user info from authentication system
-    auth_system = AuthenticationSystem()
-    user_info = auth_system.registered_users.get(username)
+    user_info = _blockchain().auth_system.get_user_info(username)
     
     if not user_info:
-        return redirect(url_for('auth.login'))
+        return redirect(url_for('ui_login'))
 
-    # Get blockchain length (you'll need to implement this function in your blockchain module)
     blockchain_length = get_blockchain_length()
-    
-    # Get demo info (you'll need to implement this function in your auth module)
     demo_info = get_demo_info(username)
     
     # Define role-specific dashboard content
@@ -111,36 +112,37 @@ def dashboard():
                          stats=stats,
                          role=role)
 
-# Helper functions (you'll need to implement these based on your blockchain data)
+# Helper functions, the counters are kept up to date by blockchain.stats as blocks are sealed,
+# so each of them costs O(1) whatever the length of the chain
 def get_blockchain_length():
-    return 0  # Replace with actual implementation
+    return len(_blockchain().chain)
 
 def get_demo_info(username):
-    return {}  # Replace with actual implementation
+    return current_app.config.get('DEMO_USERS', {}).get(username, {})
 
 def get_produced_products_count(username):
-    return 0  # Replace with actual implementation
+    return _blockchain().stats.user(username)['produced']
 
 def get_active_products_count(username):
-    return 0  # Replace with actual implementation
+    return _blockchain().stats.user(username)['in_stock']
 
 def get_received_products_count(username):
-    return 0  # Replace with actual implementation
+    return _blockchain().stats.user(username)['received']
 
 def get_processed_products_count(username):
-    return 0  # Replace with actual implementation
+    return _blockchain().stats.user(username)['processed']
 
 def get_distributed_products_count(username):
-    return 0  # Replace with actual implementation
+    return _blockchain().stats.user(username)['distributed']
 
 def get_inventory_count(username):
-    return 0  # Replace with actual implementation
+    return _blockchain().stats.user(username)['in_stock']
 
 def get_sold_products_count(username):
-    return 0  # Replace with actual implementation
+    return _blockchain().stats.user(username)['sold']
 
 def get_audit_count(username):
-    return 0  # Replace with actual implementation
+    return _blockchain().stats.user(username)['audits']
 
 def get_violations_count():
-    return 0  # Replace with actual implementation
+    return _blockchain().stats.totals['violations']
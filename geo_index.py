@@ -0,0 +1,305 @@
+import math
+from typing import Dict, List, Tuple, Any, Optional, Iterable, Iterator
+
+
+EARTH_RADIUS_KM = 6371.0088
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+# Side of the grid cells, in degrees (about 28 km of latitude)
+DEFAULT_CELL_DEGREES = 0.25
+
+# Kinds of located events, and where their location and actor are in the transaction data
+LOCATION_KINDS = ('origin', 'processing', 'departure', 'arrival', 'retail')
+_LOCATED_FIELDS = {
+    'product_registration': (('origin', 'origin_location', 'producer_id'),),
+    'processing': (('processing', 'location', 'actor_id'),),
+    'transfer': (('departure', 'departure_location', 'sender_id'), ('arrival', 'arrival_location', 'recipient_id')),
+    'retail': (('retail', 'location', 'retailer_id'),),
+}
+
+# Radius of the first search of nearest(), doubled until enough points are found
+NEAREST_START_KM = 10.0
+
+# Position of the fields of a point
+LATITUDE, LONGITUDE, BLOCK_INDEX, PRODUCT_ID, ACTOR, TRANSACTION_ID = range(6)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    :return: Great-circle distance between two points, in km
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def check_point(latitude: Any, longitude: Any) -> Tuple[float, float]:
+    """
+    :param latitude: Latitude in degrees
+    :param longitude: Longitude in degrees
+    :return: The point as floats
+    :raises ValueError: if the point is not a valid position
+    """
+    if isinstance(latitude, bool) or isinstance(longitude, bool):
+        raise ValueError("Latitude and longitude must be numbers")
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError("Latitude and longitude must be numbers")
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise ValueError("Latitude must be within [-90, 90] and longitude within [-180, 180]")
+    return latitude, longitude
+
+
+def located_points(tx: Dict[str, Any], block_index: int) -> Iterator[Tuple[str, tuple]]:
+    """
+    Located events of a transaction. Locations without a valid position are left out.
+
+    :param tx: Transaction
+    :param block_index: Index of the block holding the transaction
+    :return: (kind, point) tuples, a point being (latitude, longitude, block_index, product_id, actor,
+             transaction_id)
+    """
+    data = tx.get('data') or {}
+    for kind, field, actor_field in _LOCATED_FIELDS.get(tx.get('transaction_type'), ()):
+        location = data.get(field)
+        if not isinstance(location, dict):
+            continue
+        try:
+            latitude, longitude = check_point(location.get('latitude'), location.get('longitude'))
+        except ValueError:
+            continue
+        actor = data.get(actor_field, tx.get('sender'))
+        yield kind, (latitude, longitude, block_index, data.get('product_id'), actor, tx.get('transaction_id'))
+
+
+class GeoIndex:
+    """
+    Grid index over the locations of the sealed transactions, one grid per kind of location.
+    Points are bucketed in cells of cell_degrees x cell_degrees, so a query only visits the cells
+    around the area it covers and computes the distances of the points they hold.
+    """
+    def __init__(self, cell_degrees: float = DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.columns = math.ceil(360 / cell_degrees)  # number of cells around the globe
+        self.grids = {kind: {} for kind in LOCATION_KINDS}  # kind -> {(row, column): [point, ...]}
+        self.counts = {kind: 0 for kind in LOCATION_KINDS}
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        row = math.floor(latitude / self.cell_degrees)
+        return row, math.floor((longitude + 180) / self.cell_degrees) % self.columns
+
+    def add_block(self, block: Dict[str, Any]) -> None:
+        """
+        Index the locations of the transactions of a sealed block
+
+        :param block: Sealed block
+        :return: None
+        """
+        for tx in block['transactions']:
+            for kind, point in located_points(tx, block['index']):
+                self.grids[kind].setdefault(self._cell(point[LATITUDE], point[LONGITUDE]), []).append(point)
+                self.counts[kind] += 1
+
+    def remove_block(self, block: Dict[str, Any]) -> None:
+        """
+        Remove the locations of a block, which must be the most recent indexed block.
+        Its points are the last ones of their cells.
+
+        :param block: Block being removed from the tip of the chain
+        :return: None
+        """
+        for tx in block['transactions']:
+            for kind, point in located_points(tx, block['index']):
+                cell = self._cell(point[LATITUDE], point[LONGITUDE])
+                points = self.grids[kind].get(cell)
+                if points and points[-1][BLOCK_INDEX] == block['index']:
+                    points.pop()
+                    self.counts[kind] -= 1
+                    if not points:
+                        del self.grids[kind][cell]
+
+    def clear(self) -> None:
+        """
+        Drop every point from the index
+
+        :return: None
+        """
+        self.grids = {kind: {} for kind in LOCATION_KINDS}
+        self.counts = {kind: 0 for kind in LOCATION_KINDS}
+
+    def state(self) -> Dict[str, Any]:
+        """
+        :return: JSON-serializable content of the index, for checkpoints: the points of each kind in chain order
+        """
+        points = {}
+        for kind, grid in self.grids.items():
+            points[kind] = sorted((point for cell in grid.values() for point in cell),
+                                  key=lambda point: point[BLOCK_INDEX])
+        return {'points': points}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """
+        Replace the content of the index with a state returned by state()
+
+        :param state: Saved state
+        :return: None
+        """
+        self.clear()
+        for kind, points in state['points'].items():
+            grid = self.grids[kind]
+            for point in points:
+                grid.setdefault(self._cell(point[LATITUDE], point[LONGITUDE]), []).append(tuple(point))
+            self.counts[kind] = len(points)
+
+    def _cells(self, kind: str, south: float, north: float, columns: Optional[Iterable[int]]) -> Iterator[list]:
+        # Points of the cells between two latitudes, in the given columns (all of them if None)
+        grid = self.grids[kind]
+        first, last = math.floor(south / self.cell_degrees), math.floor(north / self.cell_degrees)
+        columns = range(self.columns) if columns is None else list(columns)
+
+        if (last - first + 1) * len(columns) > len(grid):
+            # The area covers more cells than the grid has occupied ones, go through those instead
+            wanted = set(columns)
+            for (row, column), points in grid.items():
+                if first <= row <= last and column in wanted:
+                    yield points
+            return
+
+        for row in range(first, last + 1):
+            for column in columns:
+                points = grid.get((row, column))
+                if points:
+                    yield points
+
+    def _columns(self, west: float, east: float) -> Optional[Iterable[int]]:
+        # Columns between two longitudes, going east from west (across the antimeridian if west > east)
+        if east - west >= 360:
+            return None
+        first = self._cell(0, west)[1]
+        count = math.floor(((east - west) % 360) / self.cell_degrees) + 2
+        if count >= self.columns:
+            return None
+        return ((first + offset) % self.columns for offset in range(count))
+
+    def within_radius(self, kind: str, latitude: float, longitude: float,
+                      radius_km: float) -> List[Tuple[float, tuple]]:
+        """
+        Points within a distance of a position
+
+        :param kind: One of LOCATION_KINDS
+        :param latitude: Latitude of the center, in degrees
+        :param longitude: Longitude of the center, in degrees
+        :param radius_km: Radius, in km
+        :return: (distance_km, point) tuples, nearest first
+        :raises ValueError: if the center or the radius is not valid
+        """
+        latitude, longitude = check_point(latitude, longitude)
+        if kind not in self.grids:
+            raise ValueError(f"Unknown kind of location: {kind}")
+        if isinstance(radius_km, bool) or not isinstance(radius_km, (int, float)) or not radius_km >= 0:
+            raise ValueError("The radius must be a positive number")
+
+        # Bounding box of the circle: its latitudes, and its longitudes unless it covers a pole
+        angle = radius_km / EARTH_RADIUS_KM
+        south = max(latitude - math.degrees(angle), -90)
+        north = min(latitude + math.degrees(angle), 90)
+        columns = None
+        if south > -90 and north < 90 and radius_km < HALF_CIRCUMFERENCE_KM:
+            ratio = math.sin(angle) / math.cos(math.radians(latitude))
+            if ratio < 1:
+                spread = math.degrees(math.asin(ratio))
+                columns = self._columns(longitude - spread, longitude + spread)
+
+        # haversine_km inlined, the distance is only computed for the points whose haversine term is small enough
+        radians, sin, cos, asin, sqrt = math.radians, math.sin, math.cos, math.asin, math.sqrt
+        phi = radians(latitude)
+        cos_phi = cos(phi)
+        threshold = sin(min(angle, math.pi) / 2) ** 2 * (1 + 1e-9)
+        results = []
+        for points in self._cells(kind, south, north, columns):
+            for point in points:
+                point_phi = radians(point[LATITUDE])
+                a = sin((point_phi - phi) / 2) ** 2 + \
+                    cos_phi * cos(point_phi) * sin(radians(point[LONGITUDE] - longitude) / 2) ** 2
+                if a <= threshold:
+                    distance = 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+                    if distance <= radius_km:
+                        results.append((distance, point))
+        results.sort(key=lambda result: result[0])
+        return results
+
+    def in_bbox(self, kind: str, south: float, west: float, north: float, east: float) -> List[tuple]:
+        """
+        Points inside a bounding box. A box with west > east crosses the antimeridian.
+
+        :param kind: One of LOCATION_KINDS
+        :param south: Southern latitude, in degrees
+        :param west: Western longitude, in degrees
+        :param north: Northern latitude, in degrees
+        :param east: Eastern longitude, in degrees
+        :return: Points, in chain order
+        :raises ValueError: if the box is not valid
+        """
+        south, west = check_point(south, west)
+        north, east = check_point(north, east)
+        if kind not in self.grids:
+            raise ValueError(f"Unknown kind of location: {kind}")
+        if south > north:
+            raise ValueError("The south of the box must not be above its north")
+
+        crosses = west > east
+        results = []
+        for points in self._cells(kind, south, north, self._columns(west, east)):
+            for point in points:
+                point_longitude = point[LONGITUDE]
+                inside = (point_longitude >= west or point_longitude <= east) if crosses \
+                    else west <= point_longitude <= east
+                if inside and south <= point[LATITUDE] <= north:
+                    results.append(point)
+        results.sort(key=lambda point: point[BLOCK_INDEX])
+        return results
+
+    def nearest(self, kind: str, latitude: float, longitude: float, count: int,
+                key: int = ACTOR) -> List[Tuple[float, tuple]]:
+        """
+        Nearest points to a position, one per distinct value of a field of the points (e.g. one per actor).
+        The radius of the search is doubled until enough points are found, every point left out
+        is then farther than the ones returned.
+
+        :param kind: One of LOCATION_KINDS
+        :param latitude: Latitude of the position, in degrees
+        :param longitude: Longitude of the position, in degrees
+        :param count: Number of points
+        :param key: Position of the field the points are distinct by
+        :return: (distance_km, point) tuples, nearest first
+        :raises ValueError: if the position is not valid
+        """
+        radius = NEAREST_START_KM
+        while True:
+            nearest = {}
+            for distance, point in self.within_radius(kind, latitude, longitude, radius):
+                nearest.setdefault(point[key], (distance, point))
+            if len(nearest) >= count or radius >= HALF_CIRCUMFERENCE_KM:
+                return sorted(nearest.values(), key=lambda result: result[0])[:count]
+            radius *= 2
+
+
+def point_view(point: tuple, distance_km: Optional[float] = None) -> Dict[str, Any]:
+    """
+    :param point: Point returned by a query of GeoIndex
+    :param distance_km: Distance of the point to the position of the query, if any
+    :return: Point as a dict, e.g. for the JSON endpoints
+    """
+    view = {
+        'latitude': point[LATITUDE],
+        'longitude': point[LONGITUDE],
+        'block_index': point[BLOCK_INDEX],
+        'product_id': point[PRODUCT_ID],
+        'actor': point[ACTOR],
+        'transaction_id': point[TRANSACTION_ID]
+    }
+    if distance_km is not None:
+        view['distance_km'] = round(distance_km, 3)
+    return view
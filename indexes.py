@@ -0,0 +1,263 @@
+import hashlib
+from itertools import islice
+from typing import Dict, List, Tuple, Any, Optional
+
+
+# Transaction types that belong to the history of a single product
+PRODUCT_TRANSACTION_TYPES = ('product_registration', 'processing', 'transfer', 'quality_check', 'retail')
+
+
+class ProductHistoryIndex:
+    """
+    Secondary index mapping a product ID to the positions of its transactions in the chain
+    """
+    def __init__(self):
+        self.positions = {}  # product_id -> [(block_index, tx_position), ...] in chain order
+
+    def add_block(self, block: Dict[str, Any]) -> None:
+        """
+        Index the product transactions of a sealed block
+
+        :param block: Sealed block
+        :return: None
+        """
+        for position, tx in enumerate(block['transactions']):
+            if tx.get('transaction_type') in PRODUCT_TRANSACTION_TYPES:
+                product_id = tx.get('data', {}).get('product_id')
+                if product_id is not None:
+                    self.positions.setdefault(product_id, []).append((block['index'], position))
+
+    def remove_block(self, block: Dict[str, Any]) -> None:
+        """
+        Remove the entries of a block, which must be the most recent indexed block
+
+        :param block: Block being removed from the tip of the chain
+        :return: None
+        """
+        for tx in block['transactions']:
+            if tx.get('transaction_type') in PRODUCT_TRANSACTION_TYPES:
+                product_id = tx.get('data', {}).get('product_id')
+                entries = self.positions.get(product_id)
+                if entries and entries[-1][0] == block['index']:
+                    entries.pop()
+                    if not entries:
+                        del self.positions[product_id]
+
+    def clear(self) -> None:
+        """
+        Drop every entry from the index
+
+        :return: None
+        """
+        self.positions = {}
+
+    def state(self) -> Dict[str, Any]:
+        """
+        :return: JSON-serializable content of the index, for checkpoints
+        """
+        return {'positions': self.positions}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """
+        Replace the content of the index with a state returned by state()
+
+        :param state: Saved state
+        :return: None
+        """
+        self.positions = {
+            product_id: [tuple(entry) for entry in entries]
+            for product_id, entries in state['positions'].items()
+        }
+
+    def get(self, product_id: str) -> List[Tuple[int, int]]:
+        """
+        Get the positions of the transactions of a product
+
+        :param product_id: ID of the product
+        :return: List of (block_index, tx_position) tuples in chain order
+        """
+        return self.positions.get(product_id, [])
+
+
+class OwnerIndex:
+    """
+    Secondary index mapping an actor to the products they currently own,
+    kept in step with the products state (pending transactions included)
+    """
+    def __init__(self):
+        # owner -> {product_id: None}, a dict rather than a set to list the products in the order they were acquired
+        self.products = {}
+
+    def add(self, owner: str, product_id: str) -> None:
+        """
+        :param owner: New owner of the product
+        :param product_id: ID of the product
+        :return: None
+        """
+        self.products.setdefault(owner, {})[product_id] = None
+
+    def remove(self, owner: str, product_id: str) -> None:
+        """
+        :param owner: Previous owner of the product
+        :param product_id: ID of the product
+        :return: None
+        """
+        owned = self.products.get(owner)
+        if owned is not None:
+            owned.pop(product_id, None)
+            if not owned:
+                del self.products[owner]
+
+    def move(self, product_id: str, from_owner: str, to_owner: str) -> None:
+        """
+        :param product_id: ID of the product
+        :param from_owner: Previous owner of the product
+        :param to_owner: New owner of the product
+        :return: None
+        """
+        self.remove(from_owner, product_id)
+        self.add(to_owner, product_id)
+
+    def clear(self) -> None:
+        """
+        Drop every entry from the index
+
+        :return: None
+        """
+        self.products = {}
+
+    def rebuild(self, products: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Rebuild the index from the products state
+
+        :param products: product_id -> details, as in SupplyChainBlockchain.products
+        :return: None
+        """
+        self.clear()
+        for product_id, details in products.items():
+            self.add(details['current_owner'], product_id)
+
+    def state(self) -> Dict[str, Any]:
+        """
+        :return: JSON-serializable content of the index, for checkpoints
+        """
+        return {'products': {owner: list(owned) for owner, owned in self.products.items()}}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """
+        Replace the content of the index with a state returned by state()
+
+        :param state: Saved state
+        :return: None
+        """
+        self.products = {owner: dict.fromkeys(owned) for owner, owned in state['products'].items()}
+
+    def count(self, owner: str) -> int:
+        """
+        :param owner: Actor
+        :return: Number of products the actor owns
+        """
+        return len(self.products.get(owner, ()))
+
+    def get(self, owner: str, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        """
+        Get a page of the products of an actor, the cost depends on the products of this actor only
+
+        :param owner: Actor
+        :param offset: Number of products to skip
+        :param limit: Maximum number of products to return, all of them if None
+        :return: IDs of the products, in the order they were acquired
+        """
+        owned = self.products.get(owner, {})
+        stop = None if limit is None else offset + limit
+        return list(islice(owned, offset, stop))
+
+
+def signature_digest(signature: str) -> str:
+    """
+    :param signature: Signature of a transaction
+    :return: Short digest standing for the signature, much smaller than an RSA signature
+    """
+    return hashlib.sha256(signature.encode()).hexdigest()[:32]
+
+
+class SealedTransactionIndex:
+    """
+    IDs and signatures of the sealed transactions, so that a signed transaction
+    cannot be submitted again once its block is sealed
+    """
+    def __init__(self):
+        self.transaction_ids = set()
+        self.signatures = set()  # digests of the signatures, see signature_digest
+
+    def add_block(self, block: Dict[str, Any]) -> None:
+        """
+        Index the transactions of a sealed block
+
+        :param block: Sealed block
+        :return: None
+        """
+        for tx in block['transactions']:
+            self.transaction_ids.add(tx['transaction_id'])
+            if tx.get('signature') is not None:
+                self.signatures.add(signature_digest(tx['signature']))
+
+    def remove_block(self, block: Dict[str, Any]) -> None:
+        """
+        Remove the transactions of a block leaving the chain
+
+        :param block: Block being removed from the tip of the chain
+        :return: None
+        """
+        for tx in block['transactions']:
+            self.transaction_ids.discard(tx['transaction_id'])
+            if tx.get('signature') is not None:
+                self.signatures.discard(signature_digest(tx['signature']))
+
+    def clear(self) -> None:
+        """
+        Drop every entry from the index
+
+        :return: None
+        """
+        self.transaction_ids = set()
+        self.signatures = set()
+
+    def state(self) -> Dict[str, Any]:
+        """
+        :return: JSON-serializable content of the index, for checkpoints
+        """
+        return {'transaction_ids': sorted(self.transaction_ids), 'signatures': sorted(self.signatures)}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """
+        Replace the content of the index with a state returned by state()
+
+        :param state: Saved state
+        :return: None
+        """
+        self.transaction_ids = set(state['transaction_ids'])
+        self.signatures = set(state['signatures'])
+
+    def contains(self, transaction_id: Optional[str], signature: Optional[str]) -> bool:
+        """
+        :param transaction_id: ID of a transaction
+        :param signature: Signature of the transaction
+        :return: True if a sealed transaction has this ID or this signature
+        """
+        return (transaction_id is not None and transaction_id in self.transaction_ids) or \
+            (signature is not None and signature_digest(signature) in self.signatures)
+
+    def check(self, transaction_id: Optional[str], signature: Optional[str]) -> None:
+        """
+        Reject a transaction that replays a sealed one
+
+        :param transaction_id: ID of the transaction, if already assigned
+        :param signature: Signature of the transaction
+        :return: None
+        :raises ValueError: if a sealed transaction has this ID or this signature
+        """
+        if transaction_id is not None and transaction_id in self.transaction_ids:
+            raise ValueError(f"Duplicate transaction {transaction_id}, already sealed")
+        if signature is not None and signature_digest(signature) in self.signatures:
+            raise ValueError("Duplicate transaction signature, already sealed")
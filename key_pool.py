@@ -0,0 +1,96 @@
+import threading
+from collections import deque
+from typing import Dict, Tuple, Iterable, Optional
+
+from auth import AuthenticationSystem, DEFAULT_KEY_ALGORITHM
+
+
+# Number of ready key pairs kept per algorithm
+DEFAULT_LOW_WATER = 16
+
+
+class KeyPairPool:
+    """
+    Pre-generated key pairs, so that registering a user does not wait for a key generation.
+    A background thread keeps low_water key pairs ready for each algorithm;
+    when a pool runs dry, take() falls back to generating the key pair on the calling thread.
+    """
+    def __init__(self, auth_system: AuthenticationSystem, algorithms: Iterable[str] = (DEFAULT_KEY_ALGORITHM,),
+                 low_water: int = DEFAULT_LOW_WATER):
+        self.auth_system = auth_system
+        self.algorithms = tuple(algorithms)
+        self.low_water = low_water
+        self._pools = {algorithm: deque() for algorithm in self.algorithms}  # algorithm -> key pairs
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Start the thread that fills the pools
+
+        :return: None
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='key-pair-pool', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the filling thread once the key pair being generated is ready
+
+        :return: None
+        """
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def take(self, algorithm: str = DEFAULT_KEY_ALGORITHM) -> Tuple[str, str]:
+        """
+        Get a new key pair, from the pool if one is ready
+
+        :param algorithm: Key algorithm, one of auth.KEY_ALGORITHMS
+        :return: Tuple of (private_key_string, public_key_string)
+        """
+        with self._condition:
+            pool = self._pools.get(algorithm)
+            key_pair = pool.popleft() if pool else None
+            # Wake the filling thread up to replace it
+            self._condition.notify_all()
+
+        if key_pair is None:
+            return self.auth_system.generate_key_pair(algorithm)
+        return key_pair
+
+    def stats(self) -> Dict[str, int]:
+        """
+        :return: Number of ready key pairs per algorithm
+        """
+        with self._condition:
+            return {algorithm: len(pool) for algorithm, pool in self._pools.items()}
+
+    def _next_algorithm(self) -> Optional[str]:
+        # Called with the condition held: the algorithm with the fewest ready key pairs below the low-water mark
+        algorithm = min(self.algorithms, key=lambda a: len(self._pools[a]), default=None)
+        if algorithm is None or len(self._pools[algorithm]) >= self.low_water:
+            return None
+        return algorithm
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            with self._condition:
+                algorithm = self._next_algorithm()
+                while algorithm is None and not self._stopped.is_set():
+                    self._condition.wait()
+                    algorithm = self._next_algorithm()
+            if algorithm is None:
+                return
+
+            # Generate without holding the lock, take() keeps serving ready key pairs meanwhile
+            key_pair = self.auth_system.generate_key_pair(algorithm)
+            with self._condition:
+                self._pools[algorithm].append(key_pair)
@@ -0,0 +1,126 @@
+from typing import List, Dict, Any, Optional
+
+import requests
+
+from chain_store import block_digest
+from merkle import transaction_hash, verify_merkle_path
+from mining import valid_proof
+from peers import DEFAULT_PEER_TIMEOUT
+
+
+def verify_headers(headers: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Check that consecutive block headers link to each other with valid Proofs of Work
+
+    :param headers: Headers as returned by /chain/headers, in chain order
+    :return: None if the headers are valid, otherwise the reason they are not
+    """
+    previous = None
+    for header in headers:
+        if header.get('merkle_root') is None:
+            return f"Block {header.get('index')} has no Merkle root"
+        header_hash = block_digest(header).hex()
+        if header.get('hash') is not None and header['hash'] != header_hash:
+            return f"Wrong hash for block {header['index']}"
+
+        if previous is not None:
+            if header['index'] != previous['index'] + 1 or header['previous_hash'] != previous['hash']:
+                return f"Block {header['index']} does not link to block {previous['index']}"
+            if not valid_proof(previous['proof'], header['proof']):
+                return f"Invalid Proof of Work for block {header['index']}"
+
+        previous = dict(header, hash=header_hash)
+    return None
+
+
+def verify_product_proof(proof: Dict[str, Any], trusted_tip_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Verify the proof of a product returned by /products/<id>/proof, with block headers only.
+    The proof shows that each transaction is part of a block of the chain ending at the tip;
+    it cannot show that no later transaction was left out, so the tip should be compared with
+    the one of other nodes, or passed as trusted_tip_hash.
+
+    :param proof: Proof of the product
+    :param trusted_tip_hash: Hash of the tip the chain must end at, if known
+    :return: Verification result, in the format of SupplyChainBlockchain.verify_product_authenticity
+    """
+    try:
+        headers = proof['headers']
+        reason = verify_headers(headers)
+        if reason is not None:
+            return {'authentic': False, 'reason': reason}
+
+        tip_hash = block_digest(headers[-1]).hex() if headers else None
+        if tip_hash is None or tip_hash != proof['tip']['hash'] or headers[-1]['index'] != proof['tip']['height']:
+            return {'authentic': False, 'reason': 'Headers do not reach the tip'}
+        if trusted_tip_hash is not None and tip_hash != trusted_tip_hash:
+            return {'authentic': False, 'reason': 'Chain does not end at the trusted tip'}
+
+        # Each transaction must be committed to by the Merkle root of its block
+        headers_by_index = {header['index']: header for header in headers}
+        history = []
+        for entry in sorted(proof['transactions'], key=lambda e: (e['block_index'], e['position'])):
+            header = headers_by_index.get(entry['block_index'])
+            tx = entry['transaction']
+            if header is None or not verify_merkle_path(transaction_hash(tx), entry['merkle_path'],
+                                                        header['merkle_root']):
+                return {'authentic': False, 'reason': f"Transaction {tx.get('transaction_id')} is not in the chain"}
+            if tx['data'].get('product_id') != proof['product_id']:
+                return {'authentic': False, 'reason': f"Transaction {tx.get('transaction_id')} is about another product"}
+            history.append(tx)
+
+        # Same checks as a full node on the proven history
+        if not history or history[0]['transaction_type'] != 'product_registration':
+            return {'authentic': False, 'reason': 'Product not properly registered'}
+
+        current_owner = history[0]['data']['producer_id']
+        for tx in history[1:]:
+            if tx['transaction_type'] == 'transfer':
+                if tx['data']['sender_id'] != current_owner:
+                    return {'authentic': False, 'reason': 'Chain of custody broken'}
+                current_owner = tx['data']['recipient_id']
+
+        return {
+            'authentic': True,
+            'product_id': proof['product_id'],
+            'history_length': len(history),
+            'registration_date': history[0]['timestamp'],
+            'current_owner': current_owner,
+            'tip_hash': tip_hash
+        }
+
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        return {'authentic': False, 'reason': f'Malformed proof: {e}'}
+
+
+class LightClient:
+    """
+    Verifies products against a node without downloading the chain
+    """
+    def __init__(self, node: str, timeout: float = DEFAULT_PEER_TIMEOUT):
+        self.node = node
+        self.timeout = timeout
+
+    def get_proof(self, product_id: str) -> Dict[str, Any]:
+        """
+        :param product_id: ID of the product
+        :return: Proof returned by the node
+        :raises requests.RequestException: if the node cannot be reached or does not know the product
+        """
+        response = requests.get(f'http://{self.node}/products/{product_id}/proof', timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def verify_product(self, product_id: str, trusted_tip_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Fetch the proof of a product and verify it
+
+        :param product_id: ID of the product
+        :param trusted_tip_hash: Hash of the tip the chain must end at, if known
+        :return: Verification result, see verify_product_proof
+        """
+        try:
+            proof = self.get_proof(product_id)
+        except (requests.RequestException, ValueError) as e:
+            return {'authentic': False, 'reason': str(e)}
+        return verify_product_proof(proof, trusted_tip_hash)
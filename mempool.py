@@ -0,0 +1,115 @@
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+
+class MempoolError(ValueError):
+    """Raised when a transaction cannot enter the mempool"""
+
+
+class Mempool:
+    """
+    Pending transactions waiting to be sealed into a block.
+
+    A block should be sealed once max_block_transactions are pending
+    or once the oldest pending transaction has waited max_latency seconds.
+    """
+    def __init__(self, max_block_transactions: int = 500, max_latency: float = 2.0, capacity: int = 50000):
+        self.max_block_transactions = max_block_transactions
+        self.max_latency = max_latency
+        self.capacity = capacity
+        self._transactions = OrderedDict()  # transaction_id -> (transaction, arrival time)
+        self._signatures = set()
+
+    def __len__(self) -> int:
+        return len(self._transactions)
+
+    def __iter__(self):
+        return (tx for tx, _ in self._transactions.values())
+
+    def check(self, transaction_id: Optional[str], signature: Optional[str]) -> None:
+        """
+        Check that a transaction can be added, before any state is changed for it
+
+        :param transaction_id: ID of the transaction, if already assigned
+        :param signature: Signature of the transaction
+        :return: None
+        :raises MempoolError: if the transaction is a duplicate or the mempool is full
+        """
+        if transaction_id is not None and transaction_id in self._transactions:
+            raise MempoolError(f"Duplicate transaction {transaction_id}")
+        if signature is not None and signature in self._signatures:
+            raise MempoolError("Duplicate transaction signature")
+        if len(self._transactions) >= self.capacity:
+            raise MempoolError("Mempool is full, try again later")
+
+    def add(self, transaction: Dict[str, Any], first: bool = False) -> None:
+        """
+        Add a transaction to the mempool
+
+        :param transaction: Transaction with a transaction_id and an optional signature
+        :param first: Put the transaction at the head so that it goes into the next block
+        :return: None
+        :raises MempoolError: if the transaction is a duplicate or the mempool is full
+        """
+        transaction_id = transaction['transaction_id']
+        signature = transaction.get('signature')
+        self.check(transaction_id, signature)
+
+        self._transactions[transaction_id] = (transaction, time.monotonic())
+        if first:
+            self._transactions.move_to_end(transaction_id, last=False)
+        if signature is not None:
+            self._signatures.add(signature)
+
+    def take(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Remove and return the oldest pending transactions
+
+        :param limit: Maximum number of transactions, defaults to max_block_transactions
+        :return: List of transactions in arrival order
+        """
+        limit = self.max_block_transactions if limit is None else limit
+        taken = []
+        while self._transactions and len(taken) < limit:
+            _, (tx, _) = self._transactions.popitem(last=False)
+            self._signatures.discard(tx.get('signature'))
+            taken.append(tx)
+        return taken
+
+    def oldest_age(self) -> float:
+        """
+        :return: Seconds the oldest pending transaction has waited, 0 if the mempool is empty
+        """
+        if not self._transactions:
+            return 0.0
+        _, arrival = next(iter(self._transactions.values()))
+        return time.monotonic() - arrival
+
+    def seconds_until_ready(self) -> Optional[float]:
+        """
+        :return: Seconds until a block should be sealed, 0 if now, None if the mempool is empty
+        """
+        if not self._transactions:
+            return None
+        if len(self._transactions) >= self.max_block_transactions:
+            return 0.0
+        return max(0.0, self.max_latency - self.oldest_age())
+
+    def ready(self) -> bool:
+        """
+        :return: True if a block should be sealed now
+        """
+        return self.seconds_until_ready() == 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: Depth and age statistics of the mempool
+        """
+        return {
+            'depth': len(self._transactions),
+            'capacity': self.capacity,
+            'oldest_age': self.oldest_age(),
+            'max_block_transactions': self.max_block_transactions,
+            'max_latency': self.max_latency
+        }
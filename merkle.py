@@ -0,0 +1,86 @@
+import hashlib
+import json
+from typing import List, Dict, Any, Sequence
+
+from records import as_dict
+
+
+# Leaves and inner nodes are hashed with different prefixes,
+# so that an inner node can never be passed off as a transaction
+_LEAF_PREFIX = b'\x00'
+_NODE_PREFIX = b'\x01'
+
+
+def transaction_hash(tx: Dict[str, Any]) -> bytes:
+    """
+    :param tx: Transaction
+    :return: Leaf hash of the transaction in the Merkle tree of its block
+    """
+    return hashlib.sha256(_LEAF_PREFIX + json.dumps(tx, sort_keys=True, default=as_dict).encode()).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    """
+    :param left: Hash of the left child
+    :param right: Hash of the right child
+    :return: Hash of their parent node
+    """
+    return hashlib.sha256(_NODE_PREFIX + left + right).digest()
+
+
+def merkle_levels(leaves: Sequence[bytes]) -> List[List[bytes]]:
+    """
+    Every level of the Merkle tree over a list of leaf hashes, from the leaves up to the root.
+    The last node of a level with an odd number of nodes is carried up unchanged.
+
+    :param leaves: Leaf hashes
+    :return: Levels of the tree, the last one holds the root only
+    """
+    levels = [list(leaves) or [hashlib.sha256(b'').digest()]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def merkle_root(transactions: Sequence[Dict[str, Any]]) -> str:
+    """
+    :param transactions: Transactions of a block
+    :return: Hex Merkle root of the transactions
+    """
+    return merkle_levels([transaction_hash(tx) for tx in transactions])[-1][0].hex()
+
+
+def merkle_path(leaves: Sequence[bytes], position: int) -> List[Dict[str, str]]:
+    """
+    Inclusion path of a leaf: the sibling hashes needed to recompute the root from it
+
+    :param leaves: Leaf hashes of the block
+    :param position: Position of the leaf
+    :return: Siblings from the leaf up, each with its hex 'hash' and the 'side' it is on
+    """
+    path = []
+    for level in merkle_levels(leaves)[:-1]:
+        sibling = position ^ 1
+        # The last node of an odd level has no sibling, it is carried up unchanged
+        if sibling < len(level):
+            path.append({'hash': level[sibling].hex(), 'side': 'left' if sibling < position else 'right'})
+        position //= 2
+    return path
+
+
+def verify_merkle_path(leaf: bytes, path: Sequence[Dict[str, str]], root: str) -> bool:
+    """
+    :param leaf: Leaf hash of the transaction
+    :param path: Inclusion path returned by merkle_path
+    :param root: Hex Merkle root of the block
+    :return: True if the path leads from the leaf to the root
+    """
+    node = leaf
+    for step in path:
+        sibling = bytes.fromhex(step['hash'])
+        node = node_hash(sibling, node) if step['side'] == 'left' else node_hash(node, sibling)
+    return node.hex() == root
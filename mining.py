@@ -0,0 +1,176 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional
+
+
+# Number of nonces handed to a worker process in one task
+DEFAULT_CHUNK_SIZE = 50000
+
+# Number of nonces checked between two looks at the cancellation flag
+BATCH_SIZE = 4096
+
+# A proof is valid when the hex digest of hash(pp') starts with DIFFICULTY zeroes
+DIFFICULTY = 4
+
+# ... which is the same as the raw 32-byte digest being below this big-endian target
+TARGET = (1 << (256 - 4 * DIFFICULTY)).to_bytes(32, 'big')
+
+# Set in each worker process by _init_worker
+_generation = None
+
+
+def valid_proof(last_proof: int, proof: int) -> bool:
+    """
+    Validates the Proof: Does hash(last_proof, proof) contain DIFFICULTY leading zeroes?
+    The check every node and light client applies, the search functions below look for proofs it accepts.
+
+    :param last_proof: <int> Previous Proof
+    :param proof: <int> Current Proof
+    :return: <bool> True if correct, False if not.
+    """
+    return hashlib.sha256(f'{last_proof}{proof}'.encode()).digest() < TARGET
+
+
+def _init_worker(generation) -> None:
+    """
+    Initializer of the worker processes: keep a handle on the shared search generation
+    """
+    global _generation
+    _generation = generation
+
+
+def search_range(last_proof: int, start: int, stop: int, generation: Optional[int] = None) -> Optional[int]:
+    """
+    Search the nonces in [start, stop) for a proof accepted by valid_proof.
+    The constant last_proof prefix is hashed once and its state copied for every nonce,
+    and raw digests are compared against TARGET instead of building hex strings.
+
+    :param last_proof: <int> Previous Proof
+    :param start: <int> First nonce to try
+    :param stop: <int> Nonce at which to stop (excluded)
+    :param generation: <int> Search the range belongs to, given up once the shared generation moves past it
+    :return: <int> The first valid proof in the range, or None
+    """
+    copy_prefix = hashlib.sha256(f'{last_proof}'.encode()).copy
+    target = TARGET
+
+    for batch_start in range(start, stop, BATCH_SIZE):
+        if generation is not None and _generation is not None and _generation.value != generation:
+            return None
+
+        for proof in range(batch_start, min(batch_start + BATCH_SIZE, stop)):
+            guess = copy_prefix()
+            guess.update(b'%d' % proof)
+            if guess.digest() < target:
+                return proof
+
+    return None
+
+
+def find_proof(last_proof: int) -> int:
+    """
+    Single-core Proof of Work: the smallest proof accepted by valid_proof
+
+    :param last_proof: <int> Previous Proof
+    :return: <int> Proof
+    """
+    start = 0
+    while True:
+        proof = search_range(last_proof, start, start + DEFAULT_CHUNK_SIZE)
+        if proof is not None:
+            return proof
+        start += DEFAULT_CHUNK_SIZE
+
+
+class ParallelMiner:
+    """
+    Proof of Work search that splits the nonce space across a pool of worker processes
+    """
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        # Each search has its own generation, bumped when it ends or is cancelled.
+        # Chunks of an earlier search still running in a worker see it and stop
+        self._generation = multiprocessing.Value('Q', 0)
+        self._executor = None
+        # The workers are shared, so only one search may run at a time
+        self._search_lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # The pool is created lazily and reused between blocks
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self._generation,)
+            )
+        return self._executor
+
+    def proof_of_work(self, last_proof: int) -> Optional[int]:
+        """
+        Find a proof for last_proof using every worker of the pool.
+        The first worker that finds a valid proof wins and the others are cancelled.
+        Concurrent calls wait for the search in progress to end, they never share it.
+
+        :param last_proof: <int>
+        :return: <int> A proof accepted by valid_proof, or None if the search was cancelled
+        """
+        with self._search_lock:
+            return self._search(last_proof)
+
+    def _advance(self) -> int:
+        # Start a new generation, which stops every chunk of the previous one
+        with self._generation.get_lock():
+            self._generation.value += 1
+            return self._generation.value
+
+    def _search(self, last_proof: int) -> Optional[int]:
+        generation = self._advance()
+        executor = self._get_executor()
+
+        pending = {}
+        next_start = 0
+        try:
+            while self._generation.value == generation:
+                # Keep two chunks per worker in flight so no worker waits for a new task
+                while len(pending) < self.workers * 2:
+                    future = executor.submit(search_range, last_proof, next_start, next_start + self.chunk_size,
+                                             generation)
+                    pending[future] = next_start
+                    next_start += self.chunk_size
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del pending[future]
+                    proof = future.result()
+                    if proof is not None:
+                        return proof
+
+            return None
+        finally:
+            # Stop the workers that are still searching
+            self._advance()
+            for future in pending:
+                future.cancel()
+
+    def cancel(self) -> None:
+        """
+        Abort the search in progress, if any
+
+        :return: None
+        """
+        self._advance()
+
+    def close(self) -> None:
+        """
+        Shut down the worker processes
+
+        :return: None
+        """
+        self.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
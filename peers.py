@@ -0,0 +1,117 @@
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Iterable, Optional
+
+
+# Seconds allowed to connect to a peer, and then between two bytes of its response
+DEFAULT_PEER_TIMEOUT = 5.0
+
+# Seconds allowed for a whole round of requests to all the peers
+DEFAULT_DEADLINE = 15.0
+
+# Number of peers contacted concurrently
+DEFAULT_MAX_WORKERS = 16
+
+
+class PeerClient:
+    """
+    HTTP client used to talk to the other nodes of the network.
+    Requests to all the peers run concurrently over persistent connections,
+    with a timeout per peer and a deadline for the whole round.
+    """
+    def __init__(self, timeout: float = DEFAULT_PEER_TIMEOUT, deadline: float = DEFAULT_DEADLINE,
+                 max_workers: int = DEFAULT_MAX_WORKERS):
+        self.timeout = timeout
+        self.deadline = deadline
+
+        # Keep one connection per peer alive between consensus rounds
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='peer-client')
+
+    def get(self, node: str, path: str, params: Optional[Dict[str, Any]] = None,
+            deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Send a GET request to one peer
+
+        :param node: Address of the peer. Eg. '192.168.0.5:5000'
+        :param path: Path of the endpoint. Eg. '/chain'
+        :param params: Query string parameters
+        :param deadline: time.monotonic() value after which the peer is abandoned, even if it is still answering
+        :return: Result with 'ok', 'latency' (seconds), the parsed 'data' or an 'error'
+        """
+        if deadline is None:
+            return self._get(node, path, params)
+
+        started = time.monotonic()
+        if started >= deadline:
+            return {'ok': False, 'latency': 0.0, 'error': 'deadline exceeded'}
+        future = self._executor.submit(self._get, node, path, params)
+        try:
+            return future.result(timeout=deadline - started)
+        except FutureTimeoutError:
+            future.cancel()
+            return {'ok': False, 'latency': time.monotonic() - started, 'error': 'deadline exceeded'}
+
+    def _get(self, node: str, path: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            response = self.session.get(f'http://{node}{path}', params=params, timeout=self.timeout)
+            if response.status_code != 200:
+                return {'ok': False, 'latency': time.monotonic() - started,
+                        'error': f'HTTP {response.status_code}'}
+
+            # The body is parsed once, callers share the result
+            data = response.json()
+            return {'ok': True, 'latency': time.monotonic() - started, 'data': data}
+
+        except (requests.RequestException, ValueError) as e:
+            return {'ok': False, 'latency': time.monotonic() - started, 'error': str(e)}
+
+    def get_all(self, nodes: Iterable[str], path: str,
+                params: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Send the same GET request to several peers concurrently.
+        Peers that have not answered when the deadline expires are reported as failed.
+
+        :param nodes: Addresses of the peers
+        :param path: Path of the endpoint
+        :param params: Query string parameters
+        :return: Result of each peer (see get), keyed by address
+        """
+        started = time.monotonic()
+        futures = {self._executor.submit(self._get, node, path, params): node for node in nodes}
+        if not futures:
+            return {}
+
+        done, not_done = wait(futures, timeout=self.deadline)
+
+        results = {futures[future]: future.result() for future in done}
+        for future in not_done:
+            future.cancel()
+            results[futures[future]] = {'ok': False, 'latency': time.monotonic() - started,
+                                        'error': 'deadline exceeded'}
+        return results
+
+
+def peer_report(result: Dict[str, Any], **details) -> Dict[str, Any]:
+    """
+    Summary of a peer result for the API, without the response body
+
+    :param result: Result returned by PeerClient.get
+    :param details: Extra fields to report
+    :return: Report with the status, latency in milliseconds and error
+    """
+    report = {
+        'status': 'ok' if result['ok'] else 'failed',
+        'latency_ms': round(result['latency'] * 1000, 1)
+    }
+    if not result['ok']:
+        report['error'] = result['error']
+    report.update(details)
+    return report
@@ -0,0 +1,216 @@
+import sys
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Union
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def timestamp_to_micros(value: Any) -> Optional[int]:
+    """
+    :param value: ISO 8601 timestamp without timezone, as produced by datetime.isoformat()
+    :return: Microseconds since the epoch, or None if the value would not be restored exactly
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if moment.tzinfo is not None:
+        return None
+
+    micros = (moment - _EPOCH) // _MICROSECOND
+    return micros if micros_to_timestamp(micros) == value else None
+
+
+def micros_to_timestamp(micros: int) -> str:
+    """
+    :param micros: Microseconds since the epoch
+    :return: ISO 8601 timestamp
+    """
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def _pack_hex(value: Any) -> Any:
+    # Lowercase hex strings are kept as their bytes, anything else as is.
+    # JSON never produces bytes, so a bytes value always means a packed string
+    if isinstance(value, str) and len(value) % 2 == 0:
+        try:
+            packed = bytes.fromhex(value)
+        except ValueError:
+            return value
+        if packed.hex() == value:
+            return packed
+    return value
+
+
+def _unpack_hex(value: Any) -> Any:
+    return value.hex() if isinstance(value, bytes) else value
+
+
+class Transaction(Mapping):
+    """
+    Compact form of a supply chain transaction.
+    The attributes hold the packed values (binary ids and signature, timestamp in microseconds),
+    while item access returns the values of the dict form, so a Transaction reads like the dict it replaces.
+    """
+    __slots__ = ('sender', 'transaction_type', 'data', 'timestamp', 'signature', 'transaction_id')
+
+    def __init__(self, sender: str, transaction_type: str, data: Dict[str, Any], timestamp: int,
+                 signature: Union[bytes, str], transaction_id: Union[bytes, str]):
+        self.sender = sender
+        self.transaction_type = transaction_type
+        self.data = data
+        self.timestamp = timestamp
+        self.signature = signature
+        self.transaction_id = transaction_id
+
+    @classmethod
+    def from_dict(cls, tx: Dict[str, Any]) -> Union['Transaction', Dict[str, Any]]:
+        """
+        :param tx: Transaction in dict form
+        :return: Compact transaction, or the dict itself if it cannot be packed without changing its encoding
+        """
+        if isinstance(tx, Transaction):
+            return tx
+        if len(tx) != len(cls.__slots__) or not all(field in tx for field in cls.__slots__):
+            return tx
+        timestamp = timestamp_to_micros(tx['timestamp'])
+        if timestamp is None or not isinstance(tx['sender'], str) or not isinstance(tx['transaction_type'], str) \
+                or not isinstance(tx['data'], dict):
+            return tx
+
+        # Every transaction repeats the same few keys and names, share them
+        data = {sys.intern(key): value for key, value in tx['data'].items()}
+        return cls(sys.intern(tx['sender']), sys.intern(tx['transaction_type']), data, timestamp,
+                   _pack_hex(tx['signature']), _pack_hex(tx['transaction_id']))
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'timestamp':
+            return micros_to_timestamp(self.timestamp)
+        if key in ('signature', 'transaction_id'):
+            return _unpack_hex(getattr(self, key))
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        :return: Dict form of the transaction
+        """
+        return {field: self[field] for field in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f'Transaction({self.to_dict()!r})'
+
+
+# merkle_root of the compact blocks sealed before Merkle roots were introduced
+_NO_MERKLE_ROOT = None
+
+
+class Block(Mapping):
+    """
+    Compact form of a sealed block, see Transaction.
+    The transactions that cannot be packed are kept in their dict form.
+    Blocks sealed before Merkle roots were introduced have no merkle_root field.
+    """
+    __slots__ = ('index', 'timestamp', 'transactions', 'proof', 'previous_hash', 'merkle_root')
+    _LEGACY_FIELDS = __slots__[:-1]
+
+    def __init__(self, index: int, timestamp: int, transactions: tuple, proof: int, previous_hash: Any,
+                 merkle_root: Union[bytes, str, None] = _NO_MERKLE_ROOT):
+        self.index = index
+        self.timestamp = timestamp
+        self.transactions = transactions
+        self.proof = proof
+        self.previous_hash = previous_hash
+        self.merkle_root = merkle_root
+
+    @classmethod
+    def from_dict(cls, block: Dict[str, Any]) -> Union['Block', Dict[str, Any]]:
+        """
+        :param block: Block in dict form
+        :return: Compact block, or the dict itself if it cannot be packed without changing its encoding
+        """
+        if isinstance(block, Block):
+            return block
+        fields = cls.__slots__ if 'merkle_root' in block else cls._LEGACY_FIELDS
+        if len(block) != len(fields) or not all(field in block for field in fields):
+            return block
+        if 'merkle_root' in block and block['merkle_root'] is _NO_MERKLE_ROOT:
+            return block
+        timestamp = timestamp_to_micros(block['timestamp'])
+        if timestamp is None or not isinstance(block['transactions'], (list, tuple)):
+            return block
+
+        transactions = tuple(compact(tx) for tx in block['transactions'])
+        merkle_root = _pack_hex(block['merkle_root']) if 'merkle_root' in block else _NO_MERKLE_ROOT
+        return cls(block['index'], timestamp, transactions, block['proof'], _pack_hex(block['previous_hash']),
+                   merkle_root)
+
+    def _fields(self) -> tuple:
+        return self._LEGACY_FIELDS if self.merkle_root is _NO_MERKLE_ROOT else self.__slots__
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'timestamp':
+            return micros_to_timestamp(self.timestamp)
+        if key == 'merkle_root' and self.merkle_root is _NO_MERKLE_ROOT:
+            raise KeyError(key)
+        if key in ('previous_hash', 'merkle_root'):
+            return _unpack_hex(getattr(self, key))
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._fields())
+
+    def __len__(self) -> int:
+        return len(self._fields())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        :return: Dict form of the block, with its transactions in dict form too
+        """
+        view = {field: self[field] for field in self._fields()}
+        view['transactions'] = [as_dict(tx) for tx in self.transactions]
+        return view
+
+    def __repr__(self) -> str:
+        return f'Block({self.to_dict()!r})'
+
+
+def compact(record: Dict[str, Any]) -> Union[Block, Transaction, Dict[str, Any]]:
+    """
+    Compact form of a block or a transaction in dict form.
+    Records of another shape (e.g. the transactions of the basic blockchain) are returned as is.
+
+    :param record: Block or transaction
+    :return: Block, Transaction or the record itself
+    """
+    if not isinstance(record, dict):
+        return record
+    if 'transactions' in record:
+        return Block.from_dict(record)
+    return Transaction.from_dict(record)
+
+
+def as_dict(record: Any) -> Any:
+    """
+    Dict view of a block or a transaction, e.g. for the JSON endpoints
+
+    :param record: Block, Transaction or a record in dict form
+    :return: Record in dict form
+    """
+    if isinstance(record, (Block, Transaction)):
+        return record.to_dict()
+    return record
@@ -0,0 +1,308 @@
+import re
+import sys
+from bisect import bisect_left
+from itertools import repeat
+from typing import Dict, List, Tuple, Any, Optional, Callable, Iterable
+
+
+# Attributes of a product registration that can be searched. The name is searched by substring,
+# the other attributes by their whole value, or by prefix when the query ends with '*'
+SEARCH_FIELDS = ('name', 'batch_number', 'category', 'certification_type', 'producer', 'country', 'region')
+KEYWORD_FIELDS = SEARCH_FIELDS[1:]
+
+# Positions of the attributes in a document, after the product ID
+_POSITIONS = {field: position for position, field in enumerate(SEARCH_FIELDS, start=1)}
+_BLOCK_INDEX = len(SEARCH_FIELDS) + 1
+
+_WORD = re.compile(r'\w+')
+
+# Number of new tokens collected before they are merged into the sorted vocabulary
+VOCABULARY_MERGE_SIZE = 4096
+
+# Prefixes matching more tokens than this are checked on the documents instead of gathering their postings
+MAX_PREFIX_EXPANSION = 100000
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def registration_document(tx: Dict[str, Any], block_index: int) -> Optional[tuple]:
+    """
+    Searchable attributes of a product registration
+
+    :param tx: Transaction
+    :param block_index: Index of the block holding the transaction
+    :return: (product_id, name, batch_number, category, certification types, producer, country, region,
+             block_index), or None if the transaction is not a product registration
+    """
+    if tx.get('transaction_type') != 'product_registration':
+        return None
+    data = tx.get('data') or {}
+    if data.get('product_id') is None:
+        return None
+    location = data.get('origin_location') or {}
+    certifications = data.get('certifications') or []
+
+    def text(value: Any) -> str:
+        # Categorical values repeat across products, share them
+        return sys.intern(str(value)) if value is not None else ''
+
+    return (
+        data['product_id'],
+        text(data.get('name')),
+        text(data.get('batch_number')),
+        text(data.get('category')),
+        tuple(text(cert.get('certification_type')) for cert in certifications if isinstance(cert, dict)),
+        text(data.get('producer_id')),
+        text(location.get('country')),
+        text(location.get('region')),
+        block_index
+    )
+
+
+class Vocabulary:
+    """
+    Distinct tokens of a field, for prefix lookups.
+    New tokens are collected in a set and merged into the sorted list once there are enough of them,
+    so that adding a token does not shift the whole list.
+    """
+    def __init__(self):
+        self.tokens = []  # sorted
+        self.recent = set()
+
+    def add(self, token: str) -> None:
+        """
+        :param token: New token
+        :return: None
+        """
+        self.recent.add(token)
+        if len(self.recent) >= VOCABULARY_MERGE_SIZE:
+            self.tokens.extend(self.recent)
+            self.tokens.sort()
+            self.recent = set()
+
+    def discard(self, token: str) -> None:
+        """
+        :param token: Token no document uses any more
+        :return: None
+        """
+        if token in self.recent:
+            self.recent.discard(token)
+            return
+        position = bisect_left(self.tokens, token)
+        if position < len(self.tokens) and self.tokens[position] == token:
+            del self.tokens[position]
+
+    def with_prefix(self, prefix: str, limit: int) -> Optional[List[str]]:
+        """
+        :param prefix: Prefix of the tokens
+        :param limit: Maximum number of tokens
+        :return: Tokens starting with the prefix, or None if there are more than limit of them
+        """
+        matches = [token for token in self.recent if token.startswith(prefix)]
+        start = bisect_left(self.tokens, prefix)
+        # The tokens starting with the prefix sort before the prefix with its last character incremented
+        end = bisect_left(self.tokens, prefix[:-1] + chr(ord(prefix[-1]) + 1)) if prefix else len(self.tokens)
+        if len(matches) + end - start > limit:
+            return None
+        return matches + self.tokens[start:end]
+
+
+class ProductSearchIndex:
+    """
+    Inverted index over the attributes of the registered products, updated as registrations are sealed.
+    Every product gets a document ID in sealing order, and search results are returned newest first.
+    """
+    def __init__(self):
+        self.documents = []  # document ID -> document, see registration_document, None once removed
+        self.document_ids = {}  # product_id -> document ID
+        self.postings = {}  # (field, token) -> set of document IDs
+        self.trigrams = {}  # trigram of a lowercased name -> set of document IDs
+        self.vocabularies = {field: Vocabulary() for field in SEARCH_FIELDS}
+
+    @staticmethod
+    def _tokens(document: tuple) -> Iterable[Tuple[str, str]]:
+        # The words of the name, and the whole lowercased value of the other attributes
+        for word in _WORD.findall(document[_POSITIONS['name']].lower()):
+            yield 'name', word
+        for field in KEYWORD_FIELDS:
+            values = document[_POSITIONS[field]]
+            for value in (values if isinstance(values, tuple) else (values,)):
+                if value:
+                    yield field, value.lower()
+
+    def _index(self, document: tuple) -> None:
+        document_id = len(self.documents)
+        self.documents.append(document)
+        self.document_ids[document[0]] = document_id
+
+        for key in set(self._tokens(document)):
+            postings = self.postings.get(key)
+            if postings is None:
+                postings = self.postings[key] = set()
+                self.vocabularies[key[0]].add(key[1])
+            postings.add(document_id)
+        for trigram in _trigrams(document[_POSITIONS['name']].lower()):
+            self.trigrams.setdefault(trigram, set()).add(document_id)
+
+    def _unindex(self, document_id: int) -> None:
+        document = self.documents[document_id]
+        for key in set(self._tokens(document)):
+            postings = self.postings[key]
+            postings.discard(document_id)
+            if not postings:
+                del self.postings[key]
+                self.vocabularies[key[0]].discard(key[1])
+        for trigram in _trigrams(document[_POSITIONS['name']].lower()):
+            postings = self.trigrams[trigram]
+            postings.discard(document_id)
+            if not postings:
+                del self.trigrams[trigram]
+
+        del self.document_ids[document[0]]
+        self.documents[document_id] = None
+        # Removed blocks are the most recent ones, give their document IDs back
+        while self.documents and self.documents[-1] is None:
+            self.documents.pop()
+
+    def add_block(self, block: Dict[str, Any]) -> None:
+        """
+        Index the product registrations of a sealed block
+
+        :param block: Sealed block
+        :return: None
+        """
+        for tx in block['transactions']:
+            document = registration_document(tx, block['index'])
+            # A product registered twice (possible in a peer block) keeps its first registration
+            if document is not None and document[0] not in self.document_ids:
+                self._index(document)
+
+    def remove_block(self, block: Dict[str, Any]) -> None:
+        """
+        Remove the registrations of a block, which must be the most recent indexed block
+
+        :param block: Block being removed from the tip of the chain
+        :return: None
+        """
+        for tx in reversed(block['transactions']):
+            document = registration_document(tx, block['index'])
+            document_id = self.document_ids.get(document[0]) if document is not None else None
+            if document_id is not None and self.documents[document_id][_BLOCK_INDEX] == block['index']:
+                self._unindex(document_id)
+
+    def clear(self) -> None:
+        """
+        Drop every entry from the index
+
+        :return: None
+        """
+        self.__init__()
+
+    def state(self) -> Dict[str, Any]:
+        """
+        :return: JSON-serializable content of the index, for checkpoints.
+                 Only the documents are saved, the postings are rebuilt from them.
+        """
+        return {'documents': [document for document in self.documents if document is not None]}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """
+        Replace the content of the index with a state returned by state()
+
+        :param state: Saved state
+        :return: None
+        """
+        self.clear()
+        for document in state['documents']:
+            document = [sys.intern(value) if isinstance(value, str) else value for value in document]
+            document[_POSITIONS['certification_type']] = tuple(document[_POSITIONS['certification_type']])
+            self._index(tuple(document))
+
+    def __len__(self) -> int:
+        return len(self.document_ids)
+
+    def _term(self, field: str, query: str) -> Tuple[List[set], Optional[Callable[[tuple], bool]]]:
+        # A search term as (sets of document IDs the results must all belong to, check of the documents
+        # in these sets, or None if they all match)
+        query = query.strip().lower()
+        position = _POSITIONS[field]
+
+        if field == 'name':
+            trigrams = _trigrams(query)
+            if trigrams:
+                # Names holding every trigram of the query, then checked for the whole substring
+                return [self.trigrams.get(trigram, set()) for trigram in trigrams], \
+                    lambda document: query in document[position].lower()
+            # Too short for trigrams, match the beginning of the words of the name
+            words = self.vocabularies['name'].with_prefix(query, MAX_PREFIX_EXPANSION)
+            if words is not None:
+                return self._union('name', words), None
+            return [], lambda document: any(word.startswith(query)
+                                            for word in _WORD.findall(document[position].lower()))
+
+        if query.endswith('*'):
+            prefix = query[:-1]
+            tokens = self.vocabularies[field].with_prefix(prefix, MAX_PREFIX_EXPANSION)
+            if tokens is not None:
+                return self._union(field, tokens), None
+            if field == 'certification_type':
+                return [], lambda document: any(value.lower().startswith(prefix) for value in document[position])
+            return [], lambda document: document[position].lower().startswith(prefix)
+
+        return [self.postings.get((field, query), set())], None
+
+    def _union(self, field: str, tokens: List[str]) -> List[set]:
+        # Documents holding any of the tokens. Prefixes matching more than MAX_PREFIX_EXPANSION tokens
+        # are checked on the documents instead
+        return [set().union(*map(self.postings.__getitem__, zip(repeat(field), tokens)))]
+
+    def search(self, criteria: Dict[str, str], offset: int = 0, limit: Optional[int] = None) \
+            -> Tuple[int, List[tuple]]:
+        """
+        Find the products matching every criterion.
+        The posting sets of the criteria are intersected from the smallest one, and only the documents
+        left are checked against the criteria that need it (name substrings, broad prefixes).
+
+        :param criteria: field -> query, for fields of SEARCH_FIELDS
+        :param offset: Number of results to skip
+        :param limit: Maximum number of results to return, all of them if None
+        :return: Total number of results, and the documents of the requested page, newest first
+        :raises ValueError: if there is no criterion, or a field cannot be searched
+        """
+        unknown = set(criteria) - set(SEARCH_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot search by {', '.join(sorted(unknown))}")
+        terms = [self._term(field, query) for field, query in criteria.items() if query and query.strip()]
+        if not terms:
+            raise ValueError("Give at least one search criterion")
+
+        postings = sorted((candidates for sets, _ in terms for candidates in sets), key=len)
+        checks = [check for _, check in terms if check is not None]
+        if postings:
+            candidates = postings[0] & postings[1] if len(postings) > 1 else set(postings[0])
+            for other in postings[2:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(other)
+        else:
+            candidates = (document_id for document_id, document in enumerate(self.documents) if document is not None)
+
+        matches = [document_id for document_id in candidates
+                   if all(check(self.documents[document_id]) for check in checks)]
+        matches.sort(reverse=True)
+
+        stop = None if limit is None else offset + limit
+        return len(matches), [self.documents[document_id] for document_id in matches[offset:stop]]
+
+
+def document_view(document: tuple) -> Dict[str, Any]:
+    """
+    :param document: Document returned by ProductSearchIndex.search
+    :return: Document as a dict, e.g. for the JSON endpoints
+    """
+    view = {'product_id': document[0], 'block_index': document[_BLOCK_INDEX]}
+    for field, position in _POSITIONS.items():
+        view[field] = list(document[position]) if field == 'certification_type' else document[position]
+    return view
@@ -0,0 +1,153 @@
+from collections import Counter
+from typing import Dict, Tuple, Any, Iterator
+
+
+# Counters kept for every user and every role
+COUNTERS = ('produced', 'received', 'processed', 'distributed', 'in_stock', 'sold', 'audits', 'violations')
+
+# Role of the sender of the transactions that do not declare it
+TRANSACTION_ROLES = {
+    'product_registration': 'producer',
+    'quality_check': 'regulator',
+    'retail': 'retailer'
+}
+
+
+def transaction_deltas(tx: Dict[str, Any]) -> Iterator[Tuple[str, str, str, int]]:
+    """
+    Changes a sealed transaction makes to the counters.
+    They only depend on the transaction, so removing a block undoes exactly what adding it did.
+
+    :param tx: Transaction
+    :return: (user, role, counter, delta) tuples
+    """
+    transaction_type = tx.get('transaction_type')
+    data = tx.get('data') or {}
+    sender = tx.get('sender')
+    role = TRANSACTION_ROLES.get(transaction_type)
+
+    if transaction_type == 'product_registration':
+        yield sender, role, 'produced', 1
+        yield sender, role, 'in_stock', 1
+
+    elif transaction_type == 'processing':
+        yield sender, data.get('actor_type'), 'processed', 1
+
+    elif transaction_type == 'transfer':
+        sender_role = data.get('sender_type')
+        recipient, recipient_role = data.get('recipient_id'), data.get('recipient_type')
+        yield sender, sender_role, 'distributed', 1
+        yield sender, sender_role, 'in_stock', -1
+        yield recipient, recipient_role, 'received', 1
+        yield recipient, recipient_role, 'in_stock', 1
+
+    elif transaction_type == 'quality_check':
+        yield sender, role, 'audits', 1
+        if not data.get('passed', True):
+            yield sender, role, 'violations', 1
+
+    elif transaction_type == 'retail':
+        yield sender, role, 'sold', 1
+        yield sender, role, 'in_stock', -1
+
+
+class SupplyChainStats:
+    """
+    Counters of the supply chain activity per user, per role and in total, for the dashboards.
+    They are updated when a block is sealed (or dropped by a fork switch), so reading them costs O(1).
+    """
+    def __init__(self):
+        self.users = {}  # username -> Counter
+        self.roles = {}  # role -> Counter
+        self.totals = Counter()
+
+    def _apply(self, block: Dict[str, Any], sign: int) -> None:
+        for tx in block['transactions']:
+            for user, role, counter, delta in transaction_deltas(tx):
+                delta *= sign
+                if user is not None:
+                    self.users.setdefault(user, Counter())[counter] += delta
+                self.roles.setdefault(role or 'unknown', Counter())[counter] += delta
+                self.totals[counter] += delta
+
+    def add_block(self, block: Dict[str, Any]) -> None:
+        """
+        Count the transactions of a sealed block
+
+        :param block: Sealed block
+        :return: None
+        """
+        self._apply(block, 1)
+
+    def remove_block(self, block: Dict[str, Any]) -> None:
+        """
+        Uncount the transactions of a block being removed from the tip of the chain
+
+        :param block: Block being removed
+        :return: None
+        """
+        self._apply(block, -1)
+
+    def clear(self) -> None:
+        """
+        Reset every counter
+
+        :return: None
+        """
+        self.users = {}
+        self.roles = {}
+        self.totals = Counter()
+
+    def state(self) -> Dict[str, Any]:
+        """
+        :return: JSON-serializable content of the counters, for checkpoints
+        """
+        return {
+            'users': {user: dict(counters) for user, counters in self.users.items()},
+            'roles': {role: dict(counters) for role, counters in self.roles.items()},
+            'totals': dict(self.totals)
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """
+        Replace the counters with a state returned by state()
+
+        :param state: Saved state
+        :return: None
+        """
+        self.users = {user: Counter(counters) for user, counters in state['users'].items()}
+        self.roles = {role: Counter(counters) for role, counters in state['roles'].items()}
+        self.totals = Counter(state['totals'])
+
+    @staticmethod
+    def _view(counters: Counter) -> Dict[str, int]:
+        return {counter: counters.get(counter, 0) for counter in COUNTERS}
+
+    def user(self, username: str) -> Dict[str, int]:
+        """
+        :param username: User
+        :return: Value of every counter for the user
+        """
+        return self._view(self.users.get(username, Counter()))
+
+    def role(self, role: str) -> Dict[str, int]:
+        """
+        :param role: Role, e.g. 'producer'
+        :return: Value of every counter summed over the users acting in this role
+        """
+        return self._view(self.roles.get(role, Counter()))
+
+    def total(self) -> Dict[str, int]:
+        """
+        :return: Value of every counter over all the users
+        """
+        return self._view(self.totals)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        :return: Counters in total and per role
+        """
+        return {
+            'totals': self.total(),
+            'roles': {role: self._view(counters) for role, counters in self.roles.items()}
+        }
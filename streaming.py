@@ -0,0 +1,87 @@
+import json
+from typing import Iterable, Iterator, Tuple, Any, Optional
+from flask import Response
+from chain_store import ChainStore
+
+
+# Size of the chunks written to the client
+CHUNK_SIZE = 64 * 1024
+
+
+class EncodedArray:
+    """
+    A JSON array whose items are already encoded, streamed item by item
+    """
+    def __init__(self, items: Iterable[bytes]):
+        self.items = items
+
+
+def encode_items(items: Iterable[Any]) -> EncodedArray:
+    """
+    Lazily encode the items of an array, one at a time while the response is streamed
+
+    :param items: JSON-serializable items
+    :return: EncodedArray
+    """
+    return EncodedArray(json.dumps(item, sort_keys=True).encode() for item in items)
+
+
+def chain_array(store: ChainStore, start: int = 1, limit: Optional[int] = None) -> EncodedArray:
+    """
+    Blocks of a chain by block index, as their canonical encodings produced while the response is streamed
+
+    :param store: A chain
+    :param start: Index of the first block (the genesis block has index 1)
+    :param limit: Maximum number of blocks, all the following ones if None
+    :return: EncodedArray
+    """
+    begin = max(start - 1, 0)
+    end = len(store) if limit is None else min(begin + limit, len(store))
+    return EncodedArray(store.encoded_range(begin, end))
+
+
+def iter_json_object(members: Iterable[Tuple[str, Any]]) -> Iterator[bytes]:
+    """
+    Encode a JSON object piece by piece. EncodedArray values are streamed,
+    other values are encoded with json.dumps.
+
+    :param members: (key, value) pairs of the object
+    :return: Iterator over the encoded pieces
+    """
+    yield b'{'
+    for position, (key, value) in enumerate(members):
+        yield (b', ' if position else b'') + json.dumps(key).encode() + b': '
+        if isinstance(value, EncodedArray):
+            yield b'['
+            for item_position, item in enumerate(value.items):
+                yield b', ' + item if item_position else item
+            yield b']'
+        else:
+            yield json.dumps(value, sort_keys=True).encode()
+    yield b'}'
+
+
+def _chunked(pieces: Iterator[bytes], size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    # Group the small pieces so that each write to the socket carries a reasonable amount of data
+    buffer = []
+    buffered = 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def json_stream(members: Iterable[Tuple[str, Any]], status: int = 200) -> Response:
+    """
+    Streamed JSON response: the document is never built in memory as a whole
+
+    :param members: (key, value) pairs of the response object
+    :param status: HTTP status code
+    :return: Flask response
+    """
+    return Response(_chunked(iter_json_object(members)), status=status, mimetype='application/json')
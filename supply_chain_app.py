@@ -1,8 +1,21 @@
 from flask import Flask, jsonify, request, render_template, redirect, url_for, session
 import uuid
 import json
+import os
+from datetime import datetime
 from supply_chain_blockchain import SupplyChainBlockchain
-from auth import AuthenticationSystem
+from block_log import FSYNC_INTERVAL
+from checkpoint import DEFAULT_CHECKPOINT_INTERVAL
+from auth import AuthenticationSystem, DEFAULT_KEY_ALGORITHM, canonical_message
+from key_pool import KeyPairPool, DEFAULT_LOW_WATER
+from block_producer import BlockProducer
+from bulk import SignatureVerifier, parse_bulk_body
+from sync import chain_headers
+from streaming import json_stream, chain_array, encode_items
+from records import as_dict
+from dashboard import dashboard_bp
+from search_index import SEARCH_FIELDS
+from time_index import parse_time
 
 # Instantiate our Node
 app = Flask(__name__, template_folder='templates', static_folder='static')
@@ -11,44 +24,87 @@ app.secret_key = str(uuid.uuid4())  # For session management
 # Generate a globally unique address for this node
 node_identifier = str(uuid.uuid4()).replace('-', '')
 
-# Instantiate the Blockchain and Authentication System
-blockchain = SupplyChainBlockchain()
+# Instantiate the Blockchain and Authentication System, mining with MINING_WORKERS processes
+# and persisting the blocks under DATA_DIR when it is set
+blockchain = SupplyChainBlockchain(
+    mining_workers=int(os.environ.get('MINING_WORKERS', 1)),
+    data_dir=os.environ.get('DATA_DIR'),
+    fsync=os.environ.get('BLOCK_LOG_FSYNC', FSYNC_INTERVAL),
+    checkpoint_interval=int(os.environ.get('CHECKPOINT_INTERVAL', DEFAULT_CHECKPOINT_INTERVAL))
+)
 auth_system = blockchain.auth_system  # Use the one from blockchain to ensure consistency
 
+# Background service that validates submitted transactions and mines them into blocks
+producer = BlockProducer(blockchain, verifier=SignatureVerifier(
+    workers=int(os.environ.get('VERIFY_WORKERS', os.cpu_count() or 1)),
+    auth_system=auth_system
+))
+producer.start()
+
 # In-memory storage for demo purposes - in a real app, use a database
 demo_users = {}
 
+# Key algorithm of the users registered without choosing one
+KEY_ALGORITHM = os.environ.get('KEY_ALGORITHM', DEFAULT_KEY_ALGORITHM)
+
+# Key pairs generated in the background, so that registrations do not wait for a key generation
+key_pool = KeyPairPool(auth_system, algorithms=(KEY_ALGORITHM,),
+                       low_water=int(os.environ.get('KEY_POOL_SIZE', DEFAULT_LOW_WATER)))
+key_pool.start()
+
+# The dashboard blueprint reads the blockchain and the demo users from the app config
+app.config['BLOCKCHAIN'] = blockchain
+app.config['DEMO_USERS'] = demo_users
+app.register_blueprint(dashboard_bp, url_prefix='/ui')
+
+# Page size of the per-actor product listings, and the largest one a client may ask for
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
 # Routes for the blockchain API
 
 @app.route('/mine', methods=['GET'])
 def mine():
-    # We run the proof of work algorithm to get the next proof...
-    last_block = blockchain.last_block
-    last_proof = last_block['proof']
-    proof = blockchain.proof_of_work(last_proof)
+    with blockchain.lock:
+        last_proof = blockchain.last_block['proof']
+        previous_hash = blockchain.last_block_hash
 
-    # We must receive a reward for finding the proof.
-    # The sender is "0" to signify that this node has mined a new block.
-    # Since regular transactions require a valid signature, we handle mining specially
-    blockchain.current_transactions.append({
-        'sender': "0",
-        'transaction_type': "mining",
-        'data': {"message": "Mining reward"},
-        'timestamp': blockchain.chain[-1]['timestamp'],
-        'signature': "MINING_TRANSACTION",
-        'transaction_id': str(uuid.uuid4()).replace('-', '')
-    })
-
-    # Forge the new Block by adding it to the chain
-    previous_hash = blockchain.hash(last_block)
-    block = blockchain.new_block(proof, previous_hash)
+    # We run the proof of work algorithm to get the next proof, without holding the lock
+    # so that the other handlers and the block producer keep going meanwhile
+    proof = blockchain.proof_of_work(last_proof)
+    if proof is None:
+        return jsonify({'error': 'Mining was cancelled, try again'}), 503
+
+    with blockchain.lock:
+        # Another block was forged or the chain was replaced while we were mining
+        if blockchain.last_block_hash != previous_hash:
+            return jsonify({'error': 'The chain moved on while mining, try again'}), 409
+
+        # We must receive a reward for finding the proof.
+        # The sender is "0" to signify that this node has mined a new block.
+        # Since regular transactions require a valid signature, we handle mining specially
+        blockchain.mempool.add({
+            'sender': "0",
+            'transaction_type': "mining",
+            'data': {"message": "Mining reward"},
+            'timestamp': blockchain.chain[-1]['timestamp'],
+            'signature': "MINING_TRANSACTION",
+            'transaction_id': str(uuid.uuid4()).replace('-', '')
+        }, first=True)
+
+        # Forge the new Block by adding it to the chain
+        block = blockchain.new_block(proof, previous_hash)
+
+    # Pending transactions submitted through the producer were sealed too
+    producer.confirm_block(block)
 
     response = {
         'message': "New Block Forged",
         'index': block['index'],
-        'transactions': block['transactions'],
+        'transactions': [as_dict(tx) for tx in block['transactions']],
         'proof': block['proof'],
         'previous_hash': block['previous_hash'],
+        'merkle_root': block['merkle_root'],
     }
     return jsonify(response), 200
 
@@ -62,26 +118,90 @@ def new_transaction():
     if not all(k in values for k in required):
         return jsonify({'error': 'Missing values'}), 400
 
-    try:
-        # Create a new Transaction
-        index = blockchain.new_transaction(
-            values['sender'], 
-            values['transaction_type'], 
-            values['data'], 
-            values['signature']
-        )
+    # Queue the Transaction, the block producer validates it and mines it into a block
+    transaction_id = producer.submit(
+        values['sender'], 
+        values['transaction_type'], 
+        values['data'], 
+        values['signature']
+    )
 
-        response = {'message': f'Transaction will be added to Block {index}'}
-        return jsonify(response), 201
-    
+    response = {
+        'message': 'Transaction queued for the next block',
+        'transaction_id': transaction_id,
+        'status': 'pending'
+    }
+    return jsonify(response), 202
+
+
+@app.route('/transactions/bulk', methods=['POST'])
+def new_transactions_bulk():
+    """
+    Add a batch of transactions, sent as a JSON array or as NDJSON (one transaction per line).
+    Every item gets its own result, in the order of the batch.
+    """
+    ndjson = request.mimetype in ('application/x-ndjson', 'application/jsonl')
+    try:
+        items = parse_bulk_body(request.get_data(), ndjson)
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
 
+    results = producer.submit_batch(items)
+    accepted = sum(1 for result in results if result['status'] == 'pending')
+    return json_stream([
+        ('accepted', accepted),
+        ('rejected', len(results) - accepted),
+        ('results', encode_items(results))
+    ])
+
+
+@app.route('/transactions/<transaction_id>/status', methods=['GET'])
+def transaction_status(transaction_id):
+    """Get the status of a submitted transaction"""
+    status = producer.get_status(transaction_id)
+    if status:
+        return jsonify(status), 200
+    else:
+        return jsonify({'error': f'Transaction {transaction_id} not found'}), 404
+
+
+@app.route('/mempool', methods=['GET'])
+def mempool_stats():
+    """Get the depth and age of the pending transactions"""
+    with blockchain.lock:
+        stats = blockchain.mempool.stats()
+    return jsonify(stats), 200
+
 
 @app.route('/chain', methods=['GET'])
 def full_chain():
+    # Peers syncing with us only ask for the blocks they are missing: /chain?from=<index>&limit=<n>
+    start = request.args.get('from', 1, type=int)
+    limit = request.args.get('limit', type=int)
+
+    # The blocks are streamed from the encodings cached when they were sealed
+    return json_stream([
+        ('chain', chain_array(blockchain.chain, start, limit)),
+        ('length', len(blockchain.chain)),
+    ])
+
+
+@app.route('/chain/tip', methods=['GET'])
+def chain_tip():
     response = {
-        'chain': blockchain.chain,
+        'height': len(blockchain.chain),
+        'hash': blockchain.last_block_hash,
+    }
+    return jsonify(response), 200
+
+
+@app.route('/chain/headers', methods=['GET'])
+def chain_block_headers():
+    start = request.args.get('from', 1, type=int)
+    limit = request.args.get('limit', type=int)
+
+    response = {
+        'headers': chain_headers(blockchain.chain, start, limit),
         'length': len(blockchain.chain),
     }
     return jsonify(response), 200
@@ -110,29 +230,143 @@ def consensus():
     replaced = blockchain.resolve_conflicts()
 
     if replaced:
-        response = {
-            'message': 'Our chain was replaced',
-            'new_chain': blockchain.chain
-        }
+        return json_stream([
+            ('message', 'Our chain was replaced'),
+            ('new_chain', chain_array(blockchain.chain)),
+            ('peers', blockchain.peer_report),
+        ])
     else:
-        response = {
-            'message': 'Our chain is authoritative',
-            'chain': blockchain.chain
-        }
-
-    return jsonify(response), 200
+        return json_stream([
+            ('message', 'Our chain is authoritative'),
+            ('chain', chain_array(blockchain.chain)),
+            ('peers', blockchain.peer_report),
+        ])
 
 
 # Routes for supply chain functionality
 
+@app.route('/products/search', methods=['GET'])
+def search_products():
+    """
+    Search the registered products by attribute, one page at a time:
+    ?name=<substring>&batch_number=<value or prefix*>&category=...&offset=<n>&limit=<n>
+    """
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', PAGE_SIZE, type=int)
+    if offset < 0 or not 0 < limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'offset must be positive and limit between 1 and {MAX_PAGE_SIZE}'}), 400
+
+    criteria = {field: request.args[field] for field in SEARCH_FIELDS if field in request.args}
+    try:
+        results = blockchain.search_products(criteria, offset, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    results.update(offset=offset, limit=limit)
+    return jsonify(results), 200
+
+
+@app.route('/geo/products', methods=['GET'])
+def products_near():
+    """Products originating within a distance of a point: ?lat=<deg>&lon=<deg>&radius_km=<km>&offset=<n>&limit=<n>"""
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', PAGE_SIZE, type=int)
+    if offset < 0 or not 0 < limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'offset must be positive and limit between 1 and {MAX_PAGE_SIZE}'}), 400
+
+    try:
+        results = blockchain.products_near(request.args.get('lat', type=float), request.args.get('lon', type=float),
+                                           request.args.get('radius_km', 10.0, type=float), offset, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    results.update(offset=offset, limit=limit)
+    return jsonify(results), 200
+
+
+@app.route('/geo/transfers', methods=['GET'])
+def transfers_in_bbox():
+    """
+    Transfers departing from a bounding box: ?south=<deg>&west=<deg>&north=<deg>&east=<deg>,
+    &direction=arrival for the transfers arriving in it
+    """
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', PAGE_SIZE, type=int)
+    if offset < 0 or not 0 < limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'offset must be positive and limit between 1 and {MAX_PAGE_SIZE}'}), 400
+
+    try:
+        results = blockchain.transfers_in_bbox(*(request.args.get(side, type=float)
+                                                 for side in ('south', 'west', 'north', 'east')),
+                                               direction=request.args.get('direction', 'departure'),
+                                               offset=offset, limit=limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    results.update(offset=offset, limit=limit)
+    return jsonify(results), 200
+
+
+@app.route('/geo/retailers/nearest', methods=['GET'])
+def nearest_retailers():
+    """Retailers nearest to a point: ?lat=<deg>&lon=<deg>&count=<n>"""
+    count = request.args.get('count', 5, type=int)
+    if not 0 < count <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'count must be between 1 and {MAX_PAGE_SIZE}'}), 400
+
+    try:
+        retailers = blockchain.nearest_retailers(request.args.get('lat', type=float),
+                                                 request.args.get('lon', type=float), count)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'retailers': retailers}), 200
+
+
+@app.route('/transactions', methods=['GET'])
+def list_transactions():
+    """
+    Sealed transactions in a time range, oldest first: ?since=<time>&until=<time>&type=<type>&actor=<id>&limit=<n>,
+    a time being seconds since the epoch or an ISO 8601 timestamp. The next page is requested with
+    &cursor=<next_cursor> and the same filters.
+    """
+    limit = request.args.get('limit', PAGE_SIZE, type=int)
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+
+    try:
+        since, until = (parse_time(request.args[bound]) if bound in request.args else None
+                        for bound in ('since', 'until'))
+        results = blockchain.get_transactions(since, until, request.args.get('type'), request.args.get('actor'),
+                                              request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    results['limit'] = limit
+    return jsonify(results), 200
+
+
 @app.route('/products/<product_id>/history', methods=['GET'])
 def product_history(product_id):
     """Get the complete history of a product"""
     try:
         history = blockchain.get_product_history(product_id)
-        return jsonify({'product_id': product_id, 'history': history}), 200
+        return json_stream([
+            ('product_id', product_id),
+            ('history', encode_items(history)),
+        ])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+
+
+@app.route('/products/<product_id>/proof', methods=['GET'])
+def product_proof(product_id):
+    """Get the inclusion proof of the history of a product, checkable by a light client"""
+    try:
+        proof = blockchain.get_product_proof(product_id)
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
+    return json_stream([
+        ('product_id', proof['product_id']),
+        ('tip', proof['tip']),
+        ('transactions', encode_items(proof['transactions'])),
+        ('headers', encode_items(proof['headers'])),
+    ])
 
 
 @app.route('/products/<product_id>/verify', methods=['GET'])
@@ -156,7 +390,7 @@ def register_user():
     
     try:
         # Generate a key pair for the new user
-        private_key, public_key = auth_system.generate_key_pair()
+        private_key, public_key = key_pool.take(values.get('key_algorithm', KEY_ALGORITHM))
         
         # Register the user
         user_id = auth_system.register_user(
@@ -177,6 +411,7 @@ def register_user():
             'message': 'User registered successfully',
             'username': values['username'],
             'user_id': user_id,
+            'key_algorithm': auth_system.get_user_info(values['username'])['key_algorithm'],
             'public_key': public_key,
             'private_key': private_key  # In a real app, NEVER return the private key!
         }), 201
@@ -195,6 +430,36 @@ def user_info(username):
         return jsonify({'error': f'User {username} not found'}), 404
 
 
+@app.route('/users/<username>/products', methods=['GET'])
+def user_products(username):
+    """Get the products a user currently owns, one page at a time: ?offset=<n>&limit=<n>"""
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', PAGE_SIZE, type=int)
+    if offset < 0 or not 0 < limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'offset must be positive and limit between 1 and {MAX_PAGE_SIZE}'}), 400
+
+    page = blockchain.get_owned_products(username, offset, limit)
+    page.update(offset=offset, limit=limit)
+    return jsonify(page), 200
+
+
+@app.route('/users/<username>/stats', methods=['GET'])
+def user_stats(username):
+    """Get the activity counters of a user and of their role, kept up to date as blocks are sealed"""
+    user_info = auth_system.get_user_info(username)
+    if not user_info:
+        return jsonify({'error': f'User {username} not found'}), 404
+
+    response = {
+        'username': username,
+        'role': user_info['role'],
+        'user': blockchain.stats.user(username),
+        'role_totals': blockchain.stats.role(user_info['role']),
+        'totals': blockchain.stats.total(),
+    }
+    return jsonify(response), 200
+
+
 @app.route('/sign', methods=['POST'])
 def sign_data():
     """Sign data with a user's private key (demo only)"""
@@ -232,13 +497,14 @@ def ui_register():
         username = request.form.get('username')
         role = request.form.get('role')
         organization = request.form.get('organization')
+        algorithm = request.form.get('key_algorithm', KEY_ALGORITHM)
         
         if not all([username, role, organization]):
-            return render_template('register.html', error="All fields are required")
+            return render_template('register.html', error="All fields are required", key_algorithm=algorithm)
         
         try:
             # Generate a key pair for the new user
-            private_key, public_key = auth_system.generate_key_pair()
+            private_key, public_key = key_pool.take(algorithm)
             
             # Register the user
             user_id = auth_system.register_user(
@@ -256,28 +522,12 @@ def ui_register():
             }
             
             session['username'] = username
-            return redirect(url_for('ui_dashboard'))
+            return redirect(url_for('dashboard.dashboard'))
         
         except ValueError as e:
-            return render_template('register.html', error=str(e))
-    
-    return render_template('register.html')
-
-
-@app.route('/ui/dashboard')
-def ui_dashboard():
-    """User dashboard"""
-    username = session.get('username')
-    if not username:
-        return redirect(url_for('ui_login'))
+            return render_template('register.html', error=str(e), key_algorithm=algorithm)
     
-    user_info = auth_system.get_user_info(username)
-    demo_info = demo_users.get(username, {})
-    
-    return render_template('dashboard.html', 
-                           user_info=user_info, 
-                           demo_info=demo_info, 
-                           blockchain_length=len(blockchain.chain))
+    return render_template('register.html', key_algorithm=KEY_ALGORITHM)
 
 
 @app.route('/ui/login', methods=['GET', 'POST'])
@@ -290,7 +540,7 @@ def ui_login():
             return render_template('login.html', error="Invalid username")
         
         session['username'] = username
-        return redirect(url_for('ui_dashboard'))
+        return redirect(url_for('dashboard.dashboard'))
     
     return render_template('login.html')
 
@@ -342,25 +592,25 @@ def ui_register_product():
                     'additional_info': {}
                 })
             
-            # Sign the data
-            signature = auth_system.sign_data(demo_users[username]['private_key'], data)
+            # Report the errors of the form now, only the sealing is left to the block producer
+            blockchain.check_transaction(username, 'product_registration', data)
+
+            # Sign the data. Its encoding is kept, the block producer verifies the signature against it
+            message = canonical_message(data)
+            signature = auth_system.sign_data(demo_users[username]['private_key'], message)
             
-            # Create the transaction
-            blockchain.new_transaction(
+            # Queue the transaction, the block producer mines it into a block
+            transaction_id = producer.submit(
                 username,
                 'product_registration',
                 data,
-                signature
+                signature,
+                message=message
             )
             
-            # Mine a block to include this transaction
-            last_block = blockchain.last_block
-            last_proof = last_block['proof']
-            proof = blockchain.proof_of_work(last_proof)
-            previous_hash = blockchain.hash(last_block)
-            block = blockchain.new_block(proof, previous_hash)
-            
-            return render_template('product_registered.html', product_id=data['product_id'])
+            return render_template('product_registered.html', 
+                                product_id=data['product_id'], 
+                                transaction_id=transaction_id)
         
         except Exception as e:
             return render_template('register_product.html', error=str(e))
@@ -400,36 +650,32 @@ def ui_transfer_product():
                 'additional_info': {}
             }
             
-            # Sign the data
-            signature = auth_system.sign_data(demo_users[username]['private_key'], data)
+            # Report the errors of the form now, only the sealing is left to the block producer
+            blockchain.check_transaction(username, 'transfer', data)
+
+            # Sign the data. Its encoding is kept, the block producer verifies the signature against it
+            message = canonical_message(data)
+            signature = auth_system.sign_data(demo_users[username]['private_key'], message)
             
-            # Create the transaction
-            blockchain.new_transaction(
+            # Queue the transaction, the block producer mines it into a block
+            transaction_id = producer.submit(
                 username,
                 'transfer',
                 data,
-                signature
+                signature,
+                message=message
             )
             
-            # Mine a block to include this transaction
-            last_block = blockchain.last_block
-            last_proof = last_block['proof']
-            proof = blockchain.proof_of_work(last_proof)
-            previous_hash = blockchain.hash(last_block)
-            block = blockchain.new_block(proof, previous_hash)
-            
             return render_template('transfer_completed.html', 
                                 product_id=data['product_id'], 
-                                recipient=request.form.get('recipient'))
+                                recipient=request.form.get('recipient'),
+                                transaction_id=transaction_id)
         
         except Exception as e:
             return render_template('transfer_product.html', error=str(e))
     
     # For GET requests, show the form with a list of products owned by the user
-    owned_products = []
-    for product_id, details in blockchain.products.items():
-        if details['current_owner'] == username:
-            owned_products.append(product_id)
+    owned_products = [product['product_id'] for product in blockchain.get_owned_products(username)['products']]
     
     # Get a list of all users except the current one
     all_users = list(auth_system.registered_users.keys())
@@ -440,6 +686,24 @@ def ui_transfer_product():
                            other_users=other_users)
 
 
+@app.route('/ui/inventory')
+def ui_inventory():
+    """Products the user currently owns, one page at a time"""
+    username = session.get('username')
+    if not username:
+        return redirect(url_for('ui_login'))
+
+    page_number = max(request.args.get('page', 1, type=int), 1)
+    inventory = blockchain.get_owned_products(username, (page_number - 1) * PAGE_SIZE, PAGE_SIZE)
+    page_count = max((inventory['total'] + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+
+    return render_template('inventory.html',
+                           products=inventory['products'],
+                           total=inventory['total'],
+                           page=page_number,
+                           page_count=page_count)
+
+
 @app.route('/ui/product/<product_id>')
 def ui_product_details(product_id):
     """View product details and history"""
@@ -459,35 +723,46 @@ def ui_product_details(product_id):
 
 @app.route('/ui/search', methods=['GET', 'POST'])
 def ui_search_product():
-    """Search for a product by ID"""
+    """Search for a product by ID, or by its attributes"""
     if request.method == 'POST':
         product_id = request.form.get('product_id')
-        try:
-            blockchain.get_product_history(product_id)  # Check if product exists
+        if product_id in blockchain.products:
             return redirect(url_for('ui_product_details', product_id=product_id))
-        except ValueError:
-            return render_template('search.html', error=f"Product ID {product_id} not found")
-    
-    return render_template('search.html')
+        return render_template('search.html', error=f"Product ID {product_id} not found", criteria={})
+
+    criteria = {field: request.args[field] for field in SEARCH_FIELDS if request.args.get(field, '').strip()}
+    if not criteria:
+        return render_template('search.html', criteria={})
+
+    page_number = max(request.args.get('page', 1, type=int), 1)
+    try:
+        results = blockchain.search_products(criteria, (page_number - 1) * PAGE_SIZE, PAGE_SIZE)
+    except ValueError as e:
+        return render_template('search.html', error=str(e), criteria=criteria)
+
+    return render_template('search.html',
+                           criteria=criteria,
+                           results=results['products'],
+                           total=results['total'],
+                           page=page_number,
+                           page_count=max((results['total'] + PAGE_SIZE - 1) // PAGE_SIZE, 1))
 
 
 if __name__ == '__main__':
-    from datetime import datetime
-    
     # For demo purposes, pre-register some users
-    private_key1, public_key1 = auth_system.generate_key_pair()
+    private_key1, public_key1 = key_pool.take(KEY_ALGORITHM)
     auth_system.register_user('farmer1', public_key1, 'producer', 'Organic Farm Co.')
     demo_users['farmer1'] = {'private_key': private_key1, 'public_key': public_key1, 'user_id': 'farmer1-id'}
     
-    private_key2, public_key2 = auth_system.generate_key_pair()
+    private_key2, public_key2 = key_pool.take(KEY_ALGORITHM)
     auth_system.register_user('processor1', public_key2, 'processor', 'GreenProcess Inc.')
     demo_users['processor1'] = {'private_key': private_key2, 'public_key': public_key2, 'user_id': 'processor1-id'}
     
-    private_key3, public_key3 = auth_system.generate_key_pair()
+    private_key3, public_key3 = key_pool.take(KEY_ALGORITHM)
     auth_system.register_user('distributor1', public_key3, 'distributor', 'EcoDistribution Ltd.')
     demo_users['distributor1'] = {'private_key': private_key3, 'public_key': public_key3, 'user_id': 'distributor1-id'}
     
-    private_key4, public_key4 = auth_system.generate_key_pair()
+    private_key4, public_key4 = key_pool.take(KEY_ALGORITHM)
     auth_system.register_user('retailer1', public_key4, 'retailer', 'GreenMart')
     demo_users['retailer1'] = {'private_key': private_key4, 'public_key': public_key4, 'user_id': 'retailer1-id'}
     
@@ -1,27 +1,83 @@
-import hashlib
-import json
+import os
+import threading
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import uuid
-import requests
 from urllib.parse import urlparse
 from auth import AuthenticationSystem
-from supply_chain_model import validate_transaction, transaction_factory
+from supply_chain_model import normalize_transaction
+from indexes import ProductHistoryIndex, OwnerIndex, SealedTransactionIndex
+from stats import SupplyChainStats
+from search_index import ProductSearchIndex, document_view
+from geo_index import GeoIndex, point_view
+from time_index import TimeIndex, transaction_time, encode_cursor, decode_cursor
+from mining import ParallelMiner, find_proof, valid_proof
+from peers import PeerClient
+from sync import sync_longest_chain, chain_headers
+from chain_store import ChainStore, block_digest, verify_chain, verify_links
+from merkle import merkle_root, merkle_path, transaction_hash
+from block_log import open_chain_store, FSYNC_INTERVAL
+from checkpoint import CheckpointStore, DEFAULT_CHECKPOINT_INTERVAL
+from mempool import Mempool
+from records import Transaction, as_dict
 
 
 class SupplyChainBlockchain:
-    def __init__(self):
+    def __init__(self, mining_workers: int = 1, mempool: Optional[Mempool] = None,
+                 data_dir: Optional[str] = None, fsync: str = FSYNC_INTERVAL,
+                 checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL):
         # Initialize blockchain attributes
-        self.chain = []
-        self.current_transactions = []
+        # Sealed blocks are kept in memory, or in a block log under data_dir that survives restarts
+        self.chain = open_chain_store(data_dir, fsync)
+        self.mempool = mempool or Mempool()
         self.nodes = set()
+
+        # Client used to fetch the chains of the other nodes, and the outcome of the last round
+        self.peer_client = PeerClient()
+        self.peer_report = {}
         self.auth_system = AuthenticationSystem()
+
+        # Number of processes used by proof_of_work (1 mines on the calling thread)
+        self.mining_workers = mining_workers
+        self._miner = None
+
+        # Guards the chain and the pending transactions against concurrent writers
+        self.lock = threading.RLock()
         
         # Create a dictionary to track products
         self.products = {}  # product_id -> details
+
+        # Index of product transactions in sealed blocks
+        self.product_index = ProductHistoryIndex()
+
+        # Products of each actor, follows the current_owner of the products state
+        self.owner_index = OwnerIndex()
+
+        # Activity counters of the dashboards, updated as blocks are sealed
+        self.stats = SupplyChainStats()
+
+        # Attributes of the registered products, for the search
+        self.search_index = ProductSearchIndex()
+
+        # Locations of the sealed transactions, for the spatial queries
+        self.geo_index = GeoIndex()
+
+        # Sealed transactions sorted by time, for the range queries
+        self.time_index = TimeIndex()
+
+        # IDs and signatures of the sealed transactions, so that a signed transaction cannot be replayed
+        self.sealed_transactions = SealedTransactionIndex()
         
-        # Create the genesis block
-        self.new_block(previous_hash=1, proof=100)
+        # Snapshots of the derived state, so that it can be recovered without replaying the whole chain
+        self.checkpoints = None
+        if data_dir is not None:
+            self.checkpoints = CheckpointStore(os.path.join(data_dir, 'checkpoints'), checkpoint_interval)
+
+        # Create the genesis block, unless the chain was restored from the block log
+        if len(self.chain) == 0:
+            self.new_block(previous_hash=1, proof=100)
+        else:
+            self._recover_state()
 
     def register_node(self, address: str) -> None:
         """
@@ -33,65 +89,48 @@ class SupplyChainBlockchain:
         parsed_url = urlparse(address)
         self.nodes.add(parsed_url.netloc)
 
-    def valid_chain(self, chain: List[Dict[str, Any]]) -> bool:
+    def valid_chain(self, chain: List[Dict[str, Any]], verify: bool = True) -> bool:
         """
         Determine if a given blockchain is valid
         
         :param chain: A blockchain
+        :param verify: Recompute the hash of every block. Only a ChainStore of blocks
+                       sealed by this node can be checked with its cached hashes instead
         :return: True if valid, False if not
         """
-        last_block = chain[0]
-        current_index = 1
+        if not verify and isinstance(chain, ChainStore):
+            return verify_links(chain, self.valid_proof)
 
-        while current_index < len(chain):
-            block = chain[current_index]
-            
-            # Check that the hash of the block is correct
-            if block['previous_hash'] != self.hash(last_block):
-                return False
-
-            # Check that the Proof of Work is correct
-            if not self.valid_proof(last_block['proof'], block['proof']):
-                return False
-
-            last_block = block
-            current_index += 1
-
-        return True
+        return verify_chain(chain, self.valid_proof) is not None
 
     def resolve_conflicts(self) -> bool:
         """
         This is our Consensus Algorithm, it resolves conflicts
         by replacing our chain with the longest one in the network.
+        Only the tips of the peers and the blocks we are missing are downloaded, without
+        holding the chain lock, and the outcome for each peer is kept in peer_report.
         
         :return: True if our chain was replaced, False if not
         """
-        neighbours = self.nodes
-        new_chain = None
-
-        # We're only looking for chains longer than ours
-        max_length = len(self.chain)
-
-        # Grab and verify the chains from all the nodes in our network
-        for node in neighbours:
-            response = requests.get(f'http://{node}/chain')
+        best, report = sync_longest_chain(self.peer_client, self.nodes, self.chain, self.valid_proof)
 
-            if response.status_code == 200:
-                length = response.json()['length']
-                chain = response.json()['chain']
+        with self.lock:
+            self.peer_report = report
+            if best is None:
+                return False
 
-                # Check if the length is longer and the chain is valid
-                if length > max_length and self.valid_chain(chain):
-                    max_length = length
-                    new_chain = chain
+            # Our chain may have moved while we were downloading, the new blocks must still fit on it
+            node, fork, suffix = best
+            if fork > len(self.chain) or fork + len(suffix) <= len(self.chain):
+                return False
+            if fork and suffix[0]['previous_hash'] != self.chain.hash_at(fork - 1):
+                return False
 
-        # Replace our chain if we discovered a new, valid chain longer than ours
-        if new_chain:
-            self.chain = new_chain
+            # Replace the divergent part of our chain with the longer valid chain we discovered
+            self._replace_suffix(fork, suffix)
+            self.peer_report[node]['chain'] = 'adopted'
             return True
 
-        return False
-
     def new_block(self, proof: int, previous_hash=None) -> Dict[str, Any]:
         """
         Create a new Block in the Blockchain
@@ -100,21 +139,188 @@ class SupplyChainBlockchain:
         :param previous_hash: Hash of previous Block
         :return: New Block
         """
+        # Seal the oldest pending transactions, up to the block size of the mempool
+        transactions = self.mempool.take()
         block = {
             'index': len(self.chain) + 1,
             'timestamp': datetime.now().isoformat(),
-            'transactions': self.current_transactions,
+            'transactions': transactions,
             'proof': proof,
-            'previous_hash': previous_hash or self.hash(self.chain[-1]),
+            'previous_hash': previous_hash or self.chain.hash_at(-1),
+            # The hash of the block covers the transactions through their Merkle root
+            'merkle_root': merkle_root(transactions),
         }
 
-        # Reset the current list of transactions
-        self.current_transactions = []
-
         self.chain.append(block)
+        # The chain keeps the block in its compact form
+        block = self.chain[-1]
+        self.product_index.add_block(block)
+        self.stats.add_block(block)
+        self.search_index.add_block(block)
+        self.geo_index.add_block(block)
+        self.time_index.add_block(block)
+        self.sealed_transactions.add_block(block)
+
+        if self.checkpoints is not None and self.checkpoints.due(len(self.chain)):
+            self._save_checkpoint()
         return block
 
-    def new_transaction(self, sender: str, transaction_type: str, data: Dict[str, Any], signature: str) -> int:
+    def _state(self) -> Dict[str, Any]:
+        """
+        :return: JSON-serializable state derived from the chain, plus the user registry
+        """
+        return {
+            'products': self.products,
+            'product_index': self.product_index.state(),
+            'owner_index': self.owner_index.state(),
+            'stats': self.stats.state(),
+            'search_index': self.search_index.state(),
+            'geo_index': self.geo_index.state(),
+            'time_index': self.time_index.state(),
+            'sealed_transactions': self.sealed_transactions.state(),
+            'registered_users': self.auth_system.registered_users
+        }
+
+    def _load_state(self, state: Dict[str, Any], height: int) -> None:
+        """
+        Replace the derived state with a state returned by _state()
+
+        :param state: Saved state
+        :param height: Number of blocks the state was derived from
+        :return: None
+        """
+        self.products = state['products']
+        self.product_index.load_state(state['product_index'])
+        # Snapshots taken before the owner index existed are indexed again from the products
+        if 'owner_index' in state:
+            self.owner_index.load_state(state['owner_index'])
+        else:
+            self.owner_index.rebuild(self.products)
+        # Snapshots taken before the stats, the search, geo and time indexes or the sealed transactions index
+        # existed are rebuilt from their blocks
+        for name, index in (('stats', self.stats), ('search_index', self.search_index), ('geo_index', self.geo_index),
+                            ('time_index', self.time_index), ('sealed_transactions', self.sealed_transactions)):
+            if name in state:
+                index.load_state(state[name])
+            else:
+                index.clear()
+                for position in range(height):
+                    index.add_block(self.chain[position])
+
+    def _save_checkpoint(self) -> None:
+        """
+        Snapshot the state derived from the sealed blocks
+
+        :return: None
+        """
+        # The products state includes the pending transactions, take them out of the snapshot
+        pending = list(self.mempool)
+        for tx in reversed(pending):
+            self._revert_from_products(tx)
+        try:
+            self.checkpoints.save(len(self.chain), self.chain.hash_at(-1), self._state())
+        finally:
+            for tx in pending:
+                self._apply_to_products(tx)
+
+    def _recover_state(self) -> None:
+        """
+        Rebuild the derived state of a chain restored from the block log:
+        load the newest valid snapshot and replay only the blocks sealed after it
+
+        :return: None
+        """
+        snapshot = self.checkpoints.load_latest(self.chain) if self.checkpoints is not None else None
+        if snapshot is None:
+            self._replay(0)
+            return
+
+        self._load_state(snapshot['state'], snapshot['height'])
+        # Users registered since the snapshot are kept
+        for username, info in snapshot['state']['registered_users'].items():
+            self.auth_system.registered_users.setdefault(username, info)
+        self._replay(snapshot['height'])
+
+    def _replay(self, start: int) -> None:
+        """
+        Apply the sealed blocks from a position onwards to the products state and the indexes
+
+        :param start: Position of the first block to replay
+        :return: None
+        """
+        for position in range(start, len(self.chain)):
+            block = self.chain[position]
+            for tx in block['transactions']:
+                self._apply_to_products(tx)
+            self.product_index.add_block(block)
+            self.stats.add_block(block)
+            self.search_index.add_block(block)
+            self.geo_index.add_block(block)
+            self.time_index.add_block(block)
+            self.sealed_transactions.add_block(block)
+
+    def _replace_suffix(self, fork: int, suffix: ChainStore) -> None:
+        """
+        Swap the blocks after the fork point for the validated blocks of a peer.
+        The products state and the indexes are rolled back to the fork point and forward
+        again, so the cost depends on the length of the fork, not of the chain.
+
+        :param fork: Number of leading blocks to keep
+        :param suffix: Validated blocks that follow them
+        :return: None
+        """
+        # Pending transactions were applied on top of the chain, undo them first
+        pending = self.mempool.take(len(self.mempool))
+        for tx in reversed(pending):
+            self._revert_from_products(tx)
+
+        # Roll the state back block by block, unless replaying from a snapshot below the fork is cheaper
+        snapshot = None
+        if self.checkpoints is not None:
+            heights = [height for height in self.checkpoints.heights() if height <= fork]
+            if heights and fork - heights[0] < len(self.chain) - fork:
+                snapshot = self.checkpoints.load_latest(self.chain, max_height=fork)
+
+        orphaned = []
+        for position in range(len(self.chain) - 1, fork - 1, -1):
+            block = self.chain[position]
+            if snapshot is None:
+                for tx in reversed(block['transactions']):
+                    self._revert_from_products(tx)
+                self.product_index.remove_block(block)
+                self.stats.remove_block(block)
+                self.search_index.remove_block(block)
+                self.geo_index.remove_block(block)
+                self.time_index.remove_block(block)
+                self.sealed_transactions.remove_block(block)
+            orphaned[:0] = block['transactions']
+
+        self.chain.truncate(fork)
+        if self.checkpoints is not None:
+            self.checkpoints.discard_above(fork)
+        self.chain.extend(suffix)
+
+        if snapshot is not None:
+            self._load_state(snapshot['state'], snapshot['height'])
+            self._replay(snapshot['height'])
+        else:
+            self._replay(fork)
+
+        # Transactions of our dropped blocks and pending ones go back to the mempool if still valid
+        for tx in orphaned + pending:
+            if self.sealed_transactions.contains(tx['transaction_id'], tx.get('signature')) \
+                    or tx.get('transaction_type') == 'mining':
+                continue
+            try:
+                self._check_product_state(tx['sender'], tx['transaction_type'], tx['data'])
+                self.mempool.add(tx)
+            except ValueError:
+                continue
+            self._apply_to_products(tx)
+
+    def new_transaction(self, sender: str, transaction_type: str, data: Dict[str, Any], signature: str,
+                        transaction_id: Optional[str] = None, signature_verified: bool = False,
+                        message: Optional[bytes] = None) -> int:
         """
         Creates a new transaction to go into the next mined Block
         
@@ -122,6 +328,10 @@ class SupplyChainBlockchain:
         :param transaction_type: Type of transaction (e.g., "product_registration", "processing", "transfer")
         :param data: Transaction-specific data
         :param signature: Cryptographic signature of the data
+        :param transaction_id: ID assigned to the transaction, generated if not given
+        :param signature_verified: The signature was already checked against the key of the sender,
+                                   e.g. by a SignatureVerifier for a batch of transactions
+        :param message: Canonical encoding of data (see auth.canonical_message), if the caller already built it
         :return: The index of the Block that will hold this transaction
         """
         # Get sender's public key from our auth system
@@ -130,24 +340,68 @@ class SupplyChainBlockchain:
             raise ValueError(f"Unknown sender: {sender}")
         
         # Verify the signature
-        if not self.auth_system.verify_signature(sender_info['public_key'], data, signature):
+        if not signature_verified and not self.auth_system.verify_signature(
+                sender_info['public_key'], message if message is not None else data, signature):
             raise ValueError("Invalid signature")
         
-        # Validate transaction data based on its type
-        if not validate_transaction(transaction_type, data):
-            raise ValueError(f"Invalid {transaction_type} transaction data")
+        # Validate and normalize the transaction data based on its type, in a single pass.
+        # Raises a ValidationError (a ValueError) listing the problems of the payload
+        normalized = normalize_transaction(transaction_type, data)
+
+        # Reject duplicates, pending or sealed, and refuse new work when the mempool is full, before touching any state
+        transaction_id = transaction_id or str(uuid.uuid4()).replace('-', '')
+        self.mempool.check(transaction_id, signature)
+        self.sealed_transactions.check(transaction_id, signature)
+        
+        # Check the transaction against the current state of the products
+        self._check_product_state(sender, transaction_type, data)
         
-        # Process specific transaction types
+        # Create the transaction
+        transaction = Transaction.from_dict({
+            'sender': sender,
+            'transaction_type': transaction_type,
+            'data': normalized,
+            'timestamp': datetime.now().isoformat(),
+            'signature': signature,
+            'transaction_id': transaction_id
+        })
+        
+        self.mempool.add(transaction)
+        self._apply_to_products(transaction)
+
+        return self.last_block['index'] + 1
+
+    def check_transaction(self, sender: str, transaction_type: str, data: Dict[str, Any]) -> None:
+        """
+        Check a transaction as new_transaction would, apart from its signature, without queueing it.
+        Lets a form report its errors at once, before the transaction is handed to the block producer.
+
+        :param sender: Identity of the sender
+        :param transaction_type: Type of transaction
+        :param data: Transaction-specific data
+        :return: None
+        :raises ValueError: if the sender is unknown, the payload invalid or it conflicts with the products state
+        """
+        with self.lock:
+            if not self.auth_system.get_user_info(sender):
+                raise ValueError(f"Unknown sender: {sender}")
+            normalize_transaction(transaction_type, data)
+            self._check_product_state(sender, transaction_type, data)
+
+    def _check_product_state(self, sender: str, transaction_type: str, data: Dict[str, Any]) -> None:
+        """
+        Check a transaction against the current state of the products
+
+        :param sender: Identity of the sender
+        :param transaction_type: Type of transaction
+        :param data: Transaction-specific data
+        :return: None
+        :raises ValueError: if the transaction conflicts with the products state
+        """
         if transaction_type == "product_registration":
             product_id = data.get('product_id')
             if product_id in self.products:
                 raise ValueError(f"Product ID {product_id} already exists")
-            self.products[product_id] = {
-                'registered_by': sender,
-                'registration_time': datetime.now().isoformat(),
-                'current_owner': sender,
-                'history': []
-            }
         
         elif transaction_type == "transfer":
             product_id = data.get('product_id')
@@ -156,29 +410,65 @@ class SupplyChainBlockchain:
             
             if self.products[product_id]['current_owner'] != sender:
                 raise ValueError(f"Sender {sender} does not own product {product_id}")
-            
-            # Update ownership
-            self.products[product_id]['current_owner'] = data.get('recipient_id')
-            self.products[product_id]['history'].append({
-                'transaction_type': 'transfer',
-                'timestamp': datetime.now().isoformat(),
-                'from': sender,
-                'to': data.get('recipient_id')
-            })
-        
-        # Create the transaction
-        transaction = {
-            'sender': sender,
-            'transaction_type': transaction_type,
-            'data': transaction_factory(transaction_type, data),
-            'timestamp': datetime.now().isoformat(),
-            'signature': signature,
-            'transaction_id': str(uuid.uuid4()).replace('-', '')
-        }
-        
-        self.current_transactions.append(transaction)
 
-        return self.last_block['index'] + 1
+    def _apply_to_products(self, tx: Dict[str, Any]) -> None:
+        """
+        Update the products state with a transaction.
+        Transactions that conflict with the state (e.g. from a peer block) are ignored.
+
+        :param tx: Transaction
+        :return: None
+        """
+        transaction_type = tx.get('transaction_type')
+        product_id = tx.get('data', {}).get('product_id')
+
+        if transaction_type == "product_registration":
+            if product_id not in self.products:
+                self.products[product_id] = {
+                    'registered_by': tx['sender'],
+                    'registration_time': tx['timestamp'],
+                    'current_owner': tx['sender'],
+                    'history': [],
+                    'transaction_id': tx['transaction_id']
+                }
+                self.owner_index.add(tx['sender'], product_id)
+
+        elif transaction_type == "transfer":
+            product = self.products.get(product_id)
+            if product is not None and product['current_owner'] == tx['sender']:
+                # Update ownership
+                product['current_owner'] = tx['data'].get('recipient_id')
+                self.owner_index.move(product_id, tx['sender'], product['current_owner'])
+                product['history'].append({
+                    'transaction_type': 'transfer',
+                    'timestamp': tx['timestamp'],
+                    'from': tx['sender'],
+                    'to': tx['data'].get('recipient_id'),
+                    'transaction_id': tx['transaction_id']
+                })
+
+    def _revert_from_products(self, tx: Dict[str, Any]) -> None:
+        """
+        Undo _apply_to_products for the most recently applied transaction
+
+        :param tx: Transaction
+        :return: None
+        """
+        transaction_type = tx.get('transaction_type')
+        product = self.products.get(tx.get('data', {}).get('product_id'))
+        if product is None:
+            return
+
+        if transaction_type == "product_registration":
+            if product['transaction_id'] == tx['transaction_id']:
+                del self.products[tx['data']['product_id']]
+                self.owner_index.remove(product['current_owner'], tx['data']['product_id'])
+
+        elif transaction_type == "transfer":
+            if product['history'] and product['history'][-1]['transaction_id'] == tx['transaction_id']:
+                event = product['history'].pop()
+                self.owner_index.move(tx['data']['product_id'], product['current_owner'], event['from'])
+                product['current_owner'] = event['from']
 
     def get_product_history(self, product_id: str) -> List[Dict[str, Any]]:
         """
@@ -191,21 +481,184 @@ class SupplyChainBlockchain:
             raise ValueError(f"Unknown product ID: {product_id}")
         
         history = []
+        times = []
         
-        # Scan the entire blockchain for transactions related to this product
-        for block in self.chain:
-            for tx in block['transactions']:
-                if tx.get('transaction_type') in ['product_registration', 'processing', 'transfer', 'quality_check', 'retail']:
-                    if tx.get('data', {}).get('product_id') == product_id:
-                        history.append({
-                            'block_index': block['index'],
-                            'timestamp': tx['timestamp'],
-                            'transaction_type': tx['transaction_type'],
-                            'transaction_id': tx['transaction_id'],
-                            'data': tx['data']
-                        })
+        # Only visit the transactions recorded for this product in the index
+        for block_index, position in self.product_index.get(product_id):
+            tx = self.chain[block_index - 1]['transactions'][position]
+            micros = transaction_time(tx)
+            times.append(micros if micros is not None else -1)
+            history.append({
+                'block_index': block_index,
+                'timestamp': tx['timestamp'],
+                'transaction_type': tx['transaction_type'],
+                'transaction_id': tx['transaction_id'],
+                'data': tx['data']
+            })
         
-        return sorted(history, key=lambda x: x['timestamp'])
+        # The index lists the transactions in chain order, which is nearly always time order already:
+        # compare the integer timestamps rather than the ISO strings, and only sort when needed
+        if all(earlier <= later for earlier, later in zip(times, times[1:])):
+            return history
+        order = sorted(range(len(history)), key=times.__getitem__)
+        return [history[position] for position in order]
+
+    def get_product_proof(self, product_id: str) -> Dict[str, Any]:
+        """
+        Proof that the sealed transactions of a product are part of the chain, which can be
+        checked with block headers only (see light_client): each transaction with its Merkle
+        inclusion path, and the headers from its first block up to the tip
+        
+        :param product_id: ID of the product
+        :return: Proof with 'product_id', 'transactions', 'headers' and 'tip'
+        """
+        with self.lock:
+            if product_id not in self.products:
+                raise ValueError(f"Unknown product ID: {product_id}")
+
+            transactions = []
+            leaves = {}  # block_index -> leaf hashes, computed once per block
+            for block_index, position in self.product_index.get(product_id):
+                block = self.chain[block_index - 1]
+                if block_index not in leaves:
+                    leaves[block_index] = [transaction_hash(tx) for tx in block['transactions']]
+                transactions.append({
+                    'block_index': block_index,
+                    'position': position,
+                    'transaction': as_dict(block['transactions'][position]),
+                    'merkle_path': merkle_path(leaves[block_index], position)
+                })
+
+            start = transactions[0]['block_index'] if transactions else len(self.chain)
+            return {
+                'product_id': product_id,
+                'transactions': transactions,
+                'headers': chain_headers(self.chain, start),
+                'tip': {'height': len(self.chain), 'hash': self.chain.hash_at(-1)}
+            }
+
+    def get_owned_products(self, owner: str, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get a page of the products an actor currently owns, pending transfers included.
+        Served from the owner index, so the cost depends on the products of this actor only.
+
+        :param owner: Username of the actor
+        :param offset: Number of products to skip
+        :param limit: Maximum number of products to return, all of them if None
+        :return: 'owner', 'total' number of products owned, and the 'products' of the page
+        """
+        with self.lock:
+            products = []
+            for product_id in self.owner_index.get(owner, offset, limit):
+                details = self.products[product_id]
+                products.append({
+                    'product_id': product_id,
+                    'registered_by': details['registered_by'],
+                    'registration_time': details['registration_time'],
+                    'acquired_at': details['history'][-1]['timestamp'] if details['history']
+                    else details['registration_time'],
+                    'transaction_id': details['transaction_id']
+                })
+
+            return {
+                'owner': owner,
+                'total': self.owner_index.count(owner),
+                'products': products
+            }
+
+    def search_products(self, criteria: Dict[str, str], offset: int = 0,
+                        limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Search the sealed product registrations by their attributes, see ProductSearchIndex.search
+
+        :param criteria: field -> query, e.g. {'name': 'coffee', 'country': 'FR', 'batch_number': 'B-2025*'}
+        :param offset: Number of results to skip
+        :param limit: Maximum number of results to return, all of them if None
+        :return: 'total' number of results, and the 'products' of the page, newest first
+        :raises ValueError: if there is no criterion, or a field cannot be searched
+        """
+        with self.lock:
+            total, documents = self.search_index.search(criteria, offset, limit)
+        return {'total': total, 'products': [document_view(document) for document in documents]}
+
+    def products_near(self, latitude: float, longitude: float, radius_km: float, offset: int = 0,
+                      limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Products whose sealed registration places their origin within a distance of a position
+
+        :param latitude: Latitude of the position, in degrees
+        :param longitude: Longitude of the position, in degrees
+        :param radius_km: Distance, in km
+        :param offset: Number of products to skip
+        :param limit: Maximum number of products to return, all of them if None
+        :return: 'total' number of products, and the 'products' of the page, nearest first
+        :raises ValueError: if the position or the radius is not valid
+        """
+        with self.lock:
+            results = self.geo_index.within_radius('origin', latitude, longitude, radius_km)
+        stop = None if limit is None else offset + limit
+        return {'total': len(results),
+                'products': [point_view(point, distance) for distance, point in results[offset:stop]]}
+
+    def transfers_in_bbox(self, south: float, west: float, north: float, east: float, direction: str = 'departure',
+                          offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Sealed transfers departing from (or arriving in) a bounding box
+
+        :param south: Southern latitude, in degrees
+        :param west: Western longitude, in degrees
+        :param north: Northern latitude, in degrees
+        :param east: Eastern longitude, in degrees, lower than west for a box across the antimeridian
+        :param direction: 'departure' or 'arrival'
+        :param offset: Number of transfers to skip
+        :param limit: Maximum number of transfers to return, all of them if None
+        :return: 'total' number of transfers, and the 'transfers' of the page, in chain order
+        :raises ValueError: if the box or the direction is not valid
+        """
+        if direction not in ('departure', 'arrival'):
+            raise ValueError("The direction must be 'departure' or 'arrival'")
+        with self.lock:
+            results = self.geo_index.in_bbox(direction, south, west, north, east)
+        stop = None if limit is None else offset + limit
+        return {'total': len(results), 'transfers': [point_view(point) for point in results[offset:stop]]}
+
+    def nearest_retailers(self, latitude: float, longitude: float, count: int = 5) -> List[Dict[str, Any]]:
+        """
+        Retailers with a sealed sale nearest to a position, at the location of their nearest sale
+
+        :param latitude: Latitude of the position, in degrees
+        :param longitude: Longitude of the position, in degrees
+        :param count: Number of retailers
+        :return: Retailers nearest first, 'actor' being the retailer
+        :raises ValueError: if the position is not valid
+        """
+        with self.lock:
+            results = self.geo_index.nearest('retail', latitude, longitude, count)
+        return [point_view(point, distance) for distance, point in results]
+
+    def get_transactions(self, since: Optional[int] = None, until: Optional[int] = None,
+                         transaction_type: Optional[str] = None, actor: Optional[str] = None,
+                         cursor: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Sealed transactions with a timestamp in [since, until), oldest first
+
+        :param since: Start of the range, in microseconds since the Unix epoch, unbounded if None
+        :param until: End of the range (excluded), in microseconds since the Unix epoch, unbounded if None
+        :param transaction_type: Only the transactions of this type
+        :param actor: Only the transactions sent by this actor or naming them in their data
+        :param cursor: 'next_cursor' returned with the previous page, None for the first page
+        :param limit: Maximum number of transactions to return, all of them if None
+        :return: The 'transactions' of the page, and the 'next_cursor' of the next page, None after the last one
+        :raises ValueError: if the cursor is not valid
+        """
+        after = decode_cursor(cursor) if cursor is not None else None
+        with self.lock:
+            keys, last = self.time_index.range(since, until, transaction_type, actor, after, limit)
+            transactions = []
+            for _, block_index, position in keys:
+                tx = self.chain[block_index - 1]['transactions'][position]
+                transactions.append({'block_index': block_index, 'position': position, **as_dict(tx)})
+        return {'transactions': transactions, 'next_cursor': encode_cursor(last) if last is not None else None}
 
     def verify_product_authenticity(self, product_id: str) -> Dict[str, Any]:
         """
@@ -251,6 +704,15 @@ class SupplyChainBlockchain:
                 'reason': str(e)
             }
 
+    @property
+    def current_transactions(self) -> List[Dict[str, Any]]:
+        """
+        Returns the transactions waiting in the mempool
+        
+        :return: Pending transactions, oldest first
+        """
+        return list(self.mempool)
+
     @property
     def last_block(self) -> Dict[str, Any]:
         """
@@ -260,17 +722,25 @@ class SupplyChainBlockchain:
         """
         return self.chain[-1]
 
+    @property
+    def last_block_hash(self) -> str:
+        """
+        Returns the hash of the last Block, cached when it was sealed
+        
+        :return: Hash string
+        """
+        return self.chain.hash_at(-1)
+
     @staticmethod
     def hash(block: Dict[str, Any]) -> str:
         """
-        Creates a SHA-256 hash of a Block
+        Creates a SHA-256 hash of a Block.
+        Sealed blocks of the chain have their hash cached, see last_block_hash and ChainStore.hash_at
         
         :param block: Block
         :return: Hash string
         """
-        # We must make sure that the Dictionary is Ordered, or we'll have inconsistent hashes
-        block_string = json.dumps(block, sort_keys=True).encode()
-        return hashlib.sha256(block_string).hexdigest()
+        return block_digest(block).hex()
 
     def proof_of_work(self, last_proof: int) -> int:
         """
@@ -281,21 +751,20 @@ class SupplyChainBlockchain:
         :param last_proof: <int>
         :return: <int>
         """
-        proof = 0
-        while self.valid_proof(last_proof, proof) is False:
-            proof += 1
+        if self.mining_workers > 1:
+            if self._miner is None:
+                self._miner = ParallelMiner(self.mining_workers)
+            return self._miner.proof_of_work(last_proof)
 
-        return proof
+        return find_proof(last_proof)
 
     @staticmethod
     def valid_proof(last_proof: int, proof: int) -> bool:
         """
-        Validates the Proof: Does hash(last_proof, proof) contain 4 leading zeroes?
+        Validates the Proof: Does hash(last_proof, proof) contain 4 leading zeroes? See mining.valid_proof
         
         :param last_proof: <int> Previous Proof
         :param proof: <int> Current Proof
         :return: <bool> True if correct, False if not.
         """
-        guess = f'{last_proof}{proof}'.encode()
-        guess_hash = hashlib.sha256(guess).hexdigest()
-        return guess_hash[:4] == "0000"
+        return valid_proof(last_proof, proof)
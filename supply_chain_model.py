@@ -1,5 +1,5 @@
-from dataclasses import dataclass, asdict
-from typing import Dict, List, Optional, Any
+from dataclasses import dataclass, asdict, fields
+from typing import Dict, List, Optional, Any, Callable
 from enum import Enum
 from datetime import datetime
 import json
@@ -203,6 +203,118 @@ class RetailEvent:
         }
 
 
+class ValidationError(ValueError):
+    """
+    Invalid transaction payload, with one entry per problem found
+    """
+    def __init__(self, transaction_type: str, errors: List[Dict[str, str]]):
+        self.transaction_type = transaction_type
+        self.errors = errors  # [{'field': path of the field, 'error': message}, ...]
+        details = '; '.join(f"{error['field']}: {error['error']}" for error in errors)
+        super().__init__(f"Invalid {transaction_type} transaction data: {details}")
+
+
+# Returned by a field normalizer to leave the field out of the normalized payload
+_OMIT = object()
+
+
+def _compile_object(model, normalizers: Optional[Dict[str, Callable]] = None) -> Callable:
+    """
+    Build the normalizer of a payload with the fields of a model dataclass, once.
+    A normalizer checks a value and returns its normalized copy in a single pass,
+    appending the problems it finds to errors instead of raising on the first one.
+    Values of the fields without a normalizer are kept as is.
+
+    :param model: Dataclass describing the payload
+    :param normalizers: Normalizer of the fields that hold nested objects
+    :return: normalize(value, path, errors)
+    """
+    normalizers = normalizers or {}
+    plan = tuple((f.name, normalizers.get(f.name)) for f in fields(model))
+    known = frozenset(name for name, _ in plan)
+
+    def normalize(value: Any, path: str, errors: List[Dict[str, str]]) -> Any:
+        if not isinstance(value, dict):
+            errors.append({'field': path or '$', 'error': 'must be an object'})
+            return None
+
+        result = {}
+        for name, normalizer in plan:
+            if name not in value:
+                errors.append({'field': f'{path}.{name}' if path else name, 'error': 'required'})
+            elif normalizer is None:
+                result[name] = value[name]
+            else:
+                item = normalizer(value[name], f'{path}.{name}' if path else name, errors)
+                if item is not _OMIT:
+                    result[name] = item
+
+        if not known.issuperset(value):
+            for name in value:
+                if name not in known:
+                    errors.append({'field': f'{path}.{name}' if path else name, 'error': 'unknown field'})
+        return result
+
+    return normalize
+
+
+def _list_of(normalizer: Callable) -> Callable:
+    def normalize(value: Any, path: str, errors: List[Dict[str, str]]) -> Any:
+        if not isinstance(value, list):
+            errors.append({'field': path, 'error': 'must be a list'})
+            return None
+        return [normalizer(item, f'{path}[{position}]', errors) for position, item in enumerate(value)]
+    return normalize
+
+
+def _optional(normalizer: Callable) -> Callable:
+    # An empty value (e.g. the arrival location of a product in transit) leaves the field out
+    def normalize(value: Any, path: str, errors: List[Dict[str, str]]) -> Any:
+        if not value and not isinstance(value, dict):
+            return _OMIT
+        return normalizer(value, path, errors)
+    return normalize
+
+
+_location = _compile_object(Location)
+
+# Normalizer of the payload of each transaction type, compiled once at import
+TRANSACTION_SCHEMAS = {
+    'product_registration': _compile_object(ProductRegistration, {
+        'origin_location': _location,
+        'certifications': _list_of(_compile_object(Certification)),
+    }),
+    'processing': _compile_object(ProcessingStep, {'location': _location}),
+    'transfer': _compile_object(TransferEvent, {
+        'departure_location': _location,
+        'arrival_location': _optional(_location),
+    }),
+    'quality_check': _compile_object(Quality),
+    'retail': _compile_object(RetailEvent, {'location': _location}),
+}
+
+
+def normalize_transaction(transaction_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Check the payload of a transaction and return its normalized form, in a single pass.
+    The payload itself is not modified.
+    
+    :param transaction_type: Type of transaction
+    :param data: Transaction data
+    :return: Normalized transaction data
+    :raises ValidationError: listing every problem of the payload
+    """
+    normalize = TRANSACTION_SCHEMAS.get(transaction_type)
+    if normalize is None:
+        raise ValidationError(transaction_type, [{'field': 'transaction_type', 'error': 'unknown transaction type'}])
+
+    errors = []
+    result = normalize(data, '', errors)
+    if errors:
+        raise ValidationError(transaction_type, errors)
+    return result
+
+
 def transaction_factory(transaction_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Factory function to create the appropriate transaction type
@@ -211,82 +323,20 @@ def transaction_factory(transaction_type: str, data: Dict[str, Any]) -> Dict[str
     :param data: Transaction data
     :return: Formatted transaction data
     """
-    # Add validation logic specific to each transaction type
-    if transaction_type == "product_registration":
-        # Validate required fields for product registration
-        required = ['product_id', 'name', 'producer_id']
-        if not all(k in data for k in required):
-            raise ValueError(f"Missing required fields for product registration: {required}")
-        
-        # Process nested objects like Location and Certifications
-        if 'origin_location' in data and isinstance(data['origin_location'], dict):
-            data['origin_location'] = Location(**data['origin_location'])
-        
-        if 'certifications' in data and isinstance(data['certifications'], list):
-            # Check if each certification is already a Certification object or needs to be converted
-            new_certifications = []
-            for cert in data['certifications']:
-                if isinstance(cert, Certification):
-                    new_certifications.append(cert)
-                elif isinstance(cert, dict):
-                    new_certifications.append(Certification(**cert))
-                else:
-                    raise ValueError(f"Certification data must be a dict or Certification object, not {type(cert)}" )
-            data['certifications'] = new_certifications
-        
-        return ProductRegistration(**data).to_dict()
-    
-    elif transaction_type == "processing":
-        # Validate required fields
-        required = ['process_id', 'product_id', 'actor_id', 'process_type']
-        if not all(k in data for k in required):
-            raise ValueError(f"Missing required fields for processing step: {required}")
-        
-        # Process location
-        if 'location' in data and isinstance(data['location'], dict):
-            data['location'] = Location(**data['location'])
-        
-        return ProcessingStep(**data).to_dict()
-    
-    elif transaction_type == "transfer":
-        # Validate required fields
-        required = ['transfer_id', 'product_id', 'sender_id', 'recipient_id']
-        if not all(k in data for k in required):
-            raise ValueError(f"Missing required fields for transfer event: {required}")
-        
-        # Process locations
-        if 'departure_location' in data and isinstance(data['departure_location'], dict):
-            data['departure_location'] = Location(**data['departure_location'])
-        
-        if 'arrival_location' in data and isinstance(data['arrival_location'], dict):
-            data['arrival_location'] = Location(**data['arrival_location'])
-        
-        return TransferEvent(**data).to_dict()
-    
-    elif transaction_type == "quality_check":
-        return Quality(**data).to_dict()
-    
-    elif transaction_type == "retail":
-        if 'location' in data and isinstance(data['location'], dict):
-            data['location'] = Location(**data['location'])
-        
-        return RetailEvent(**data).to_dict()
-    
-    else:
-        raise ValueError(f"Unknown transaction type: {transaction_type}")
+    return normalize_transaction(transaction_type, data)
 
 
 def validate_transaction(transaction_type: str, data: Dict[str, Any]) -> bool:
     """
-    Validate a transaction based on its type and data
+    Validate a transaction based on its type and data.
+    Use normalize_transaction to get the normalized data and the details of the errors.
     
     :param transaction_type: Type of transaction
     :param data: Transaction data
     :return: True if valid, False otherwise
     """
     try:
-        transaction_factory(transaction_type, data)
+        normalize_transaction(transaction_type, data)
         return True
-    except (ValueError, TypeError, KeyError) as e:
-        print(f"Validation error: {e}")
+    except ValidationError:
         return False
@@ -0,0 +1,174 @@
+import time
+from typing import List, Dict, Any, Callable, Optional, Iterable, Tuple
+from chain_store import ChainStore, verify_chain, find_fork_point
+from peers import PeerClient, peer_report
+
+
+# Number of blocks or headers requested from a peer at a time
+SYNC_PAGE_SIZE = 500
+
+
+def find_peer_fork_point(client: PeerClient, node: str, store: ChainStore, peer_height: int,
+                         deadline: Optional[float] = None) -> Optional[int]:
+    """
+    Find the first position at which the chain of a peer diverges from ours, using its headers only.
+    Windows of headers below our tip are requested with a doubling size until one of them
+    links to our chain, so a peer that extends our chain costs a single small request.
+
+    :param client: Client to reach the peer
+    :param node: Address of the peer
+    :param store: Our chain
+    :param peer_height: Number of blocks of the peer
+    :param deadline: time.monotonic() value after which the peer is abandoned, None for no deadline
+    :return: Number of leading blocks the peer chain shares with ours, or None if the peer failed to answer
+    """
+    # Block k of the peer chain extends our first k blocks when its previous_hash is the hash of our block k-1
+    high = min(len(store), peer_height - 1)
+    size = 1
+    while high > 0:
+        low = max(high - size + 1, 1)
+        result = client.get(node, '/chain/headers', {'from': low + 1, 'limit': high - low + 1}, deadline)
+        if not result['ok']:
+            return None
+
+        try:
+            fork = find_fork_point(store, result['data']['headers'], offset=low)
+        except (KeyError, TypeError):
+            return None
+        if fork:
+            return fork
+
+        high = low - 1
+        size *= 2
+
+    return 0
+
+
+def download_suffix(client: PeerClient, node: str, store: ChainStore, fork: int, peer_height: int,
+                    valid_proof: Callable[[int, int], bool],
+                    deadline: Optional[float] = None) -> Tuple[Optional[ChainStore], Optional[str]]:
+    """
+    Download and verify the blocks of a peer that follow the fork point, one page at a time.
+    When the deadline expires, the blocks already verified are returned along with the error:
+    they still form a valid chain, which a long download can go on from in the next round.
+
+    :param client: Client to reach the peer
+    :param node: Address of the peer
+    :param store: Our chain
+    :param fork: Number of leading blocks the peer chain shares with ours
+    :param peer_height: Number of blocks of the peer
+    :param valid_proof: Proof of Work check of the chain
+    :param deadline: time.monotonic() value after which the peer is abandoned, None for no deadline
+    :return: (validated blocks, None), (validated blocks so far, 'deadline exceeded')
+             or (None, reason of the failure)
+    """
+    suffix = ChainStore()
+    parent = (store.hash_at(fork - 1), store[fork - 1]['proof']) if fork else None
+
+    while fork + len(suffix) < peer_height:
+        start = fork + len(suffix)
+        result = client.get(node, '/chain', {'from': start + 1, 'limit': SYNC_PAGE_SIZE}, deadline)
+        if not result['ok']:
+            if result['error'] == 'deadline exceeded' and len(suffix):
+                return suffix, result['error']
+            return None, result['error']
+
+        try:
+            blocks = result['data']['chain']
+            if not blocks:
+                break
+            # Headers alone would pass verify_chain, the bodies are what we are downloading
+            page = verify_chain(blocks, valid_proof, parent) if all('transactions' in block for block in blocks) else None
+        except (KeyError, TypeError):
+            page = None
+        if page is None:
+            return None, 'invalid'
+        suffix.extend(page)
+        parent = (page.hash_at(-1), page[-1]['proof'])
+
+    return suffix, None
+
+
+def sync_longest_chain(client: PeerClient, nodes: Iterable[str], store: ChainStore,
+                       valid_proof: Callable[[int, int], bool]) -> Tuple[Optional[Tuple[str, int, ChainStore]], Dict[str, Any]]:
+    """
+    Look for the longest valid chain in the network, downloading only the blocks we are missing.
+    The tips of all the peers are fetched concurrently, then the peers claiming the highest chains
+    are synced first until no remaining peer can beat the best chain found.
+    The whole round must fit in the deadline of the client, peers still syncing when it expires are abandoned.
+
+    :param client: Client to reach the peers
+    :param nodes: Addresses of the peers
+    :param store: Our chain
+    :param valid_proof: Proof of Work check of the chain
+    :return: ((node, fork point, validated blocks after it) or None, report of each peer)
+    """
+    report = {}
+    candidates = []
+    deadline = time.monotonic() + client.deadline
+
+    for node, result in client.get_all(nodes, '/chain/tip').items():
+        if not result['ok']:
+            report[node] = peer_report(result)
+            continue
+        try:
+            height = int(result['data']['height'])
+        except (KeyError, TypeError, ValueError):
+            report[node] = peer_report(dict(result, ok=False, error='Malformed tip'))
+            continue
+        report[node] = peer_report(result, length=height, chain='not longer')
+        candidates.append((height, node))
+
+    best = None
+    max_length = len(store)
+    for height, node in sorted(candidates, reverse=True):
+        if height <= max_length:
+            break
+
+        fork = find_peer_fork_point(client, node, store, height, deadline)
+        if fork is None:
+            report[node].update(status='failed', error='Headers unavailable')
+            continue
+
+        suffix, error = download_suffix(client, node, store, fork, height, valid_proof, deadline)
+        if error == 'invalid':
+            report[node]['chain'] = 'invalid'
+        elif error is not None:
+            report[node].update(status='failed', error=error)
+        if suffix is None:
+            continue
+
+        report[node].update(fork_point=fork, downloaded=len(suffix))
+        if fork + len(suffix) > max_length:
+            max_length = fork + len(suffix)
+            best = (node, fork, suffix)
+            report[node]['chain'] = 'longer'
+
+    return best, report
+
+
+def chain_headers(store: ChainStore, start: int = 1, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Headers of the blocks of a chain by block index: the block without its transactions, plus its hash.
+    A block sealed before Merkle roots has a merkle_root of None
+
+    :param store: A chain
+    :param start: Index of the first block
+    :param limit: Maximum number of headers, all the following ones if None
+    :return: List of headers
+    """
+    begin = max(start - 1, 0)
+    end = len(store) if limit is None else min(begin + limit, len(store))
+    headers = []
+    for position in range(begin, end):
+        block = store[position]
+        headers.append({
+            'index': block['index'],
+            'timestamp': block['timestamp'],
+            'proof': block['proof'],
+            'previous_hash': block['previous_hash'],
+            'merkle_root': block.get('merkle_root'),
+            'hash': store.hash_at(position),
+            'transaction_count': len(block['transactions'])
+        })
+    return headers
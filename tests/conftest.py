@@ -0,0 +1,125 @@
+"""
+Shared fixtures: supply chain nodes that sync with each other in-process, and helpers to fill their chains
+"""
+import json
+import os
+import sys
+from typing import Dict, Any, Optional
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth import AuthenticationSystem
+from supply_chain_blockchain import SupplyChainBlockchain
+from sync import chain_headers
+from streaming import chain_array
+
+USERS = ('farmer', 'distributor', 'retailer')
+
+
+class InProcessPeers:
+    """
+    Stand-in for PeerClient that answers the sync requests from the chains of other nodes,
+    with the JSON round trip of the real endpoints
+    """
+    deadline = 15.0
+
+    def __init__(self, nodes: Dict[str, SupplyChainBlockchain]):
+        self.nodes = nodes
+
+    def get(self, node: str, path: str, params: Optional[Dict[str, Any]] = None,
+            deadline: Optional[float] = None) -> Dict[str, Any]:
+        chain = self.nodes[node].chain
+        params = params or {}
+        if path == '/chain/tip':
+            data = {'height': len(chain), 'hash': chain.hash_at(-1)}
+        elif path == '/chain/headers':
+            data = {'headers': chain_headers(chain, params['from'], params['limit'])}
+        elif path == '/chain':
+            data = {'chain': [json.loads(encoded) for encoded in
+                              chain_array(chain, params['from'], params['limit']).items]}
+        else:
+            return {'ok': False, 'latency': 0.0, 'error': 'HTTP 404'}
+        return {'ok': True, 'latency': 0.0, 'data': json.loads(json.dumps(data))}
+
+    def get_all(self, nodes, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        return {node: self.get(node, path, params) for node in nodes}
+
+
+@pytest.fixture(scope='session')
+def key_pair():
+    return AuthenticationSystem().generate_key_pair()
+
+
+@pytest.fixture
+def network(key_pair):
+    """
+    Factory of nodes knowing the same users and reaching each other by name
+    """
+    nodes = {}
+    logs = []
+
+    def make_node(name: str, data_dir: Optional[str] = None, checkpoint_interval: int = 1000) -> SupplyChainBlockchain:
+        node = SupplyChainBlockchain(data_dir=data_dir, checkpoint_interval=checkpoint_interval)
+        for username in USERS:
+            if node.auth_system.get_user_info(username) is None:
+                node.auth_system.register_user(username, key_pair[1], 'producer', 'org')
+        node.peer_client = InProcessPeers(nodes)
+        for other_name, other in nodes.items():
+            node.register_node(f'http://{other_name}')
+            other.register_node(f'http://{name}')
+        nodes[name] = node
+        if data_dir is not None:
+            logs.append(node.chain.log)
+        return node
+
+    yield make_node
+    for log in logs:
+        # Tests reopening a data directory close the log of the node they replace
+        if not log._index.closed:
+            log.close()
+
+
+def sign(node: SupplyChainBlockchain, private_key: str, data: Dict[str, Any]) -> str:
+    return node.auth_system.sign_data(private_key, data)
+
+
+def register_product(node: SupplyChainBlockchain, private_key: str, product_id: str,
+                     transaction_id: Optional[str] = None) -> None:
+    data = {
+        'product_id': product_id, 'name': f'Coffee {product_id}', 'description': 'Arabica beans',
+        'category': 'food', 'producer_id': 'farmer', 'production_date': '2025-01-01', 'batch_number': 'B-1',
+        'origin_location': {'latitude': 4.6, 'longitude': -74.1, 'address': 'Finca', 'country': 'Colombia',
+                            'region': 'Huila'},
+        'certifications': [], 'additional_info': {}
+    }
+    node.new_transaction('farmer', 'product_registration', data, sign(node, private_key, data),
+                         transaction_id=transaction_id)
+
+
+def transfer_product(node: SupplyChainBlockchain, private_key: str, product_id: str, sender: str, recipient: str,
+                     transaction_id: Optional[str] = None) -> None:
+    data = {
+        'transfer_id': f'{product_id}-{recipient}', 'product_id': product_id, 'sender_id': sender,
+        'sender_type': 'producer', 'recipient_id': recipient, 'recipient_type': 'distributor',
+        'timestamp': '2025-01-02T00:00:00',
+        'departure_location': {'latitude': 4.6, 'longitude': -74.1, 'address': 'Finca', 'country': 'Colombia',
+                               'region': 'Huila'},
+        'arrival_location': None, 'estimated_arrival_time': None, 'transport_conditions': {},
+        'status': 'initiated', 'additional_info': {}
+    }
+    node.new_transaction(sender, 'transfer', data, sign(node, private_key, data), transaction_id=transaction_id)
+
+
+def mine(node: SupplyChainBlockchain) -> None:
+    node.new_block(node.proof_of_work(node.last_block['proof']))
+
+
+def derived_state(node: SupplyChainBlockchain) -> Dict[str, Any]:
+    """
+    State derived from the chain (products and indexes), in a form that can be compared between nodes
+    """
+    state = node._state()
+    state.pop('registered_users')
+    return json.loads(json.dumps(state, sort_keys=True))
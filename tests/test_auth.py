@@ -0,0 +1,61 @@
+"""
+Signatures: the canonical message of the data, and the cache of parsed keys
+"""
+import pytest
+
+from auth import AuthenticationSystem, canonical_message
+
+DATA = {'product_id': 'P-1', 'sender_id': 'farmer', 'recipient_id': 'retailer', 'status': 'in_transit'}
+
+
+def test_data_and_its_canonical_message_sign_the_same_bytes(key_pair):
+    auth_system = AuthenticationSystem()
+    private_key, public_key = key_pair
+    message = canonical_message(DATA)
+
+    signature = auth_system.sign_data(private_key, message)
+    assert auth_system.sign_data(private_key, DATA) == signature
+    assert auth_system.verify_signature(public_key, DATA, signature)
+    assert auth_system.verify_signature(public_key, message, signature)
+    assert canonical_message(dict(reversed(list(DATA.items())))) == message
+
+    assert not auth_system.verify_signature(public_key, canonical_message(dict(DATA, status='sold')), signature)
+    assert not auth_system.verify_signature(public_key, message, 'not hex')
+
+
+def test_keys_are_parsed_once(key_pair):
+    auth_system = AuthenticationSystem()
+    private_key, public_key = key_pair
+    signature = auth_system.sign_data(private_key, DATA)
+    auth_system.verify_signature(public_key, DATA, signature)
+    verifier = auth_system.verifiers.get(public_key)
+
+    auth_system.verify_signature(public_key, DATA, signature)
+    assert auth_system.verifiers.get(public_key) is verifier
+    assert len(auth_system.verifiers) == 1 and len(auth_system.signers) == 1
+
+
+def test_usernames_cannot_be_registered_twice(key_pair):
+    auth_system = AuthenticationSystem()
+    auth_system.register_user('farmer', key_pair[1], 'producer', 'org')
+    with pytest.raises(ValueError, match='already exists'):
+        auth_system.register_user('farmer', key_pair[1], 'producer', 'org')
+
+
+def test_new_transaction_verifies_the_message_given(network, key_pair):
+    node = network('node')
+    data = {
+        'product_id': 'P-1', 'name': 'Coffee', 'description': 'Arabica beans', 'category': 'food',
+        'producer_id': 'farmer', 'production_date': '2025-01-01', 'batch_number': 'B-1',
+        'origin_location': {'latitude': 4.6, 'longitude': -74.1, 'address': 'Finca', 'country': 'Colombia',
+                            'region': 'Huila'},
+        'certifications': [], 'additional_info': {}
+    }
+    message = canonical_message(data)
+    signature = node.auth_system.sign_data(key_pair[0], message)
+
+    with pytest.raises(ValueError, match='Invalid signature'):
+        node.new_transaction('farmer', 'product_registration', data, signature,
+                             message=canonical_message(dict(data, name='Tea')))
+    node.new_transaction('farmer', 'product_registration', data, signature, message=message)
+    assert 'P-1' in node.products
@@ -0,0 +1,156 @@
+"""
+Block log: recovery of what a crash leaves at the end of the files, reads racing a truncation, and fsync policies
+"""
+import json
+import os
+import time
+
+import pytest
+
+from block_log import BlockLog, PersistentChainStore, _INDEX_ENTRY, FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER
+
+
+def make_block(index: int, branch: str = 'a'):
+    return {'index': index, 'timestamp': '2025-01-01T00:00:00', 'transactions': [], 'proof': index,
+            'previous_hash': branch * 64, 'merkle_root': 'c' * 64}
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / 'blocks')
+
+
+def fill(directory: str, count: int):
+    store = PersistentChainStore(BlockLog(directory, 'never'))
+    for index in range(1, count + 1):
+        store.append(make_block(index))
+    hashes = [store.hash_at(position) for position in range(count)]
+    store.log.close()
+    return hashes
+
+
+def reopen(directory: str) -> PersistentChainStore:
+    return PersistentChainStore(BlockLog(directory, 'never'))
+
+
+def test_reopen_keeps_every_block(directory):
+    hashes = fill(directory, 5)
+    store = reopen(directory)
+    assert len(store) == 5
+    assert [store.hash_at(position) for position in range(5)] == hashes
+    assert store[-1]['index'] == 5
+    store.log.close()
+
+
+def test_partial_index_entry_is_dropped(directory):
+    fill(directory, 5)
+    with open(os.path.join(directory, 'blocks.idx'), 'ab') as index:
+        index.write(b'\x00' * (_INDEX_ENTRY.size // 2))
+
+    store = reopen(directory)
+    assert len(store) == 5
+    assert os.path.getsize(os.path.join(directory, 'blocks.idx')) == 5 * _INDEX_ENTRY.size
+    store.log.close()
+
+
+def test_entry_past_the_data_is_dropped(directory):
+    fill(directory, 5)
+    data = os.path.join(directory, 'blocks.dat')
+    with open(data, 'r+b') as blocks:
+        blocks.truncate(os.path.getsize(data) - 10)
+
+    store = reopen(directory)
+    assert len(store) == 4
+    assert store[-1]['index'] == 4
+    store.log.close()
+
+
+@pytest.mark.parametrize('torn', ['data', 'digest'])
+def test_torn_tail_is_dropped(directory, torn):
+    hashes = fill(directory, 5)
+    if torn == 'data':
+        # The index entry reached the disk, the end of the block did not
+        with open(os.path.join(directory, 'blocks.dat'), 'r+b') as blocks:
+            blocks.seek(-16, os.SEEK_END)
+            blocks.write(b'\x00' * 16)
+    else:
+        with open(os.path.join(directory, 'blocks.idx'), 'r+b') as index:
+            index.seek(-1, os.SEEK_END)
+            last = index.read(1)
+            index.seek(-1, os.SEEK_END)
+            index.write(bytes([last[0] ^ 0xff]))
+
+    store = reopen(directory)
+    assert len(store) == 4
+    assert [store.hash_at(position) for position in range(4)] == hashes[:4]
+
+    # The log goes on from the last intact block
+    store.append(make_block(5, 'b'))
+    store.log.close()
+    store = reopen(directory)
+    assert len(store) == 5
+    assert store[-1]['previous_hash'] == 'b' * 64
+    store.log.close()
+
+
+def test_stream_keeps_the_blocks_of_its_range_across_a_truncate(directory):
+    store = PersistentChainStore(BlockLog(directory, 'never'))
+    for index in range(1, 11):
+        store.append(make_block(index))
+
+    stream = store.encoded_range(0, 10)
+    first = [next(stream) for _ in range(3)]
+    # A fork switch replaces the last blocks while the response is being sent
+    store.truncate(5)
+    for index in range(6, 12):
+        store.append(make_block(index, 'b'))
+
+    blocks = [json.loads(encoded) for encoded in first + list(stream)]
+    assert [block['index'] for block in blocks] == list(range(1, 11))
+    assert {block['previous_hash'] for block in blocks} == {'a' * 64}
+    assert [store[position]['previous_hash'][0] for position in range(len(store))] == ['a'] * 5 + ['b'] * 6
+    store.log.close()
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    calls = []
+    monkeypatch.setattr(os, 'fsync', calls.append)
+    return calls
+
+
+def test_always_syncs_every_block(directory, fsyncs):
+    store = PersistentChainStore(BlockLog(directory, FSYNC_ALWAYS))
+    store.append(make_block(1))
+    assert len(fsyncs) == 2  # data and index
+    store.append(make_block(2))
+    assert len(fsyncs) == 4
+    store.log.close()
+
+
+def test_never_leaves_syncing_to_the_system_until_closed(directory, fsyncs):
+    store = PersistentChainStore(BlockLog(directory, FSYNC_NEVER, fsync_interval=0.05))
+    for index in range(1, 4):
+        store.append(make_block(index))
+    time.sleep(0.2)
+    assert fsyncs == []
+    store.log.close()
+    assert len(fsyncs) == 2
+
+
+def test_interval_syncs_an_idle_log_once_the_interval_has_passed(directory, fsyncs):
+    store = PersistentChainStore(BlockLog(directory, FSYNC_INTERVAL, fsync_interval=0.2))
+    store.append(make_block(1))
+    store.append(make_block(2))
+    assert fsyncs == []
+
+    # No other block is appended: the pending ones are still synced, once
+    time.sleep(0.5)
+    assert len(fsyncs) == 2
+    time.sleep(0.3)
+    assert len(fsyncs) == 2
+
+    # Past the interval, the next block is synced as it is appended
+    store.append(make_block(3))
+    assert len(fsyncs) == 4
+    store.log.close()
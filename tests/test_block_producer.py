@@ -0,0 +1,127 @@
+"""
+Background block producer: submitted transactions go from queued to pending to confirmed
+"""
+import re
+import time
+
+import pytest
+
+from block_producer import BlockProducer
+from conftest import sign, register_product, mine
+
+
+def registration(product_id):
+    return {
+        'product_id': product_id, 'name': f'Coffee {product_id}', 'description': 'Arabica beans',
+        'category': 'food', 'producer_id': 'farmer', 'production_date': '2025-01-01', 'batch_number': 'B-1',
+        'origin_location': {'latitude': 4.6, 'longitude': -74.1, 'address': 'Finca', 'country': 'Colombia',
+                            'region': 'Huila'},
+        'certifications': [], 'additional_info': {}
+    }
+
+
+@pytest.fixture(scope='module')
+def app(key_pair):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('KEY_POOL_SIZE', '1')
+        patch.setenv('VERIFY_WORKERS', '1')
+        patch.setenv('MINING_WORKERS', '1')
+        patch.delenv('DATA_DIR', raising=False)
+        import supply_chain_app
+    supply_chain_app.auth_system.register_user('farmer', key_pair[1], 'producer', 'org')
+    supply_chain_app.demo_users['farmer'] = {'private_key': key_pair[0], 'public_key': key_pair[1]}
+    yield supply_chain_app
+    supply_chain_app.key_pool.stop()
+    supply_chain_app.producer.stop()
+
+
+def wait_for(client, transaction_id, statuses, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get(f'/transactions/{transaction_id}/status')
+        assert response.status_code == 200
+        status = response.get_json()
+        if status['status'] in statuses or time.monotonic() > deadline:
+            return status
+        time.sleep(0.02)
+
+
+def test_submitted_transaction_is_pending_then_confirmed(app, key_pair):
+    client = app.app.test_client()
+    data = registration('P-100')
+    response = client.post('/transactions/new', json={
+        'sender': 'farmer', 'transaction_type': 'product_registration', 'data': data,
+        'signature': app.auth_system.sign_data(key_pair[0], data)})
+    assert response.status_code == 202
+    transaction_id = response.get_json()['transaction_id']
+
+    # The mempool waits for more transactions before sealing, the transaction is seen pending first
+    pending = wait_for(client, transaction_id, ('pending', 'confirmed', 'rejected'))
+    assert pending['status'] == 'pending'
+    confirmed = wait_for(client, transaction_id, ('confirmed', 'rejected'))
+    assert confirmed['status'] == 'confirmed'
+    assert confirmed['block_index'] == pending['block_index']
+
+    block = app.blockchain.chain[confirmed['block_index'] - 1]
+    assert [tx['transaction_id'] for tx in block['transactions']] == [transaction_id]
+
+
+def test_invalid_transaction_is_rejected(app):
+    client = app.app.test_client()
+    response = client.post('/transactions/new', json={
+        'sender': 'farmer', 'transaction_type': 'product_registration', 'data': registration('P-101'),
+        'signature': '00'})
+    status = wait_for(client, response.get_json()['transaction_id'], ('pending', 'confirmed', 'rejected'))
+    assert status == {'status': 'rejected', 'error': 'Invalid signature',
+                      'transaction_id': response.get_json()['transaction_id']}
+    assert client.get('/transactions/unknown/status').status_code == 404
+
+
+def test_registration_form_shows_the_pending_status(app):
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = 'farmer'
+    response = client.post('/ui/register_product', data={
+        'product_id': 'P-102', 'name': 'Coffee', 'description': 'Arabica beans', 'category': 'food',
+        'production_date': '2025-01-01', 'batch_number': 'B-1', 'latitude': '4.6', 'longitude': '-74.1',
+        'address': 'Finca', 'country': 'Colombia', 'region': 'Huila'})
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    transaction_id = re.search(r'/transactions/(\w+)/status', page).group(1)
+    assert 'en attente' in page
+    assert '/ui/product/P-102' not in page
+    assert wait_for(client, transaction_id, ('confirmed', 'rejected'))['status'] == 'confirmed'
+
+
+def test_tip_moving_while_mining_keeps_the_queued_transactions(network, key_pair):
+    a, b = network('a'), network('b')
+    producer = BlockProducer(a)
+    transaction_ids = []
+    for product_id in ('P-1', 'P-2'):
+        data = registration(product_id)
+        transaction_ids.append(producer.submit('farmer', 'product_registration', data, sign(a, key_pair[0], data)))
+    producer._admit_queued()
+    assert [producer.get_status(tid)['status'] for tid in transaction_ids] == ['pending', 'pending']
+
+    # A longer chain is adopted while the producer mines on the old tip
+    register_product(b, key_pair[0], 'P-3')
+    mine(b)
+    mine(b)
+    proof_of_work = a.proof_of_work
+
+    def adopt_while_mining(last_proof):
+        proof = proof_of_work(last_proof)
+        assert a.resolve_conflicts()
+        return proof
+    a.proof_of_work = adopt_while_mining
+    producer._seal()
+    assert a.last_block_hash == b.last_block_hash
+    assert sorted(tx['data']['product_id'] for tx in a.mempool) == ['P-1', 'P-2']
+    assert [producer.get_status(tid)['status'] for tid in transaction_ids] == ['pending', 'pending']
+
+    # The next round seals them on the new tip
+    a.proof_of_work = proof_of_work
+    producer._seal()
+    assert len(a.mempool) == 0
+    assert [producer.get_status(tid)['status'] for tid in transaction_ids] == ['confirmed', 'confirmed']
+    assert set(a.products) == {'P-1', 'P-2', 'P-3'}
@@ -0,0 +1,98 @@
+"""
+Bulk ingestion: parsing of JSON arrays and NDJSON, parallel signature checks, per-item results
+"""
+import json
+
+import pytest
+
+from auth import canonical_message
+from block_producer import BlockProducer
+from bulk import parse_bulk_body, SignatureVerifier, MAX_BULK_ITEMS
+from conftest import sign
+
+
+def item(n, sender='farmer'):
+    return {'sender': sender, 'transaction_type': 'quality_check', 'data': {'n': n}, 'signature': 'sig'}
+
+
+def test_json_array_is_parsed_item_by_item():
+    body = json.dumps([item(1), 'text', {'sender': 'farmer'}, item(2)]).encode()
+    assert parse_bulk_body(body, ndjson=False) == [item(1), 'Expected a JSON object', 'Missing values', item(2)]
+
+
+@pytest.mark.parametrize('body', [b'{"sender": "farmer"}', b'[{"sender": ', b''])
+def test_unreadable_json_body_is_rejected_as_a_whole(body):
+    with pytest.raises(ValueError):
+        parse_bulk_body(body, ndjson=False)
+
+
+def test_ndjson_rejects_bad_lines_only():
+    body = b'\n'.join([json.dumps(item(1)).encode(), b'', b'{"sender": ', b'  ', b'[1, 2]',
+                       json.dumps(item(2)).encode()])
+    assert parse_bulk_body(body, ndjson=True) == [item(1), 'Malformed JSON', 'Expected a JSON object', item(2)]
+
+
+@pytest.mark.parametrize('ndjson', [False, True])
+def test_item_count_is_capped(ndjson):
+    def encode(count):
+        if ndjson:
+            return b'{}\n' * count
+        return b'[' + b','.join([b'{}'] * count) + b']'
+
+    assert len(parse_bulk_body(encode(MAX_BULK_ITEMS), ndjson)) == MAX_BULK_ITEMS
+    with pytest.raises(ValueError, match='Too many transactions'):
+        parse_bulk_body(encode(MAX_BULK_ITEMS + 1), ndjson)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_signatures_are_checked_in_order(key_pair, workers):
+    verifier = SignatureVerifier(workers=workers, chunk_size=3)
+    private_key, public_key = key_pair
+    items = []
+    for n in range(10):
+        data = {'n': n}
+        signature = verifier.auth_system.sign_data(private_key, data)
+        if n % 3 == 0:
+            data = {'n': -n - 1}
+        # Data and encoded messages are accepted alike
+        items.append((public_key, canonical_message(data) if n % 2 else data, signature))
+    try:
+        assert verifier.verify(items) == [n % 3 != 0 for n in range(10)]
+    finally:
+        verifier.close()
+
+
+def test_batch_gives_a_result_per_item(network, key_pair):
+    node = network('node')
+    producer = BlockProducer(node)
+
+    def registration(product_id, sender='farmer', name='Coffee'):
+        data = {
+            'product_id': product_id, 'name': name, 'description': 'Arabica beans', 'category': 'food',
+            'producer_id': 'farmer', 'production_date': '2025-01-01', 'batch_number': 'B-1',
+            'origin_location': {'latitude': 4.6, 'longitude': -74.1, 'address': 'Finca', 'country': 'Colombia',
+                                'region': 'Huila'},
+            'certifications': [], 'additional_info': {}
+        }
+        return {'sender': sender, 'transaction_type': 'product_registration', 'data': data,
+                'signature': sign(node, key_pair[0], data)}
+
+    body = json.dumps([
+        registration('P-1'),
+        dict(registration('P-2'), signature='00'),
+        registration('P-3', sender='nobody'),
+        registration('P-4', sender=['farmer']),
+        registration('P-1'),
+        registration('P-1', name='Tea'),
+        [],
+        registration('P-5'),
+    ]).encode()
+    results = producer.submit_batch(parse_bulk_body(body, ndjson=False))
+
+    assert [result['status'] for result in results] == \
+        ['pending', 'rejected', 'rejected', 'rejected', 'rejected', 'rejected', 'rejected', 'pending']
+    assert [result.get('error') for result in results[1:7]] == [
+        'Invalid signature', 'Unknown sender: nobody', 'Invalid sender', 'Duplicate transaction signature',
+        'Product ID P-1 already exists', 'Expected a JSON object']
+    assert [producer.get_status(result['transaction_id']) for result in results] == results
+    assert sorted(tx['data']['product_id'] for tx in node.mempool) == ['P-1', 'P-5']
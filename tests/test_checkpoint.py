@@ -0,0 +1,74 @@
+"""
+Restart of a persistent node: the newest snapshot matching the chain is loaded and only the blocks
+sealed after it are replayed
+"""
+import os
+
+import pytest
+
+from block_log import _INDEX_ENTRY
+from supply_chain_blockchain import SupplyChainBlockchain
+from conftest import register_product, transfer_product, mine, derived_state
+
+
+@pytest.fixture
+def node(network, key_pair, tmp_path):
+    """
+    9 blocks with a snapshot every 2: the newest snapshot is at height 8, one block is sealed after it
+    """
+    node = network('node', data_dir=str(tmp_path / 'node'), checkpoint_interval=2)
+    for n in range(1, 5):
+        register_product(node, key_pair[0], f'P-{n}')
+        mine(node)
+        transfer_product(node, key_pair[0], f'P-{n}', 'farmer', 'distributor')
+        mine(node)
+    assert len(node.chain) == 9
+    assert node.checkpoints.heights()[0] == 8
+    return node
+
+
+def reopen(network, node, replayed):
+    """
+    Restart a node on its data directory, once its log is closed, recording the positions replayed on startup
+    """
+    replay = SupplyChainBlockchain._replay
+
+    def spy(self, start):
+        replayed.append(start)
+        return replay(self, start)
+
+    SupplyChainBlockchain._replay = spy
+    try:
+        return network('reopened', data_dir=os.path.dirname(node.checkpoints.directory), checkpoint_interval=2)
+    finally:
+        SupplyChainBlockchain._replay = replay
+
+
+def test_reopen_replays_from_the_last_checkpoint(network, node):
+    state, tip = derived_state(node), node.last_block_hash
+    node.chain.log.close()
+
+    replayed = []
+    reopened = reopen(network, node, replayed)
+
+    assert replayed == [8]
+    assert reopened.last_block_hash == tip
+    assert derived_state(reopened) == state
+    assert reopened.products['P-4']['current_owner'] == 'distributor'
+
+
+def test_reopen_after_a_torn_tail_skips_the_snapshots_above_it(network, node):
+    node.chain.log.close()
+    # The last two index entries are lost (the second one partially), the snapshot at height 8 is not
+    index = os.path.join(os.path.dirname(node.checkpoints.directory), 'blocks.idx')
+    with open(index, 'r+b') as f:
+        f.truncate(os.path.getsize(index) - 2 * _INDEX_ENTRY.size + 3)
+
+    replayed = []
+    reopened = reopen(network, node, replayed)
+
+    assert len(reopened.chain) == 7
+    assert replayed == [6]
+    assert set(reopened.products) == {'P-1', 'P-2', 'P-3'}
+    assert reopened.get_owned_products('distributor')['total'] == 3
+    assert reopened.search_products({'name': 'P-4'})['total'] == 0
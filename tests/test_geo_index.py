@@ -0,0 +1,143 @@
+"""
+Spatial queries over the sealed locations: radius, bounding box and nearest, checked against a full scan
+"""
+import json
+import random
+
+import pytest
+
+from geo_index import GeoIndex, haversine_km, point_view, ACTOR, PRODUCT_ID, BLOCK_INDEX
+
+
+def origin(n, latitude, longitude):
+    return {'transaction_type': 'product_registration', 'transaction_id': f'tx-{n}', 'sender': f'farmer-{n % 7}',
+            'data': {'product_id': f'P-{n}', 'producer_id': f'farmer-{n % 7}',
+                     'origin_location': {'latitude': latitude, 'longitude': longitude}}}
+
+
+def random_blocks(seed=1, blocks=20, per_block=50):
+    rng = random.Random(seed)
+    result = []
+    for index in range(2, blocks + 2):
+        transactions = []
+        for _ in range(per_block):
+            n = sum(len(block['transactions']) for block in result) + len(transactions)
+            # Clusters around a few places, including near the poles and the antimeridian
+            latitude, longitude = rng.choice([(45.0, 5.0), (-33.9, 151.2), (64.1, -21.9), (-17.7, 179.8),
+                                              (-17.7, -179.8), (89.5, 0.0), (0.0, 0.0)])
+            transactions.append(origin(n, max(-90.0, min(90.0, latitude + rng.uniform(-2, 2))),
+                                       (longitude + rng.uniform(-2, 2) + 180) % 360 - 180))
+        result.append({'index': index, 'transactions': transactions})
+    return result
+
+
+@pytest.fixture
+def blocks():
+    return random_blocks()
+
+
+@pytest.fixture
+def index(blocks):
+    index = GeoIndex()
+    for block in blocks:
+        index.add_block(block)
+    return index
+
+
+def all_points(blocks):
+    return [(tx['data']['origin_location']['latitude'], tx['data']['origin_location']['longitude'], block['index'],
+             tx['data']['product_id'], tx['data']['producer_id'], tx['transaction_id'])
+            for block in blocks for tx in block['transactions']]
+
+
+@pytest.mark.parametrize('center, radius', [((45.0, 5.0), 50), ((-17.7, 180.0), 150), ((90.0, 0.0), 300),
+                                            ((0.0, 0.0), 0), ((10.0, 10.0), 25000)])
+def test_radius_matches_a_full_scan(blocks, index, center, radius):
+    expected = sorted((haversine_km(*center, point[0], point[1]), point) for point in all_points(blocks)
+                      if haversine_km(*center, point[0], point[1]) <= radius)
+    results = index.within_radius('origin', *center, radius)
+    assert sorted(point for _, point in results) == sorted(point for _, point in expected)
+    assert [distance for distance, _ in results] == sorted(distance for distance, _ in results)
+
+
+@pytest.mark.parametrize('box', [(44.0, 4.0, 46.0, 6.0), (-20.0, 178.0, -15.0, -178.0), (88.0, -180.0, 90.0, 180.0),
+                                 (-90.0, -180.0, 90.0, 180.0), (10.0, 10.0, 11.0, 11.0)])
+def test_bbox_matches_a_full_scan(blocks, index, box):
+    south, west, north, east = box
+
+    def inside(point):
+        longitude_inside = (point[1] >= west or point[1] <= east) if west > east else west <= point[1] <= east
+        return south <= point[0] <= north and longitude_inside
+    expected = [point for point in all_points(blocks) if inside(point)]
+    results = index.in_bbox('origin', *box)
+    assert sorted(results) == sorted(expected)
+    assert [point[BLOCK_INDEX] for point in results] == [point[BLOCK_INDEX] for point in expected]
+
+
+def test_nearest_gives_one_point_per_actor(blocks, index):
+    results = index.nearest('origin', 45.0, 5.0, 3)
+    assert len({point[ACTOR] for _, point in results}) == 3
+    # Every actor left out is farther than the ones returned
+    best = {}
+    for point in all_points(blocks):
+        distance = haversine_km(45.0, 5.0, point[0], point[1])
+        if point[ACTOR] not in best or distance < best[point[ACTOR]][0]:
+            best[point[ACTOR]] = (distance, point)
+    expected = sorted(best.values())[:3]
+    assert [distance for distance, _ in results] == pytest.approx([distance for distance, _ in expected])
+
+    assert len(index.nearest('origin', 45.0, 5.0, 5, key=PRODUCT_ID)) == 5
+    assert len(index.nearest('origin', 45.0, 5.0, 100)) == 7
+
+
+def test_transfers_index_both_ends_and_skip_invalid_locations():
+    index = GeoIndex()
+    index.add_block({'index': 2, 'transactions': [
+        {'transaction_type': 'transfer', 'transaction_id': 't', 'sender': 's',
+         'data': {'product_id': 'P-1', 'sender_id': 'a', 'recipient_id': 'b',
+                  'departure_location': {'latitude': 1.0, 'longitude': 2.0},
+                  'arrival_location': {'latitude': 3.0, 'longitude': 4.0}}},
+        {'transaction_type': 'transfer', 'transaction_id': 'u', 'sender': 's',
+         'data': {'product_id': 'P-2', 'departure_location': {'latitude': 'north', 'longitude': 2.0},
+                  'arrival_location': None}},
+        origin(3, 91.0, 0.0),
+    ]})
+    assert index.counts == {'origin': 0, 'processing': 0, 'departure': 1, 'arrival': 1, 'retail': 0}
+    [(distance, point)] = index.within_radius('arrival', 3.0, 4.0, 1)
+    assert point_view(point, distance) == {'latitude': 3.0, 'longitude': 4.0, 'block_index': 2, 'product_id': 'P-1',
+                                           'actor': 'b', 'transaction_id': 't', 'distance_km': 0.0}
+
+
+@pytest.mark.parametrize('query', [
+    lambda index: index.within_radius('origin', 91, 0, 10),
+    lambda index: index.within_radius('origin', 0, 0, -1),
+    lambda index: index.within_radius('origin', True, 0, 1),
+    lambda index: index.within_radius('warehouse', 0, 0, 1),
+    lambda index: index.in_bbox('origin', 10, 0, 5, 1),
+    lambda index: index.in_bbox('origin', 0, 181, 5, 1),
+])
+def test_bad_queries_are_rejected(index, query):
+    with pytest.raises(ValueError):
+        query(index)
+
+
+def test_removing_forked_blocks(blocks, index):
+    state = json.dumps(index.state())
+    fork = random_blocks(seed=2, blocks=2)
+    for block in fork:
+        block['index'] += len(blocks)
+        index.add_block(block)
+    assert index.counts['origin'] == len(all_points(blocks + fork))
+
+    for block in reversed(fork):
+        index.remove_block(block)
+    assert json.dumps(index.state()) == state
+    assert sorted(index.in_bbox('origin', -90, -180, 90, 180)) == sorted(all_points(blocks))
+
+
+def test_state_round_trip(blocks, index):
+    restored = GeoIndex()
+    restored.load_state(json.loads(json.dumps(index.state())))
+    assert restored.counts == index.counts
+    assert restored.in_bbox('origin', -90, -180, 90, 180) == index.in_bbox('origin', -90, -180, 90, 180)
+    assert restored.within_radius('origin', -33.9, 151.2, 100) == index.within_radius('origin', -33.9, 151.2, 100)
@@ -0,0 +1,100 @@
+"""
+Light-client verification of product proofs, with block headers only
+"""
+import copy
+import json
+
+import pytest
+
+import light_client
+import mining
+from light_client import verify_headers, verify_product_proof
+from supply_chain_blockchain import SupplyChainBlockchain
+from conftest import register_product, transfer_product, mine
+
+
+@pytest.fixture
+def proof(network, key_pair):
+    """
+    Proof of a product registered, then transferred two blocks later, on a chain of 5 blocks
+    """
+    node = network('node')
+    register_product(node, key_pair[0], 'P-1')
+    register_product(node, key_pair[0], 'P-2')
+    mine(node)
+    transfer_product(node, key_pair[0], 'P-2', 'farmer', 'distributor')
+    mine(node)
+    transfer_product(node, key_pair[0], 'P-1', 'farmer', 'retailer')
+    mine(node)
+    mine(node)
+    # As a client receives it from /products/<id>/proof
+    return json.loads(json.dumps(node.get_product_proof('P-1')))
+
+
+def test_proof_of_work_check_is_shared():
+    assert light_client.valid_proof is mining.valid_proof
+    assert all(SupplyChainBlockchain.valid_proof(100, proof) == mining.valid_proof(100, proof)
+               for proof in range(100000))
+
+
+def test_valid_proof_is_authentic(proof):
+    result = verify_product_proof(proof)
+    assert result['authentic'], result
+    assert result['history_length'] == 2
+    assert result['current_owner'] == 'retailer'
+    assert verify_product_proof(proof, trusted_tip_hash=proof['tip']['hash'])['authentic']
+
+
+def test_other_tip_is_rejected(proof):
+    result = verify_product_proof(proof, trusted_tip_hash='0' * 64)
+    assert result == {'authentic': False, 'reason': 'Chain does not end at the trusted tip'}
+
+
+def test_tampered_header_is_rejected(proof):
+    tampered = copy.deepcopy(proof)
+    tampered['headers'][1]['merkle_root'] = '0' * 64
+    assert verify_product_proof(tampered)['reason'] == 'Wrong hash for block 3'
+
+    # Without its announced hash, the header no longer links to the next one
+    del tampered['headers'][1]['hash']
+    assert verify_product_proof(tampered)['reason'] == 'Block 4 does not link to block 3'
+
+
+def test_broken_link_is_rejected(proof):
+    tampered = copy.deepcopy(proof)
+    del tampered['headers'][1]
+    assert verify_product_proof(tampered)['reason'] == 'Block 4 does not link to block 2'
+
+
+def test_invalid_proof_of_work_is_rejected(proof):
+    headers = copy.deepcopy(proof['headers'])
+    previous_proof = headers[-2]['proof']
+    headers[-1]['proof'] = next(p for p in range(1000) if not mining.valid_proof(previous_proof, p))
+    del headers[-1]['hash']
+    assert verify_headers(headers) == f"Invalid Proof of Work for block {headers[-1]['index']}"
+
+
+def test_truncated_headers_do_not_reach_the_tip(proof):
+    tampered = copy.deepcopy(proof)
+    del tampered['headers'][-1]
+    assert verify_product_proof(tampered)['reason'] == 'Headers do not reach the tip'
+
+
+def test_tampered_transaction_is_rejected(proof):
+    tampered = copy.deepcopy(proof)
+    tampered['transactions'][1]['transaction']['data']['recipient_id'] = 'distributor'
+    result = verify_product_proof(tampered)
+    assert not result['authentic']
+    assert result['reason'].endswith('is not in the chain')
+
+    # A transaction of the product left out of the proof is still a valid, shorter history
+    shortened = copy.deepcopy(proof)
+    del shortened['transactions'][1]
+    assert verify_product_proof(shortened)['current_owner'] == 'farmer'
+
+
+def test_malformed_proof_is_rejected(proof):
+    assert not verify_product_proof({'product_id': 'P-1'})['authentic']
+    tampered = copy.deepcopy(proof)
+    tampered['transactions'][0]['merkle_path'] = [{'hash': 'zz', 'side': 'left'}]
+    assert verify_product_proof(tampered)['reason'].startswith('Malformed proof')
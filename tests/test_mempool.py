@@ -0,0 +1,71 @@
+"""
+Duplicate transactions: a signed transaction is accepted once, whether its copy is pending or sealed
+"""
+import pytest
+
+from mempool import Mempool, MempoolError
+from conftest import register_product, mine, sign
+
+
+def transfer_data(product_id, sender, recipient):
+    return {
+        'transfer_id': f'{product_id}-{recipient}', 'product_id': product_id, 'sender_id': sender,
+        'sender_type': 'producer', 'recipient_id': recipient, 'recipient_type': 'distributor',
+        'timestamp': '2025-01-02T00:00:00',
+        'departure_location': {'latitude': 4.6, 'longitude': -74.1, 'address': 'Finca', 'country': 'Colombia',
+                               'region': 'Huila'},
+        'arrival_location': None, 'estimated_arrival_time': None, 'transport_conditions': {},
+        'status': 'initiated', 'additional_info': {}
+    }
+
+
+def test_pending_duplicates_are_rejected():
+    mempool = Mempool()
+    mempool.add({'transaction_id': 'tx-1', 'signature': 'sig-1'})
+    with pytest.raises(MempoolError):
+        mempool.check('tx-1', 'sig-2')
+    with pytest.raises(MempoolError):
+        mempool.check('tx-2', 'sig-1')
+
+
+def test_sealed_transaction_cannot_be_replayed(network, key_pair):
+    node = network('node')
+    register_product(node, key_pair[0], 'P-1')
+    mine(node)
+
+    # The product goes to the distributor and back, so that the first transfer would be valid again
+    outbound = transfer_data('P-1', 'farmer', 'distributor')
+    outbound_signature = sign(node, key_pair[0], outbound)
+    node.new_transaction('farmer', 'transfer', outbound, outbound_signature, transaction_id='transfer-1')
+    mine(node)
+    inbound = transfer_data('P-1', 'distributor', 'farmer')
+    node.new_transaction('distributor', 'transfer', inbound, sign(node, key_pair[0], inbound))
+    mine(node)
+    assert node.products['P-1']['current_owner'] == 'farmer'
+
+    with pytest.raises(ValueError, match='already sealed'):
+        node.new_transaction('farmer', 'transfer', outbound, outbound_signature)
+    with pytest.raises(ValueError, match='already sealed'):
+        node.new_transaction('farmer', 'transfer', outbound, sign(node, key_pair[0], outbound),
+                             transaction_id='transfer-1')
+    assert len(node.mempool) == 0
+    assert node.products['P-1']['current_owner'] == 'farmer'
+
+
+def test_sealed_transactions_survive_a_restart(network, key_pair, tmp_path):
+    data_dir = str(tmp_path / 'node')
+    node = network('node', data_dir=data_dir, checkpoint_interval=2)
+    data = transfer_data('P-1', 'farmer', 'distributor')
+    register_product(node, key_pair[0], 'P-1')
+    mine(node)
+    signature = sign(node, key_pair[0], data)
+    node.new_transaction('farmer', 'transfer', data, signature)
+    mine(node)
+    register_product(node, key_pair[0], 'P-2')
+    mine(node)
+    node.chain.log.close()
+
+    # The sealed transactions index is restored from the snapshot taken at height 4
+    reopened = network('reopened', data_dir=data_dir, checkpoint_interval=2)
+    with pytest.raises(ValueError, match='already sealed'):
+        reopened.new_transaction('farmer', 'transfer', data, signature)
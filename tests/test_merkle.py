@@ -0,0 +1,65 @@
+"""
+Merkle trees of the block transactions: roots, inclusion paths and their verification
+"""
+import pytest
+
+from merkle import merkle_root, merkle_path, verify_merkle_path, transaction_hash, node_hash, merkle_levels
+from records import compact
+
+
+def make_transactions(count: int):
+    return [{'sender': 'farmer', 'transaction_type': 'transfer', 'data': {'product_id': f'P-{n}'},
+             'timestamp': '2025-01-01T00:00:00', 'signature': f'{n:04x}', 'transaction_id': f'{n:032x}'}
+            for n in range(count)]
+
+
+def test_root_of_two_and_three_leaves():
+    a, b, c = (transaction_hash(tx) for tx in make_transactions(3))
+    assert merkle_root(make_transactions(2)) == node_hash(a, b).hex()
+    # The odd leaf is carried up unchanged
+    assert merkle_root(make_transactions(3)) == node_hash(node_hash(a, b), c).hex()
+
+
+def test_root_of_a_single_leaf_and_of_no_leaf():
+    transactions = make_transactions(1)
+    assert merkle_root(transactions) == transaction_hash(transactions[0]).hex()
+    assert merkle_root([]) == merkle_levels([])[-1][0].hex()
+
+
+def test_root_commits_to_order_and_content():
+    transactions = make_transactions(4)
+    root = merkle_root(transactions)
+    assert merkle_root(transactions[::-1]) != root
+    assert merkle_root(transactions[:3] + [dict(transactions[3], sender='retailer')]) != root
+    # Compact records hash like the dicts they stand for
+    assert merkle_root([compact(tx) for tx in transactions]) == root
+
+
+@pytest.mark.parametrize('count', [1, 2, 3, 5, 7, 8, 13])
+def test_every_leaf_has_a_valid_path(count):
+    transactions = make_transactions(count)
+    leaves = [transaction_hash(tx) for tx in transactions]
+    root = merkle_root(transactions)
+    for position, leaf in enumerate(leaves):
+        path = merkle_path(leaves, position)
+        assert verify_merkle_path(leaf, path, root)
+        # A path proves the position it was built for only
+        assert not any(verify_merkle_path(other, path, root) for other in leaves if other != leaf)
+
+
+def test_tampered_paths_are_rejected():
+    transactions = make_transactions(6)
+    leaves = [transaction_hash(tx) for tx in transactions]
+    root = merkle_root(transactions)
+    path = merkle_path(leaves, 4)
+    assert verify_merkle_path(leaves[4], path, root)
+
+    tampered = [dict(step) for step in path]
+    tampered[0]['hash'] = ('0' if tampered[0]['hash'][0] != '0' else '1') + tampered[0]['hash'][1:]
+    assert not verify_merkle_path(leaves[4], tampered, root)
+
+    flipped = [dict(step, side='left' if step['side'] == 'right' else 'right') for step in path]
+    assert not verify_merkle_path(leaves[4], flipped, root)
+    assert not verify_merkle_path(leaves[4], path[:-1], root)
+    assert not verify_merkle_path(transaction_hash(dict(transactions[4], sender='x')), path, root)
+
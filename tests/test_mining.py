@@ -0,0 +1,37 @@
+"""
+Proof of Work search: single-core kernel and the worker pool
+"""
+import multiprocessing
+
+import pytest
+
+import mining
+from mining import ParallelMiner, find_proof, search_range
+from supply_chain_blockchain import SupplyChainBlockchain
+
+
+@pytest.mark.parametrize('last_proof', [100, 35293, 7])
+def test_find_proof_is_accepted_by_valid_proof(last_proof):
+    proof = find_proof(last_proof)
+    assert SupplyChainBlockchain.valid_proof(last_proof, proof)
+    assert not any(SupplyChainBlockchain.valid_proof(last_proof, nonce) for nonce in range(proof))
+
+
+def test_parallel_miner_finds_a_valid_proof():
+    miner = ParallelMiner(workers=2, chunk_size=5000)
+    try:
+        for last_proof in (100, 35293):
+            proof = miner.proof_of_work(last_proof)
+            assert SupplyChainBlockchain.valid_proof(last_proof, proof)
+    finally:
+        miner.close()
+
+
+def test_chunks_of_an_earlier_search_stop(monkeypatch):
+    proof = find_proof(100)
+    generation = multiprocessing.Value('Q', 2)
+    monkeypatch.setattr(mining, '_generation', generation)
+
+    # A chunk of generation 1 holding a valid proof gives up, one of the current generation finds it
+    assert search_range(100, 0, proof + 1, generation=1) is None
+    assert search_range(100, 0, proof + 1, generation=2) == proof
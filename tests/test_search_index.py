@@ -0,0 +1,129 @@
+"""
+Attribute search over the registered products: name substrings and word prefixes, keywords and keyword prefixes
+"""
+import json
+
+import pytest
+
+import search_index
+from search_index import ProductSearchIndex, document_view
+
+PRODUCTS = [
+    # product_id, name, category, certifications, country, region
+    ('P-1', 'Organic Apple Juice', 'Beverage', ['organic', 'fairtrade'], 'France', 'Normandie'),
+    ('P-2', 'Apple Pie', 'Bakery', [], 'France', 'Bretagne'),
+    ('P-3', 'Pineapple Slices', 'Food', ['organic'], 'Costa Rica', 'Limon'),
+    ('P-4', 'Green Tea', 'Beverage', ['rainforest'], 'Japan', 'Shizuoka'),
+    ('P-5', 'Tea Biscuits', 'Bakery', [], 'United Kingdom', 'Kent'),
+]
+
+
+def registration(product_id, name, category, certifications, country, region, producer='farmer'):
+    return {'sender': producer, 'transaction_type': 'product_registration', 'transaction_id': product_id, 'data': {
+        'product_id': product_id, 'name': name, 'category': category, 'producer_id': producer,
+        'batch_number': f'B-{product_id}', 'origin_location': {'country': country, 'region': region},
+        'certifications': [{'certification_type': cert} for cert in certifications]}}
+
+
+def block(index, *products):
+    return {'index': index, 'transactions': [registration(*product) for product in products]}
+
+
+@pytest.fixture
+def index():
+    index = ProductSearchIndex()
+    index.add_block(block(2, *PRODUCTS[:2]))
+    index.add_block({'index': 3, 'transactions': [{'transaction_type': 'transfer', 'data': {'product_id': 'P-1'}}]})
+    index.add_block(block(4, *PRODUCTS[2:]))
+    return index
+
+
+def ids(result):
+    return [document[0] for document in result[1]]
+
+
+def test_name_is_searched_by_substring(index):
+    assert ids(index.search({'name': 'apple'})) == ['P-3', 'P-2', 'P-1']
+    assert ids(index.search({'name': 'PLE JU'})) == ['P-1']
+    assert ids(index.search({'name': 'coffee'})) == []
+
+
+def test_short_name_query_matches_the_beginning_of_words(index):
+    assert ids(index.search({'name': 'ap'})) == ['P-2', 'P-1']
+    assert ids(index.search({'name': 'te'})) == ['P-5', 'P-4']
+
+
+def test_keywords_match_whole_values_or_prefixes(index):
+    assert ids(index.search({'category': 'BEVERAGE'})) == ['P-4', 'P-1']
+    assert ids(index.search({'category': 'bev'})) == []
+    assert ids(index.search({'category': 'b*'})) == ['P-5', 'P-4', 'P-2', 'P-1']
+    assert ids(index.search({'country': 'costa rica'})) == ['P-3']
+    assert ids(index.search({'certification_type': 'organic'})) == ['P-3', 'P-1']
+    assert ids(index.search({'certification_type': 'f*'})) == ['P-1']
+
+
+def test_criteria_are_combined(index):
+    assert ids(index.search({'name': 'apple', 'country': 'France', 'category': 'bakery'})) == ['P-2']
+    assert ids(index.search({'name': 'tea', 'certification_type': 'r*'})) == ['P-4']
+    assert ids(index.search({'name': 'tea', 'region': ' '})) == ['P-5', 'P-4']
+
+
+def test_results_are_paged_newest_first(index):
+    total, page = index.search({'category': 'b*'}, offset=1, limit=2)
+    assert total == 4
+    assert [document[0] for document in page] == ['P-4', 'P-2']
+    assert document_view(page[0]) == {
+        'product_id': 'P-4', 'block_index': 4, 'name': 'Green Tea', 'batch_number': 'B-P-4',
+        'category': 'Beverage', 'certification_type': ['rainforest'], 'producer': 'farmer', 'country': 'Japan',
+        'region': 'Shizuoka'}
+
+
+def test_bad_criteria_are_rejected(index):
+    with pytest.raises(ValueError, match='Cannot search by price'):
+        index.search({'price': '1'})
+    with pytest.raises(ValueError, match='at least one'):
+        index.search({'name': '  '})
+
+
+def test_broad_prefixes_are_checked_on_the_documents(index, monkeypatch):
+    expected = [ids(index.search(criteria)) for criteria in
+                ({'category': 'b*'}, {'certification_type': 'f*'}, {'name': 'a'}, {'name': 'te'})]
+    monkeypatch.setattr(search_index, 'MAX_PREFIX_EXPANSION', 0)
+    assert [ids(index.search(criteria)) for criteria in
+            ({'category': 'b*'}, {'certification_type': 'f*'}, {'name': 'a'}, {'name': 'te'})] == expected
+
+
+def test_removing_a_forked_block(index):
+    state = json.dumps(index.state())
+    fork = block(5, ('P-6', 'Apple Cider', 'Beverage', [], 'France', 'Normandie'),
+                 ('P-1', 'Apple Juice again', 'Food', [], 'Spain', 'Murcia'))
+    index.add_block(fork)
+    assert len(index) == 6
+    # A product registered twice keeps its first registration
+    assert ids(index.search({'country': 'spain'})) == []
+    assert ids(index.search({'name': 'cider'})) == ['P-6']
+
+    index.remove_block(fork)
+    assert json.dumps(index.state()) == state
+    assert ids(index.search({'name': 'cider'})) == []
+    assert ids(index.search({'name': 'apple'})) == ['P-3', 'P-2', 'P-1']
+    assert ('name', 'cider') not in index.postings
+    assert 'cid' not in index.trigrams
+
+    # The other branch reuses the document IDs given back
+    index.add_block(block(5, ('P-7', 'Cider Vinegar', 'Food', [], 'France', 'Bretagne')))
+    assert ids(index.search({'name': 'cider'})) == ['P-7']
+    assert ids(index.search({'region': 'bretagne'})) == ['P-7', 'P-2']
+
+
+def test_state_round_trip_and_vocabulary_merges(index, monkeypatch):
+    monkeypatch.setattr(search_index, 'VOCABULARY_MERGE_SIZE', 2)
+    restored = ProductSearchIndex()
+    restored.load_state(json.loads(json.dumps(index.state())))
+    assert restored.vocabularies['category'].tokens
+    for criteria in ({'name': 'apple'}, {'name': 'te'}, {'category': 'b*'}, {'certification_type': 'organic'}):
+        assert restored.search(criteria) == index.search(criteria)
+
+    restored.remove_block(block(4, *PRODUCTS[2:]))
+    assert ids(restored.search({'category': 'f*'})) == []
+    assert ids(restored.search({'name': 'te'})) == []
@@ -0,0 +1,81 @@
+"""
+Fork switches: the derived state after swapping the suffix of a chain must be the one a fresh replay gives
+"""
+import pytest
+
+from conftest import register_product, transfer_product, mine, derived_state
+
+
+@pytest.fixture(params=['memory', 'persistent'])
+def make_node(request, network, tmp_path):
+    # Persistent nodes keep a checkpoint every 2 blocks, so that forks may be replayed from a snapshot
+    if request.param == 'memory':
+        return lambda name: network(name)
+    return lambda name: network(name, data_dir=str(tmp_path / name), checkpoint_interval=2)
+
+
+def diverge(make_node, private_key):
+    """
+    Two nodes sharing their first blocks. 'a' then seals one block, 'b' three blocks holding the same
+    transfer plus a new registration
+    """
+    a, b = make_node('a'), make_node('b')
+    register_product(a, private_key, 'P-1')
+    register_product(a, private_key, 'P-2')
+    mine(a)
+    transfer_product(a, private_key, 'P-2', 'farmer', 'distributor')
+    mine(a)
+    assert b.resolve_conflicts()
+
+    transfer_product(a, private_key, 'P-1', 'farmer', 'distributor', transaction_id='transfer-1')
+    mine(a)
+    transfer_product(b, private_key, 'P-1', 'farmer', 'distributor', transaction_id='transfer-1')
+    mine(b)
+    register_product(b, private_key, 'P-3')
+    mine(b)
+    transfer_product(b, private_key, 'P-3', 'farmer', 'retailer')
+    mine(b)
+    return a, b
+
+
+def test_fork_swap_matches_fresh_replay(make_node, key_pair):
+    a, b = diverge(make_node, key_pair[0])
+    fork = len(a.chain) - 1
+
+    assert a.resolve_conflicts()
+    assert a.peer_report['b']['fork_point'] == fork
+    assert a.last_block_hash == b.last_block_hash
+    assert len(a.mempool) == 0
+
+    # A node that never saw the fork replays the whole chain of b
+    fresh = make_node('fresh')
+    assert fresh.resolve_conflicts()
+    assert fresh.last_block_hash == b.last_block_hash
+
+    assert derived_state(a) == derived_state(fresh) == derived_state(b)
+    assert a.products['P-1']['current_owner'] == 'distributor'
+    assert a.get_owned_products('retailer')['total'] == 1
+
+
+def test_orphaned_transactions_return_to_the_mempool(make_node, key_pair):
+    a, b = diverge(make_node, key_pair[0])
+    # Sealed on a only, and pending on a when it switches to the chain of b
+    register_product(a, key_pair[0], 'P-4')
+    mine(a)
+    register_product(a, key_pair[0], 'P-5')
+
+    assert a.resolve_conflicts()
+
+    pending = sorted(tx['data']['product_id'] for tx in a.mempool.take(len(a.mempool)))
+    assert pending == ['P-4', 'P-5']
+    assert set(a.products) == {'P-1', 'P-2', 'P-3', 'P-4', 'P-5'}
+    assert a.search_products({'name': 'P-4'})['total'] == 0
+
+
+def test_shorter_chain_is_kept(make_node, key_pair):
+    a, b = diverge(make_node, key_pair[0])
+    state = derived_state(b)
+
+    assert not b.resolve_conflicts()
+    assert b.peer_report['a']['chain'] == 'not longer'
+    assert derived_state(b) == state
@@ -0,0 +1,149 @@
+"""
+Time-range queries: filters, cursor pagination, and pages resumed after a fork switch
+"""
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from time_index import TimeIndex, encode_cursor, decode_cursor, parse_time
+
+TYPES = ('product_registration', 'transfer', 'processing')
+ACTORS = ('farmer', 'distributor', 'retailer')
+START = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()) * 1000000
+
+
+def transaction(second: int, n: int):
+    return {'transaction_type': TYPES[n % 3], 'sender': ACTORS[n % 2],
+            'timestamp': datetime.fromtimestamp(START / 1000000 + second, timezone.utc).isoformat(),
+            'data': {'recipient_id': ACTORS[2] if n % 4 == 0 else None}}
+
+
+def make_blocks(first_index: int, count: int, first_second: int = 0, branch: int = 0):
+    # 5 transactions a block, one second apart, the first two at the same time
+    blocks = []
+    for index in range(first_index, first_index + count):
+        second = first_second + (index - first_index) * 5
+        blocks.append({'index': index, 'transactions': [transaction(second + max(0, position - 1), position + branch)
+                                                         for position in range(5)]})
+    return blocks
+
+
+@pytest.fixture
+def blocks():
+    return make_blocks(2, 10)
+
+
+@pytest.fixture
+def index(blocks):
+    index = TimeIndex()
+    for block in blocks:
+        index.add_block(block)
+    return index
+
+
+def scan(blocks, since=None, until=None, transaction_type=None, actor=None):
+    keys = []
+    for block in blocks:
+        for position, tx in enumerate(block['transactions']):
+            micros = parse_time(tx['timestamp'])
+            if since is not None and micros < since or until is not None and micros >= until:
+                continue
+            if transaction_type is not None and tx['transaction_type'] != transaction_type:
+                continue
+            if actor is not None and actor not in (tx['sender'], tx['data']['recipient_id']):
+                continue
+            keys.append((micros, block['index'], position))
+    return sorted(keys)
+
+
+def pages(index, limit, **filters):
+    keys, after, count = [], None, 0
+    while True:
+        page, after = index.range(after=after, limit=limit, **filters)
+        keys.extend(page)
+        count += 1
+        if after is None:
+            return keys, count
+        # Cursors go through the query string
+        after = decode_cursor(encode_cursor(after))
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'since': START + 7 * 1000000, 'until': START + 31 * 1000000},
+    {'transaction_type': 'transfer'},
+    {'actor': 'retailer'},
+    {'actor': 'farmer', 'transaction_type': 'processing', 'since': START + 10 * 1000000},
+    {'since': START + 1000 * 1000000},
+])
+def test_range_matches_a_full_scan(blocks, index, filters):
+    expected = scan(blocks, **filters)
+    assert index.range(**filters) == (expected, None)
+    for limit in (1, 3, 7, len(expected) or 1):
+        keys, count = pages(index, limit, **filters)
+        assert keys == expected
+        assert count == max(1, -(-len(expected) // limit))
+
+
+def test_pages_resume_after_a_fork_switch(blocks, index):
+    page, after = index.range(limit=32)
+    assert after == page[-1] and after[1] == 8
+
+    # The tip blocks the cursor pointed into are replaced by a longer branch with other timestamps
+    for block in reversed(blocks[5:]):
+        index.remove_block(block)
+    fork = make_blocks(7, 7, first_second=23, branch=1)
+    for block in fork:
+        index.add_block(block)
+    chain = blocks[:5] + fork
+
+    keys = []
+    while after is not None:
+        next_page, after = index.range(after=after, limit=4)
+        keys.extend(next_page)
+    # Nothing of the new branch older than the cursor is sent twice, and nothing newer is lost
+    assert keys == [key for key in scan(chain) if key > page[-1]]
+    assert index.range() == (scan(chain), None)
+
+
+def test_removed_blocks_leave_no_entries(blocks, index):
+    state = json.dumps(index.state())
+    fork = make_blocks(12, 3, first_second=50)
+    for block in fork:
+        index.add_block(block)
+    for block in reversed(fork):
+        index.remove_block(block)
+    assert json.dumps(index.state()) == state
+    assert ('actor', 'retailer', 'product_registration') in index.entries
+
+    for block in reversed(blocks):
+        index.remove_block(block)
+    assert index.entries == {}
+
+
+def test_state_round_trip(index):
+    restored = TimeIndex()
+    restored.load_state(json.loads(json.dumps(index.state())))
+    assert restored.entries == index.entries
+
+
+def test_untimed_transactions_are_left_out():
+    index = TimeIndex()
+    index.add_block({'index': 2, 'transactions': [{'transaction_type': 'transfer', 'sender': 'farmer'},
+                                                  {'transaction_type': 'transfer', 'timestamp': 'noon'},
+                                                  transaction(0, 1)]})
+    assert index.range() == ([(START, 2, 2)], None)
+
+
+def test_times_and_cursors_are_parsed():
+    assert parse_time(1) == parse_time('1') == 1000000
+    assert parse_time('2025-01-01T00:00:00+00:00') == START
+    for value in ('yesterday', True, None, 1.5):
+        with pytest.raises(ValueError):
+            parse_time(value)
+
+    assert decode_cursor(encode_cursor((START, 3, 4))) == (START, 3, 4)
+    for cursor in ('1.2', 'a.b.c', None, '1.2.3.4'):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
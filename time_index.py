@@ -0,0 +1,217 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta, timezone
+from itertools import repeat
+from typing import Dict, List, Tuple, Any, Optional
+
+from records import Transaction, micros_to_timestamp
+
+_UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+# Fields of the transaction data naming the actors involved, besides the sender
+ACTOR_FIELDS = ('producer_id', 'actor_id', 'sender_id', 'recipient_id', 'inspector_id', 'retailer_id')
+
+
+def epoch_micros(moment: datetime) -> int:
+    """
+    :param moment: Date and time, in the local time of the node if it has no timezone,
+                   as the timestamps of the transactions
+    :return: Microseconds since the Unix epoch
+    """
+    return (moment.astimezone(timezone.utc) - _UNIX_EPOCH) // _MICROSECOND
+
+
+def parse_time(value: Any) -> int:
+    """
+    :param value: Seconds since the Unix epoch, or an ISO 8601 timestamp (in the local time of the node
+                  if it has no timezone)
+    :return: Microseconds since the Unix epoch
+    :raises ValueError: if the value is neither
+    """
+    if isinstance(value, str):
+        try:
+            return int(value) * 1000000
+        except ValueError:
+            pass
+        try:
+            return epoch_micros(datetime.fromisoformat(value))
+        except (ValueError, OverflowError):
+            raise ValueError(f"Invalid time: {value}, give seconds since the epoch or an ISO 8601 timestamp")
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value * 1000000
+    raise ValueError(f"Invalid time: {value}, give seconds since the epoch or an ISO 8601 timestamp")
+
+
+def transaction_time(tx: Dict[str, Any]) -> Optional[int]:
+    """
+    :param tx: Transaction
+    :return: Timestamp of the transaction in microseconds since the Unix epoch,
+             or None if it has no valid timestamp
+    """
+    timestamp = micros_to_timestamp(tx.timestamp) if isinstance(tx, Transaction) else tx.get('timestamp')
+    if not isinstance(timestamp, str):
+        return None
+    try:
+        return epoch_micros(datetime.fromisoformat(timestamp))
+    except (ValueError, OverflowError):
+        return None
+
+
+def transaction_actors(tx: Dict[str, Any]) -> List[str]:
+    """
+    :param tx: Transaction
+    :return: The sender and the actors named in the data of the transaction
+    """
+    data = tx.get('data') or {}
+    actors = [tx.get('sender')] + [data.get(field) for field in ACTOR_FIELDS]
+    return sorted({actor for actor in actors if isinstance(actor, str)})
+
+
+def encode_cursor(key: Tuple[int, int, int]) -> str:
+    """
+    :param key: Key of the last entry of a page
+    :return: Cursor of the next page
+    """
+    return '.'.join(str(part) for part in key)
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int, int]:
+    """
+    :param cursor: Cursor returned by encode_cursor
+    :return: Key of the last entry of the previous page
+    :raises ValueError: if the cursor is not valid
+    """
+    try:
+        micros, block_index, position = (int(part) for part in cursor.split('.'))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return micros, block_index, position
+
+
+class TimeIndex:
+    """
+    Sorted index of the sealed transactions by time.
+    Entries are (microseconds since the Unix epoch, block_index, position) keys, unique and totally ordered,
+    kept in one sorted list over all the transactions and one per type, per actor and per actor and type,
+    so that a range query walks a single list from a binary search.
+    """
+    def __init__(self):
+        # None, ('type', type), ('actor', actor) or ('actor', actor, type) -> sorted keys
+        self.entries = {}
+
+    @staticmethod
+    def _lists(transaction_type: str, actors: List[str]) -> List[Any]:
+        return [None, ('type', transaction_type)] + [('actor', actor) for actor in actors] + \
+            [('actor', actor, transaction_type) for actor in actors]
+
+    def _add(self, key: Tuple[int, int, int], transaction_type: str, actors: List[str]) -> None:
+        for name in self._lists(transaction_type, actors):
+            keys = self.entries.setdefault(name, [])
+            # Blocks are sealed in time order, so the key nearly always goes at the end
+            if not keys or keys[-1] < key:
+                keys.append(key)
+            else:
+                insort(keys, key)
+
+    def add_block(self, block: Dict[str, Any]) -> None:
+        """
+        Index the transactions of a sealed block
+
+        :param block: Sealed block
+        :return: None
+        """
+        for position, tx in enumerate(block['transactions']):
+            micros = transaction_time(tx)
+            if micros is not None:
+                self._add((micros, block['index'], position), tx.get('transaction_type'), transaction_actors(tx))
+
+    def remove_block(self, block: Dict[str, Any]) -> None:
+        """
+        Remove the transactions of a block being removed from the tip of the chain
+
+        :param block: Block being removed
+        :return: None
+        """
+        for position, tx in enumerate(block['transactions']):
+            micros = transaction_time(tx)
+            if micros is None:
+                continue
+            key = (micros, block['index'], position)
+            for name in self._lists(tx.get('transaction_type'), transaction_actors(tx)):
+                keys = self.entries.get(name, [])
+                found = bisect_left(keys, key)
+                if found < len(keys) and keys[found] == key:
+                    del keys[found]
+                    if not keys:
+                        del self.entries[name]
+
+    def clear(self) -> None:
+        """
+        Drop every entry from the index
+
+        :return: None
+        """
+        self.entries = {}
+
+    def state(self) -> Dict[str, Any]:
+        """
+        :return: JSON-serializable content of the index, for checkpoints: every key with the type
+                 and the actors of its transaction, found back from the lists holding it
+        """
+        types, actors = {}, {}
+        for name, keys in self.entries.items():
+            if name is not None and len(name) == 2:
+                if name[0] == 'type':
+                    types.update(zip(keys, repeat(name[1])))
+                else:
+                    for key in keys:
+                        actors.setdefault(key, []).append(name[1])
+        return {'transactions': [list(key) + [types[key], sorted(actors.get(key, ()))]
+                                 for key in self.entries.get(None, [])]}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """
+        Replace the content of the index with a state returned by state()
+
+        :param state: Saved state
+        :return: None
+        """
+        self.clear()
+        for micros, block_index, position, transaction_type, actors in sorted(state['transactions']):
+            self._add((micros, block_index, position), transaction_type, actors)
+
+    def range(self, since: Optional[int] = None, until: Optional[int] = None, transaction_type: Optional[str] = None,
+              actor: Optional[str] = None, after: Optional[Tuple[int, int, int]] = None,
+              limit: Optional[int] = None) -> Tuple[List[Tuple[int, int, int]], Optional[Tuple[int, int, int]]]:
+        """
+        Transactions sealed with a timestamp in [since, until), oldest first
+
+        :param since: Start of the range in microseconds since the Unix epoch, unbounded if None
+        :param until: End of the range (excluded) in microseconds since the Unix epoch, unbounded if None
+        :param transaction_type: Only the transactions of this type
+        :param actor: Only the transactions sent by this actor or naming them in their data
+        :param after: Key of the last entry of the previous page
+        :param limit: Maximum number of entries to return, all of them if None
+        :return: Keys of the entries, and the key to resume after if there are more of them
+        """
+        if transaction_type is not None and actor is not None:
+            name = ('actor', actor, transaction_type)
+        elif actor is not None:
+            name = ('actor', actor)
+        elif transaction_type is not None:
+            name = ('type', transaction_type)
+        else:
+            name = None
+        keys = self.entries.get(name, [])
+
+        start = bisect_left(keys, (since,)) if since is not None else 0
+        if after is not None:
+            # Right after the last key of the previous page, even if its block was since replaced
+            start = max(start, bisect_right(keys, after))
+        stop = bisect_left(keys, (until,)) if until is not None else len(keys)
+
+        if limit is not None and stop - start > limit:
+            page = keys[start:start + limit]
+            return page, page[-1]
+        return keys[start:stop], None